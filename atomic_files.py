@@ -0,0 +1,21 @@
+import json
+import os
+import tempfile
+
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """
+    Write data as JSON to path through a temporary file in the same directory, so a crash never
+    leaves a truncated file behind and readers always see either the old or the new content.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(data, file, **dump_kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
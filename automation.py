@@ -1,190 +1,478 @@
-import asyncio
-import os
-import nest_asyncio
-import sys
-import re
-import json
-
-from llm_prompt import LLMPrompt
-from parser import LlamaPDFParser
-from retrieval import MilvusEmbeddingManager
-from ToLatex import md_to_latex
-from usegemini import ModelGemini
-
-
-
-nest_asyncio.apply()
-
-
-class PDFToMilvusAutomation:
-    def __init__(self, pdf_paths=None, output_dir=None):
-        self.pdf_paths = pdf_paths or []
-        self.output_dir = output_dir
-        if self.output_dir:
-            os.makedirs(self.output_dir, exist_ok=True)
-        self.manager = MilvusEmbeddingManager()
-
-    def remove_initial_numbers(self, text):
-        return re.sub(r'^\s*[\d\.]+\s*', '', text)
-
-    def process_pdfs_and_dump_to_milvus(self):
-        """
-        Converts each PDF to Markdown, then to JSON, and inserts the JSON into Milvus.
-        """
-        if not self.output_dir:
-            raise ValueError("Output directory is required for PDF processing.")
-
-        for pdf_path in self.pdf_paths:
-            print(f"Processing: {pdf_path}")
-            try:
-                # Define output paths for Markdown and JSON
-                base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-                md_path = os.path.join(self.output_dir, f"{base_name}.md")
-                json_path = os.path.join(self.output_dir, f"{base_name}.json")
-                image_path = os.path.join(self.output_dir, base_name)
-
-                # Parse the PDF and generate JSON
-                parser = LlamaPDFParser(pdf_path, md_path, json_path, image_path)
-                parser.convert_md_to_json()  # This converts the PDF to Markdown, then to JSON
-
-                # Insert JSON into Milvus
-                print(f"Inserting JSON into Milvus for {base_name}")
-                self.manager.process_and_insert_json(json_path)
-                self.manager.create_indexes(base_name)
-
-            except Exception as e:
-                print(f"Error processing {pdf_path}: {e}")
-
-    def perform_vector_search(self, query=None, anns_field="sub_heading_embedding", limit=5, threshold=0.80):
-        """
-        Performs a vector search on the data in Milvus.
-        If no query is provided, performs default searches.
-        """
-        text_results = []
-
-        if query:
-            print(f"Performing content-based search for query: {query}")
-            text_results = self.manager.query(query, anns_field=anns_field, limit=limit, threshold=threshold)
-            print(f"Performing Image content search for query: {query}")
-            content_results = self.manager.query(query, anns_field="content_embedding", limit=1, threshold=0.75)
-        
-        print("Performing default searches...")
-        default_results = self.manager.perform_default_queries()
-
-        return {
-            'query': query,
-            'user_based_search': text_results,
-            'default_results': default_results,
-            'content_results': content_results
-        }
-    
-
-    async def generate_responses(self, search_result):
-        """
-        Generate responses for all sections concurrently using asyncio.
-        """
-        get_prompt = LLMPrompt()
-        response_gemini = ModelGemini()
-
-        # Create all prompts
-        prompts = {
-            "user_based": get_prompt.prompt_for_user_based_search(search_result),
-            "abstract": get_prompt.prompt_for_abstract(search_result),
-            "intro": get_prompt.prompt_for_intro(search_result),
-            "methodology": get_prompt.prompt_for_methodology(search_result),
-            "result": get_prompt.prompt_for_result(search_result),
-            "conclusion": get_prompt.prompt_for_conclusion(search_result),
-            "reference": get_prompt.prompt_for_reference(search_result),
-        }
-
-        # Run all LLM calls asynchronously
-        responses = await asyncio.gather(*[
-            response_gemini.gemini_response(prompt) for prompt in prompts.values()
-        ])
-
-        # Map responses back to section names
-        response_data = dict(zip(prompts.keys(), responses))
-
-        lit_review = await response_gemini.gemini_response(get_prompt.prompt_for_lit_review(response_data['reference']))
-
-        image_path = None
-        caption_prompt = None
-
-        for field, collection in search_result.get("content_results", {}).items():
-            if isinstance(collection, list) and collection:
-                for item in collection:
-                    if "image" in item and item["image"] and item["image"] != "No image available":
-                        image_path = item["image"]  # Pick the first valid image path
-                        caption_prompt = item.get("text", None)  # Pick the text from the same field
-                        break 
-
-        caption = ""
-        if caption_prompt:
-            caption = await response_gemini.gemini_response(get_prompt.prompt_for_caption(caption_prompt))
-
-
-        # Write to Markdown file
-        with open('./paper.md', 'w', encoding='utf-8') as data:
-            data.write("# Review Paper\n\n")
-            data.write(f"## Abstract\n{response_data['abstract']}\n\n")
-            data.write(f"## Introduction\n{response_data['intro']}\n\n")
-            data.write(f"## Litrature Review\n{lit_review}\n\n")
-            data.write(f"## Methodology\n{response_data['methodology']}\n\n")
-            data.write(f"{response_data['user_based']}\n\n")
-            if image_path != "No image available":
-                data.write(f"![Figure]({image_path})\n\n")
-                if caption:
-                    data.write(f"**Figure Caption:** {caption}\n\n")
-            data.write(f"## Results\n{response_data['result']}\n\n")
-            data.write(f"## Conclusion\n{response_data['conclusion']}\n\n")
-            data.write(f"## References\n{response_data['reference']}\n\n")
-
-async def main():
-    # Get mode, list of PDF files, and optional output directory or query
-    if len(sys.argv) < 2:
-        print("Usage:")
-        print("  Dumping to Milvus: python automation.py dump <pdf1> <pdf2> ... <output_directory>")
-        print("  Search: python automation.py search [<query>]")
-        sys.exit(1)
-
-    mode = sys.argv[1].lower()
-
-    if mode == "dump":
-        if len(sys.argv) < 4:
-            print("Usage: python automation.py dump <pdf1> <pdf2> ... <output_directory>")
-            sys.exit(1)
-
-        pdf_files = sys.argv[2:-1]
-        output_directory = sys.argv[-1]
-
-        # Initialize the automation process for dumping
-        automation = PDFToMilvusAutomation(pdf_files, output_directory)
-
-        # Process PDFs to JSON and insert into Milvus
-        automation.process_pdfs_and_dump_to_milvus()
-
-    elif mode == "search":
-        user_query = sys.argv[2] if len(sys.argv) > 2 else None
-
-        # Initialize the automation process for search
-        automation = PDFToMilvusAutomation()
-
-        # Perform vector searches
-        search_result = automation.perform_vector_search(query=user_query)
-
-        os.makedirs("./extracted", exist_ok=True)
-
-        with open('./extracted/search_result.txt','w',encoding='utf-8') as data:
-            data.write(str(search_result))
-        
-        # Generate responses concurrently using asyncio
-        await automation.generate_responses(search_result)
-
-        md_to_latex("paper.md", "latex-output/output.tex", "latex-output/output.pdf")
-
-    else:
-        print("Invalid mode. Use 'dump' for dumping to Milvus or 'search' for searching.")
-        sys.exit(1)
-
-if __name__ == "__main__":
+import asyncio
+import os
+import nest_asyncio
+import sys
+import re
+import json
+import threading
+
+from llm_prompt import LLMPrompt
+from job_manifest import JobManifest
+from parse_cache import ParseCache
+from parser import LlamaPDFParser
+from pipeline import IngestPipeline
+from retrieval import MilvusEmbeddingManager
+from ToLatex import md_to_latex
+from usegemini import ModelGemini
+
+
+
+nest_asyncio.apply()
+
+
+class PDFToMilvusAutomation:
+    def __init__(self, pdf_paths=None, output_dir=None, engine="llamaparse", layout=None, defer_indexes=False,
+                 backend=None):
+        self.pdf_paths = pdf_paths or []
+        self.output_dir = output_dir
+        self.engine = engine
+        self.manifest = None
+        # With defer_indexes, documents are only loaded during the dump and indexed once at its end
+        self.defer_indexes = defer_indexes
+        self._unindexed = set()
+        self._unindexed_lock = threading.Lock()
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self.manifest = JobManifest(self.output_dir)
+        self.manager = MilvusEmbeddingManager(layout=layout, backend=backend)
+        self.parse_cache = ParseCache()
+
+    def remove_initial_numbers(self, text):
+        return re.sub(r'^\s*[\d\.]+\s*', '', text)
+
+    def _output_paths(self, pdf_path):
+        """Returns the base name and the Markdown, JSON and image output paths for a PDF."""
+        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        md_path = os.path.join(self.output_dir, f"{base_name}.md")
+        json_path = os.path.join(self.output_dir, f"{base_name}.json")
+        image_path = os.path.join(self.output_dir, base_name)
+        return base_name, md_path, json_path, image_path
+
+    def parser_options(self):
+        """Keyword arguments shared by every LlamaPDFParser this automation creates."""
+        return {"parse_cache": self.parse_cache, "engine": self.engine}
+
+    def _begin_pdf(self, pdf_path):
+        """
+        Registers a PDF with the job manifest and returns its output paths,
+        or None when an earlier run already completed every stage for it.
+        """
+        base_name, md_path, json_path, image_path = self._output_paths(pdf_path)
+        self.manifest.begin(base_name, pdf_path)
+        if self.manifest.is_complete(base_name, json_path):
+            print(f"Skipping {pdf_path}: already dumped.")
+            return None
+        return base_name, md_path, json_path, image_path
+
+    def _needs_parse(self, base_name, json_path):
+        """Whether the PDF still has to be parsed, i.e. its JSON is missing or out of date."""
+        return not self.manifest.is_done(base_name, "json", json_path)
+
+    def _convert_to_json(self, parser, base_name, json_path):
+        """Converts a parsed PDF to JSON and records both stages."""
+        self.manifest.mark_done(base_name, "parse")
+        parser.convert_md_to_json()  # This converts the PDF to Markdown, then to JSON
+        self.manifest.mark_done(base_name, "json", json_path=json_path)
+
+    def _embed_json(self, base_name, json_path):
+        """Embeds the JSON of a PDF, or returns None when its rows are already in Milvus."""
+        if self.manifest.is_done(base_name, "insert", json_path):
+            return None
+        prepared, durable = self.manager.embed_json(json_path)
+        if prepared is None:
+            raise ValueError(f"Could not read {json_path}.")
+        # Embedding only counts as done once the vectors are on disk: in the sidecar here, or in Milvus
+        # after the insert when only the changed rows were embedded and the sidecar could not be completed
+        if durable:
+            self.manifest.mark_done(base_name, "embed")
+        return prepared
+
+    def _insert_and_index(self, base_name, json_path, prepared):
+        """Inserts embedded rows into Milvus and builds the indexes, unless the manifest has them done."""
+        if prepared is not None:
+            print(f"Inserting JSON into Milvus for {base_name}")
+            self.manager.insert_rows(*prepared)
+            if not self.manifest.is_done(base_name, "embed", json_path):
+                self.manifest.mark_done(base_name, "embed")
+            self.manifest.mark_done(base_name, "insert")
+
+        if not self.manifest.is_done(base_name, "index", json_path):
+            if self.defer_indexes:
+                with self._unindexed_lock:
+                    self._unindexed.add(base_name)
+            else:
+                self.manager.create_indexes(base_name)
+                self.manifest.mark_done(base_name, "index")
+
+    def build_deferred_indexes(self):
+        """Builds the indexes of every collection the dump loaded into, once, and records them as done."""
+        with self._unindexed_lock:
+            documents = sorted(self._unindexed)
+            self._unindexed.clear()
+        if not documents:
+            return
+
+        try:
+            self.manager.build_indexes(documents)
+        except Exception as e:
+            # Nothing is marked, so the next run of the same dump builds the indexes again
+            print(f"Error building indexes: {e}")
+            return
+
+        for base_name in documents:
+            self.manifest.mark_done(base_name, "index")
+
+    def _ingest_parsed_pdf(self, parser, base_name, json_path):
+        """
+        Converts a parsed PDF to JSON, inserts it into Milvus and builds its indexes.
+        Pass parser=None when the JSON from an earlier run is still current.
+        """
+        if parser is not None:
+            self._convert_to_json(parser, base_name, json_path)
+        self._insert_and_index(base_name, json_path, self._embed_json(base_name, json_path))
+
+    def process_pdfs_and_dump_to_milvus(self):
+        """
+        Converts each PDF to Markdown, then to JSON, and inserts the JSON into Milvus.
+        Stages recorded as done in the job manifest of the output directory are skipped.
+        """
+        if not self.output_dir:
+            raise ValueError("Output directory is required for PDF processing.")
+
+        for pdf_path in self.pdf_paths:
+            print(f"Processing: {pdf_path}")
+            try:
+                # Define output paths for Markdown and JSON
+                paths = self._begin_pdf(pdf_path)
+                if paths is None:
+                    continue
+                base_name, md_path, json_path, image_path = paths
+
+                # Parse the PDF and generate JSON
+                parser = None
+                if self._needs_parse(base_name, json_path):
+                    parser = LlamaPDFParser(pdf_path, md_path, json_path, image_path, **self.parser_options())
+                self._ingest_parsed_pdf(parser, base_name, json_path)
+
+            except Exception as e:
+                print(f"Error processing {pdf_path}: {e}")
+
+        self.build_deferred_indexes()
+
+    async def process_pdfs_and_dump_to_milvus_async(self, max_concurrency=4):
+        """
+        Submits all PDFs to LlamaParse at once, with at most max_concurrency jobs in flight.
+        Each document is converted and inserted as soon as its own parse completes.
+        """
+        if not self.output_dir:
+            raise ValueError("Output directory is required for PDF processing.")
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def parse(pdf_path):
+            async with semaphore:
+                print(f"Processing: {pdf_path}")
+                try:
+                    # Hashing the PDF and JSON reads whole files, which would stall every poll in flight
+                    paths = await asyncio.to_thread(self._begin_pdf, pdf_path)
+                    if paths is None:
+                        return pdf_path, None, None, True
+                    base_name, md_path, json_path, image_path = paths
+                    if not await asyncio.to_thread(self._needs_parse, base_name, json_path):
+                        return pdf_path, None, None, False
+
+                    parser = await LlamaPDFParser.create_async(
+                        pdf_path, md_path, json_path, image_path, **self.parser_options()
+                    )
+                    return pdf_path, parser, None, False
+                except Exception as e:
+                    return pdf_path, None, e, False
+
+        tasks = [asyncio.ensure_future(parse(pdf_path)) for pdf_path in self.pdf_paths]
+
+        for next_done in asyncio.as_completed(tasks):
+            pdf_path, parser, error, complete = await next_done
+            if error:
+                print(f"Error processing {pdf_path}: {error}")
+                continue
+            if complete:
+                continue
+
+            base_name, _, json_path, _ = self._output_paths(pdf_path)
+            try:
+                # Run the blocking embed and insert work in a thread so pending parse jobs keep polling
+                await asyncio.to_thread(self._ingest_parsed_pdf, parser, base_name, json_path)
+            except Exception as e:
+                print(f"Error processing {pdf_path}: {e}")
+
+        await asyncio.to_thread(self.build_deferred_indexes)
+
+    def process_pdfs_with_pipeline(self, parse_workers=4, embed_workers=1, insert_workers=1, queue_size=4):
+        """
+        Runs parse, embedding and Milvus insert as overlapping stages connected by bounded queues.
+        """
+        if not self.output_dir:
+            raise ValueError("Output directory is required for PDF processing.")
+
+        pipeline = IngestPipeline(
+            self,
+            parse_workers=parse_workers,
+            embed_workers=embed_workers,
+            insert_workers=insert_workers,
+            queue_size=queue_size
+        )
+        pipeline.run(self.pdf_paths)
+        self.build_deferred_indexes()
+
+    def perform_vector_search(self, query=None, anns_field="sub_heading_embedding", limit=5, threshold=0.80,
+                              documents=None, hybrid=False, ranker="rrf", fused_threshold=None):
+        """
+        Performs a vector search on the data in Milvus.
+        If no query is provided, performs default searches.
+        Pass documents to restrict every search to those documents. With hybrid, the query searches
+        several vector fields in one fused request, which also supplies the image results.
+        threshold is a cosine similarity and applies to the single-field searches; fused scores are on
+        another scale, so hybrid results are filtered by fused_threshold instead (see hybrid_query).
+        """
+        text_results = []
+        content_results = {}
+
+        # Embed the query once and share it between both searches and the default queries
+        context = self.manager.create_search_context(query)
+
+        if query and hybrid:
+            print(f"Performing hybrid search ({ranker}) for query: {query}")
+            text_results = self.manager.hybrid_query(query, limit=limit, ranker=ranker, threshold=fused_threshold,
+                                                     context=context, documents=documents)
+            # The best fused hit with a figure stands in for the separate image content search
+            content_results = {
+                collection_name: [
+                    hit for hit in hits if hit["image"] not in ("No image provided", "No image available")
+                ][:1]
+                for collection_name, hits in text_results.items()
+            }
+
+            print("Performing default searches...")
+            default_results = self.manager.perform_default_queries(context=context, documents=documents)
+        elif query and anns_field == "sub_heading_embedding":
+            # The query searches the same field as the default queries, so send them together
+            print(f"Performing content-based search and default searches for query: {query}")
+            text_results, default_results = self.manager.query_with_default_queries(
+                query, limit=limit, threshold=threshold, context=context, documents=documents
+            )
+        else:
+            if query:
+                print(f"Performing content-based search for query: {query}")
+                text_results = self.manager.query(query, anns_field=anns_field, limit=limit, threshold=threshold,
+                                                  context=context, documents=documents)
+
+            print("Performing default searches...")
+            default_results = self.manager.perform_default_queries(context=context, documents=documents)
+
+        if query and not hybrid:
+            print(f"Performing Image content search for query: {query}")
+            content_results = self.manager.query(query, anns_field="content_embedding", limit=1, threshold=0.75,
+                                                 context=context, documents=documents)
+
+        return {
+            'query': query,
+            'user_based_search': text_results,
+            'default_results': default_results,
+            'content_results': content_results
+        }
+    
+
+    async def generate_responses(self, search_result):
+        """
+        Generate responses for all sections concurrently using asyncio.
+        """
+        get_prompt = LLMPrompt()
+        response_gemini = ModelGemini()
+
+        # Create all prompts
+        prompts = {
+            "user_based": get_prompt.prompt_for_user_based_search(search_result),
+            "abstract": get_prompt.prompt_for_abstract(search_result),
+            "intro": get_prompt.prompt_for_intro(search_result),
+            "methodology": get_prompt.prompt_for_methodology(search_result),
+            "result": get_prompt.prompt_for_result(search_result),
+            "conclusion": get_prompt.prompt_for_conclusion(search_result),
+            "reference": get_prompt.prompt_for_reference(search_result),
+        }
+
+        # Run all LLM calls asynchronously
+        responses = await asyncio.gather(*[
+            response_gemini.gemini_response(prompt) for prompt in prompts.values()
+        ])
+
+        # Map responses back to section names
+        response_data = dict(zip(prompts.keys(), responses))
+
+        lit_review = await response_gemini.gemini_response(get_prompt.prompt_for_lit_review(response_data['reference']))
+
+        image_path = None
+        caption_prompt = None
+
+        for field, collection in search_result.get("content_results", {}).items():
+            if isinstance(collection, list) and collection:
+                for item in collection:
+                    if "image" in item and item["image"] and item["image"] != "No image available":
+                        image_path = item["image"]  # Pick the first valid image path
+                        caption_prompt = item.get("text", None)  # Pick the text from the same field
+                        break 
+
+        caption = ""
+        if caption_prompt:
+            caption = await response_gemini.gemini_response(get_prompt.prompt_for_caption(caption_prompt))
+
+
+        # Write to Markdown file
+        with open('./paper.md', 'w', encoding='utf-8') as data:
+            data.write("# Review Paper\n\n")
+            data.write(f"## Abstract\n{response_data['abstract']}\n\n")
+            data.write(f"## Introduction\n{response_data['intro']}\n\n")
+            data.write(f"## Litrature Review\n{lit_review}\n\n")
+            data.write(f"## Methodology\n{response_data['methodology']}\n\n")
+            data.write(f"{response_data['user_based']}\n\n")
+            if image_path != "No image available":
+                data.write(f"![Figure]({image_path})\n\n")
+                if caption:
+                    data.write(f"**Figure Caption:** {caption}\n\n")
+            data.write(f"## Results\n{response_data['result']}\n\n")
+            data.write(f"## Conclusion\n{response_data['conclusion']}\n\n")
+            data.write(f"## References\n{response_data['reference']}\n\n")
+
+def pop_flag(args, name):
+    """Removes a '--name' flag from args and returns whether it was present."""
+    if name in args:
+        args.remove(name)
+        return True
+    return False
+
+
+def pop_option(args, name, default=None):
+    """Removes a '--name value' pair from args and returns the value, or default if it is absent."""
+    if name in args:
+        index = args.index(name)
+        if index + 1 >= len(args):
+            print(f"Missing value for {name}.")
+            sys.exit(1)
+        value = args[index + 1]
+        del args[index:index + 2]
+        return value
+    return default
+
+
+def parse_worker_counts(value):
+    """Parses a '--workers P,E,I' value into three positive worker counts, or returns None if it is malformed."""
+    try:
+        counts = [int(count) for count in value.split(",")]
+    except ValueError:
+        return None
+    if len(counts) != 3 or any(count < 1 for count in counts):
+        return None
+    return counts
+
+
+def parse_concurrency(value):
+    """Parses a '--concurrency N' value into a positive count, or returns None if it is malformed."""
+    try:
+        concurrency = int(value)
+    except ValueError:
+        return None
+    return concurrency if concurrency >= 1 else None
+
+
+async def main():
+    # Get mode, list of PDF files, and optional output directory or query
+    if len(sys.argv) < 2:
+        print("Usage:")
+        print("  Dumping to Milvus: python automation.py dump [--engine llamaparse|local] [--layout per_pdf|corpus] [--backend milvus|local] [--defer-index] [--concurrency N | --pipeline [--workers P,E,I]] <pdf1> <pdf2> ... <output_directory>")
+        print("  Search: python automation.py search [--layout per_pdf|corpus] [--backend milvus|local] [--documents doc1,doc2] [--hybrid [--ranker rrf|weighted]] [<query>]")
+        print("  Migrating to one corpus collection: python automation.py migrate [--backend milvus|local] [--drop]")
+        sys.exit(1)
+
+    mode = sys.argv[1].lower()
+
+    if mode == "dump":
+        args = sys.argv[2:]
+        engine = pop_option(args, "--engine", "llamaparse")
+        layout = pop_option(args, "--layout")
+        backend = pop_option(args, "--backend")
+        defer_indexes = pop_flag(args, "--defer-index")
+        concurrency_option = pop_option(args, "--concurrency")
+        concurrency = parse_concurrency("1" if concurrency_option is None else concurrency_option)
+        use_pipeline = pop_flag(args, "--pipeline")
+        # Worker counts for the parse, embed and insert stages of the pipeline
+        workers = parse_worker_counts(pop_option(args, "--workers", "4,1,1"))
+        # The pipeline sizes its parse stage with --workers, so --concurrency would have no effect
+        conflicting = use_pipeline and concurrency_option is not None
+
+        if workers is None or concurrency is None or conflicting or len(args) < 2:
+            if workers is None:
+                print("--workers takes three positive counts: parse, embed and insert workers, e.g. 4,1,1.")
+            if concurrency is None:
+                print("--concurrency takes a positive number of parse jobs, e.g. 4.")
+            if conflicting:
+                print("--concurrency cannot be combined with --pipeline; set parse workers with --workers.")
+            print("Usage: python automation.py dump [--engine llamaparse|local] [--layout per_pdf|corpus] [--backend milvus|local] [--defer-index] [--concurrency N | --pipeline [--workers P,E,I]] <pdf1> <pdf2> ... <output_directory>")
+            sys.exit(1)
+
+        pdf_files = args[:-1]
+        output_directory = args[-1]
+
+        # Initialize the automation process for dumping
+        automation = PDFToMilvusAutomation(pdf_files, output_directory, engine=engine, layout=layout,
+                                           defer_indexes=defer_indexes, backend=backend)
+
+        # Process PDFs to JSON and insert into Milvus
+        if use_pipeline:
+            automation.process_pdfs_with_pipeline(*workers)
+        elif concurrency > 1:
+            await automation.process_pdfs_and_dump_to_milvus_async(max_concurrency=concurrency)
+        else:
+            automation.process_pdfs_and_dump_to_milvus()
+
+    elif mode == "search":
+        args = sys.argv[2:]
+        layout = pop_option(args, "--layout")
+        backend = pop_option(args, "--backend")
+        documents = pop_option(args, "--documents")
+        hybrid = pop_flag(args, "--hybrid")
+        ranker = pop_option(args, "--ranker", "rrf")
+        user_query = args[0] if args else None
+
+        # Initialize the automation process for search
+        automation = PDFToMilvusAutomation(layout=layout, backend=backend)
+
+        # Perform vector searches
+        search_result = automation.perform_vector_search(query=user_query,
+                                                         documents=documents.split(",") if documents else None,
+                                                         hybrid=hybrid, ranker=ranker)
+
+        os.makedirs("./extracted", exist_ok=True)
+
+        with open('./extracted/search_result.txt','w',encoding='utf-8') as data:
+            data.write(str(search_result))
+        
+        # Generate responses concurrently using asyncio
+        await automation.generate_responses(search_result)
+
+        md_to_latex("paper.md", "latex-output/output.tex", "latex-output/output.pdf")
+
+    elif mode == "migrate":
+        args = sys.argv[2:]
+        backend = pop_option(args, "--backend")
+        drop_source = pop_flag(args, "--drop")
+
+        # Copy the per-PDF collections into the shared corpus collection
+        automation = PDFToMilvusAutomation(layout="corpus", backend=backend)
+        automation.manager.migrate_to_corpus(drop_source=drop_source)
+
+    else:
+        print("Invalid mode. Use 'dump' for dumping to Milvus, 'search' for searching or 'migrate' for "
+              "moving to a corpus collection.")
+        sys.exit(1)
+
+if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,229 @@
+import json
+import os
+import re
+import threading
+import time
+
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_models import DEFAULT_EMBEDDING_MODEL, EMBEDDING_DIM, get_embedding_model
+
+# Shared, read-only zero vector returned for empty strings instead of allocating a new one each time
+ZERO_EMBEDDING = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+ZERO_EMBEDDING.setflags(write=False)
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def normalize_text(text):
+    """Cache key of a text: whitespace is collapsed so the same heading with different spacing shares one entry."""
+    return " ".join(text.split()) if text else ""
+
+
+class EmbeddingCache:
+    """
+    In-process LRU cache of embeddings keyed by normalized text, one instance per model.
+    The model always encodes the original text; only the cache key is normalized.
+
+    With cache_dir set, embeddings are also persisted as shards of .npy arrays (plus a JSON list
+    of their keys) and read back through memory maps, so repeated strings are encoded once per
+    corpus rather than once per process. Each save adds a shard, and shards are merged as they
+    accumulate, so the number of files stays logarithmic in the number of entries.
+    """
+
+    def __init__(self, model_name=DEFAULT_EMBEDDING_MODEL, max_entries=None, cache_dir=None, max_shards=None):
+        self.model_name = model_name
+        self.max_entries = max_entries or int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+        self.max_shards = max_shards or int(os.getenv("EMBEDDING_CACHE_MAX_SHARDS", "16"))
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.cache_dir = None
+        # key -> (shard name, row), and shard name -> (memory-mapped vectors, keys) in save order
+        self.disk_index = {}
+        self.shards = OrderedDict()
+        self.pending = OrderedDict()
+        if cache_dir:
+            # One sub-folder per model, since vectors of different models are not interchangeable
+            self.cache_dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._load_shards()
+
+    def _load_shards(self):
+        for name in sorted(os.listdir(self.cache_dir)):
+            if not name.endswith(".npy"):
+                continue
+            name = name[:-4]
+            try:
+                with open(os.path.join(self.cache_dir, name + ".json"), "r", encoding="utf-8") as file:
+                    keys = json.load(file)
+                vectors = np.load(os.path.join(self.cache_dir, name + ".npy"), mmap_mode="r")
+            except (OSError, ValueError):
+                # Half-written, or just merged away by another process sharing the folder
+                continue
+            self._add_shard(name, vectors, keys)
+
+        # Shards written by many separate processes are never merged on save, so merge them here
+        if len(self.shards) > self.max_shards:
+            self._merge_shards(list(self.shards))
+
+    def _add_shard(self, name, vectors, keys):
+        self.shards[name] = (vectors, keys)
+        for row, key in enumerate(keys):
+            self.disk_index[key] = (name, row)
+
+    def _write_shard(self, keys, vectors):
+        """Write a shard and return its name. Keys are written last so a half-written shard is skipped on load."""
+        # Time and process id keep shard names unique when several dump processes share the folder
+        name = f"shard-{time.time_ns()}-{os.getpid()}"
+        np.save(os.path.join(self.cache_dir, name + ".npy"), vectors)
+        with open(os.path.join(self.cache_dir, name + ".json"), "w", encoding="utf-8") as file:
+            json.dump(keys, file)
+        return name
+
+    def _merge_shards(self, names):
+        """Replace the given shards with one shard holding their current entries, then delete their files."""
+        merged_keys, merged_vectors = [], []
+        for name in names:
+            vectors, keys = self.shards[name]
+            for row, key in enumerate(keys):
+                # A key saved again later lives in a newer shard; only its current location is kept
+                if self.disk_index.get(key) == (name, row):
+                    merged_keys.append(key)
+                    merged_vectors.append(vectors[row])
+
+        merged = self._write_shard(merged_keys, np.stack(merged_vectors) if merged_vectors
+                                   else np.zeros((0, EMBEDDING_DIM), dtype=np.float32))
+        for name in names:
+            del self.shards[name]
+        self._add_shard(merged, np.load(os.path.join(self.cache_dir, merged + ".npy"), mmap_mode="r"), merged_keys)
+
+        for name in names:
+            for extension in (".json", ".npy"):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name + extension))
+                except OSError:
+                    # Windows refuses to delete a file that is still memory-mapped
+                    pass
+
+    def _get(self, key):
+        vector = self.entries.get(key)
+        if vector is not None:
+            self.entries.move_to_end(key)
+            return vector
+
+        location = self.disk_index.get(key)
+        if location is not None:
+            shard, row = location
+            vector = self.shards[shard][0][row]
+            self._remember(key, vector)
+            return vector
+
+        return self.pending.get(key)
+
+    def _remember(self, key, vector):
+        self.entries[key] = vector
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def encode(self, texts, batch_size=32):
+        """
+        Returns an array of shape (len(texts), EMBEDDING_DIM). Empty texts get zero vectors and each
+        distinct uncached text is encoded exactly once, however often it repeats in texts. Texts that
+        only differ in whitespace share a key, and the first of them is the one encoded.
+        """
+        embeddings = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        # key -> (text to encode, positions in texts)
+        missing = OrderedDict()
+
+        with self._lock:
+            for position, text in enumerate(texts):
+                if not text:
+                    continue
+                key = normalize_text(text)
+                if key in missing:
+                    missing[key][1].append(position)
+                    self.hits += 1
+                    continue
+                vector = self._get(key)
+                if vector is not None:
+                    embeddings[position] = vector
+                    self.hits += 1
+                else:
+                    missing[key] = (text, [position])
+                    self.misses += 1
+
+        if missing:
+            # The model is only loaded when something actually needs encoding
+            model = get_embedding_model(self.model_name)
+            keys = list(missing)
+            encoded = np.asarray(model.encode([missing[key][0] for key in keys], batch_size=batch_size,
+                                              convert_to_numpy=True), dtype=np.float32)
+
+            with self._lock:
+                for key, vector in zip(keys, encoded):
+                    embeddings[missing[key][1]] = vector
+                    vector = vector.copy()
+                    self._remember(key, vector)
+                    if self.cache_dir and key not in self.disk_index:
+                        self.pending[key] = vector
+
+        return embeddings
+
+    def encode_one(self, text):
+        """Embedding of a single text; empty text returns the shared zero vector."""
+        if not text:
+            return ZERO_EMBEDDING
+        return self.encode([text])[0]
+
+    def save(self):
+        """
+        Write embeddings computed since the last save to a new on-disk shard. While the newest shard is
+        at least as large as the one before it, the two are merged, like carries in a binary counter.
+        """
+        with self._lock:
+            if not self.cache_dir or not self.pending:
+                return 0
+
+            keys = list(self.pending)
+            name = self._write_shard(keys, np.stack([self.pending[key] for key in keys]))
+            self._add_shard(name, np.load(os.path.join(self.cache_dir, name + ".npy"), mmap_mode="r"), keys)
+            self.pending.clear()
+
+            while len(self.shards) > 1:
+                previous, newest = list(self.shards)[-2:]
+                if len(self.shards[newest][1]) < len(self.shards[previous][1]):
+                    break
+                self._merge_shards([previous, newest])
+            return len(keys)
+
+    def stats(self):
+        """Hit/miss counters and sizes of the memory and disk tiers."""
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self.entries),
+            "disk_entries": len(self.disk_index),
+        }
+
+
+def get_embedding_cache(model_name=DEFAULT_EMBEDDING_MODEL):
+    """
+    Returns the process-wide embedding cache for a model. The on-disk tier is enabled
+    when the EMBEDDING_CACHE_DIR environment variable is set.
+    """
+    with _caches_lock:
+        cache = _caches.get(model_name)
+        if cache is None:
+            cache = EmbeddingCache(model_name, cache_dir=os.getenv("EMBEDDING_CACHE_DIR"))
+            _caches[model_name] = cache
+        return cache
@@ -0,0 +1,30 @@
+import threading
+
+
+DEFAULT_EMBEDDING_MODEL = "embaas/sentence-transformers-e5-large-v2"
+EMBEDDING_DIM = 1024
+
+_models = {}
+_lock = threading.Lock()
+
+
+def get_embedding_model(model_name=DEFAULT_EMBEDDING_MODEL):
+    """
+    Returns the process-wide SentenceTransformer for the given model name.
+    The model is loaded on first use and shared by every caller afterwards.
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _lock:
+        # Another thread may have loaded the model while we waited for the lock
+        model = _models.get(model_name)
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+
+            print(f"Loading embedding model '{model_name}'.")
+            model = SentenceTransformer(model_name)
+            _models[model_name] = model
+
+    return model
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from atomic_files import write_json_atomic
+from embedding_models import EMBEDDING_DIM
+
+
+def sidecar_path(json_file):
+    """Path of the sidecar metadata that sits next to a document JSON file."""
+    base, _ = os.path.splitext(json_file)
+    return f"{base}.embeddings.json"
+
+
+def row_digest(row):
+    """Digest of the four texts a row's vectors are computed from, to tell whether stored vectors are current."""
+    texts = "\x00".join((row["main_title"], row["section_title"], row["sub_heading"], row["content"]))
+    return hashlib.blake2b(texts.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class EmbeddingSidecar:
+    """
+    Embeddings of one document, stored next to its JSON as an (n, 4, EMBEDDING_DIM) float32 .npy array
+    plus a JSON file with the model name, the array file name and the row id and text digest of every
+    array row. The array is opened as a memory map, so reading it copies nothing until rows are used.
+    """
+
+    def __init__(self, json_file, model_name):
+        self.meta_path = sidecar_path(json_file)
+        self.directory = os.path.dirname(self.meta_path) or "."
+        self.model_name = model_name
+        self.array_path = None
+        self.vectors = None
+        self.positions = {}
+
+        meta = self._load_meta()
+        if meta is None:
+            return
+        self.array_path = os.path.join(self.directory, meta["array"])
+        try:
+            vectors = np.load(self.array_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable embedding sidecar {self.array_path}: {e}")
+            return
+        if vectors.shape != (len(meta["ids"]), 4, EMBEDDING_DIM):
+            print(f"Ignoring embedding sidecar {self.array_path}: shape {vectors.shape} does not match its metadata.")
+            return
+
+        self.vectors = vectors
+        self.positions = {
+            (row_id, digest): position for position, (row_id, digest) in enumerate(zip(meta["ids"], meta["digests"]))
+        }
+
+    def _load_meta(self):
+        if not os.path.exists(self.meta_path):
+            return None
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable embedding sidecar {self.meta_path}: {e}")
+            return None
+        # Vectors of another model are not comparable, so they are never reused
+        if meta.get("model") != self.model_name:
+            return None
+        return meta
+
+    def position(self, row):
+        """Array row holding the current vectors of a row, or None if they are missing or outdated."""
+        return self.positions.get((row["id"], row_digest(row)))
+
+    def lookup(self, rows):
+        """
+        Vectors for rows, or None if any of them is missing. When rows are exactly the stored rows in order,
+        the memory map itself is returned without copying.
+        """
+        positions = [self.position(row) for row in rows]
+        if self.vectors is None or any(position is None for position in positions):
+            return None
+        if positions == list(range(len(self.vectors))):
+            return self.vectors
+        return np.asarray(self.vectors[positions])
+
+    def save(self, rows, vectors):
+        """Replace the sidecar with vectors for rows, then reopen it as a memory map."""
+        base = os.path.basename(self.meta_path)[:-len(".json")]
+        # Every version gets its own array file and the metadata names it, so replacing the metadata
+        # switches to the new vectors atomically and a crash never pairs it with another array
+        array_name = f"{base}-{time.time_ns()}-{os.getpid()}.npy"
+        array_path = os.path.join(self.directory, array_name)
+        np.save(array_path, np.asarray(vectors, dtype=np.float32))
+
+        write_json_atomic(self.meta_path, {
+            "model": self.model_name,
+            "array": array_name,
+            "ids": [row["id"] for row in rows],
+            "digests": [row_digest(row) for row in rows],
+        })
+
+        old_array_path = self.array_path
+        self.array_path = array_path
+        self.vectors = np.load(array_path, mmap_mode="r")
+        self.positions = {(row["id"], row_digest(row)): position for position, row in enumerate(rows)}
+
+        if old_array_path and old_array_path != array_path:
+            try:
+                os.remove(old_array_path)
+            except OSError as e:
+                # Windows refuses to delete a file that is still memory-mapped
+                print(f"Could not remove old embedding sidecar {old_array_path}: {e}")
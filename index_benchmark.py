@@ -0,0 +1,143 @@
+import sys
+import time
+import uuid
+
+import numpy as np
+from pymilvus import CollectionSchema, FieldSchema, DataType, Collection, utility
+
+from retrieval import (BufferedInserter, INDEX_TYPES, VECTOR_DTYPES, MilvusEmbeddingManager, as_vector)
+
+
+def read_vectors(manager, collection_name, field, batch_size=1000):
+    """All ids and vectors of one field of a collection, as float32."""
+    collection = manager.ensure_loaded(collection_name)
+    ids, vectors = [], []
+
+    iterator = collection.query_iterator(batch_size=batch_size, expr="id >= 0", output_fields=["id", field])
+    try:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                break
+            for entity in batch:
+                ids.append(entity["id"])
+                vectors.append(as_vector(entity[field]))
+    finally:
+        iterator.close()
+
+    return np.array(ids, dtype=np.int64), np.stack(vectors)
+
+
+def exact_top_k(vectors, queries, k):
+    """Ground truth: row positions of the k highest inner products for each query."""
+    scores = queries @ vectors.T
+    top = np.argpartition(-scores, min(k, len(vectors) - 1), axis=1)[:, :k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+
+def scratch_collection_name(collection_name, vector_dtype):
+    """Name for a throwaway collection; the random suffix keeps it clear of existing collections and other runs."""
+    return f"{collection_name}_bench_{vector_dtype}_{uuid.uuid4().hex[:8]}"
+
+
+def create_scratch_collection(name, vectors, ids, vector_dtype):
+    """Copy of one vector field into a throwaway collection with the given storage type."""
+    if utility.has_collection(name):
+        # Never drop a collection the benchmark did not create
+        raise ValueError(f"Collection '{name}' already exists; pick another scratch collection name.")
+
+    vector_type, numpy_dtype = VECTOR_DTYPES[vector_dtype]
+    schema = CollectionSchema([
+        FieldSchema(name="id", dtype=DataType.INT64, is_primary=True),
+        FieldSchema(name="vector", dtype=vector_type, dim=vectors.shape[1]),
+    ], description="Index benchmark scratch collection")
+    collection = Collection(name=name, schema=schema)
+
+    inserter = BufferedInserter(collection)
+    for row_id, vector in zip(ids, vectors.astype(numpy_dtype)):
+        inserter.add([int(row_id), vector])
+    inserter.flush()
+    collection.flush()
+    return collection
+
+
+def benchmark_index(collection, index_type, queries, truth_ids, k, numpy_dtype):
+    """Build one index type and measure recall@k, search latency and loaded memory."""
+    collection.release()
+    for index in collection.indexes:
+        collection.drop_index(index_name=index.index_name)
+
+    build_params, search_params = INDEX_TYPES[index_type]
+    start = time.perf_counter()
+    collection.create_index("vector", {"index_type": index_type, "metric_type": "IP", "params": build_params})
+    utility.wait_for_index_building_complete(collection.name)
+    build_seconds = time.perf_counter() - start
+
+    collection.load()
+    latencies, recalls = [], []
+    for query, truth in zip(queries, truth_ids):
+        start = time.perf_counter()
+        hits = collection.search(data=[query.astype(numpy_dtype)], anns_field="vector",
+                                 param={"metric_type": "IP", "params": search_params}, limit=k)[0]
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len({hit.id for hit in hits} & set(truth)) / len(truth))
+
+    memory_bytes = sum(segment.mem_size for segment in utility.get_query_segment_info(collection.name))
+    return {
+        "recall": float(np.mean(recalls)),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "build_s": build_seconds,
+        "memory_mb": memory_bytes / 1024 ** 2,
+    }
+
+
+def run_benchmark(collection_name, field="content_embedding", query_count=100, k=10,
+                  index_types=tuple(INDEX_TYPES), vector_dtypes=tuple(VECTOR_DTYPES)):
+    # Index types only exist on Milvus; the local backend always searches exactly
+    manager = MilvusEmbeddingManager(backend="milvus")
+    ids, vectors = read_vectors(manager, collection_name, field)
+
+    # Zero vectors (empty headings) score 0 against everything and make meaningless queries
+    candidates = np.flatnonzero(np.linalg.norm(vectors, axis=1) > 0)
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(candidates, size=min(query_count, len(candidates)), replace=False)
+    queries = vectors[query_rows]
+    truth_ids = ids[exact_top_k(vectors, queries, k)]
+
+    print(f"'{collection_name}'.{field}: {len(ids)} rows, {len(queries)} queries, recall@{k} against exact search.")
+    if len(ids) < 1024:
+        print("Note: Milvus searches segments below 1024 rows without their index, so small collections "
+              "show brute-force numbers.")
+
+    results = []
+    for vector_dtype in vector_dtypes:
+        scratch_name = scratch_collection_name(collection_name, vector_dtype)
+        collection = create_scratch_collection(scratch_name, vectors, ids, vector_dtype)
+        try:
+            for index_type in index_types:
+                stats = benchmark_index(collection, index_type, queries, truth_ids, k, VECTOR_DTYPES[vector_dtype][1])
+                results.append((vector_dtype, index_type, stats))
+                print(f"  {vector_dtype:8} {index_type:9} recall {stats['recall']:.3f}  "
+                      f"p50 {stats['p50_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms  "
+                      f"build {stats['build_s']:.1f} s  memory {stats['memory_mb']:.1f} MB")
+        finally:
+            collection.release()
+            utility.drop_collection(scratch_name)
+
+    return results
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        print("Usage: python index_benchmark.py <collection> [field] [queries] [k]")
+        sys.exit(1)
+
+    run_benchmark(
+        args[0],
+        field=args[1] if len(args) > 1 else "content_embedding",
+        query_count=int(args[2]) if len(args) > 2 else 100,
+        k=int(args[3]) if len(args) > 3 else 10,
+    )
@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+
+from atomic_files import write_json_atomic
+from parse_cache import ParseCache
+
+
+# Stages of a dump, in the order they run for each PDF
+STAGES = ("parse", "json", "embed", "insert", "index")
+
+
+class JobManifest:
+    """
+    Progress record of a dump job, stored as JSON in the output directory.
+    For every PDF it keeps the hash of the PDF, the hash of the JSON it produced and the stages that
+    completed, so a restarted dump can skip finished work. A changed PDF starts over from parse, and
+    a changed JSON file invalidates the stages that were built from it.
+    """
+
+    FILE_NAME = "dump_manifest.json"
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, self.FILE_NAME)
+        self._lock = threading.Lock()
+        self.documents = self._load()
+        # JSON path -> ((modification time, size), hash), since every stage check compares the JSON hash
+        self._json_hashes = {}
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file).get("documents", {})
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable job manifest {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        write_json_atomic(self.path, {"stages": list(STAGES), "documents": self.documents}, indent=4)
+
+    def _json_hash(self, json_path):
+        """Hash of a JSON file, computed again only when its modification time or size changed."""
+        stat = os.stat(json_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._json_hashes.get(json_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        json_hash = ParseCache.hash_file(json_path)
+        with self._lock:
+            self._json_hashes[json_path] = (signature, json_hash)
+        return json_hash
+
+    def begin(self, base_name, pdf_path):
+        """Register a PDF for this run, resetting its progress if the PDF changed since it was recorded."""
+        pdf_hash = ParseCache.hash_file(pdf_path)
+        with self._lock:
+            entry = self.documents.get(base_name)
+            if entry is None or entry.get("pdf_hash") != pdf_hash:
+                self.documents[base_name] = {"pdf": pdf_path, "pdf_hash": pdf_hash, "json_hash": None, "stages": {}}
+                self._save()
+
+    def is_done(self, base_name, stage, json_path=None):
+        """
+        Whether a stage completed for a document. Stages from json on also require the JSON file on
+        disk to be the one they were recorded with, when json_path is given.
+        """
+        with self._lock:
+            entry = self.documents.get(base_name)
+            if entry is None or stage not in entry["stages"]:
+                return False
+            json_hash = entry["json_hash"]
+
+        if json_path is not None and STAGES.index(stage) >= STAGES.index("json"):
+            try:
+                return self._json_hash(json_path) == json_hash
+            except OSError:
+                return False
+        return True
+
+    def is_complete(self, base_name, json_path=None):
+        """Whether every stage completed for a document."""
+        with self._lock:
+            entry = self.documents.get(base_name)
+            if entry is None or any(stage not in entry["stages"] for stage in STAGES):
+                return False
+        return self.is_done(base_name, "index", json_path)
+
+    def mark_done(self, base_name, stage, json_path=None):
+        """Record a completed stage. Marking json with a new JSON file clears the stages built on the old one."""
+        json_hash = self._json_hash(json_path) if stage == "json" else None
+        with self._lock:
+            entry = self.documents[base_name]
+            if stage == "json":
+                if entry["json_hash"] != json_hash:
+                    for later in STAGES[STAGES.index("json") + 1:]:
+                        entry["stages"].pop(later, None)
+                entry["json_hash"] = json_hash
+            entry["stages"][stage] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            self._save()
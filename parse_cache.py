@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+
+from atomic_files import write_json_atomic
+
+
+class ParseCache:
+    """
+    On-disk cache for parsed PDFs, keyed by the SHA-256 of the PDF bytes and the parser settings.
+    Each entry stores the returned Markdown and the extracted image metadata as one JSON file.
+    When the cache grows past max_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or os.getenv(
+            "PARSE_CACHE_DIR",
+            os.path.join(os.path.expanduser("~"), ".cache", "docfusion", "parse")
+        )
+        self.max_bytes = max_bytes or int(os.getenv("PARSE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_file(path, chunk_size=1024 * 1024):
+        """SHA-256 of a file, read in chunks so large PDFs are not loaded at once."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def make_key(self, pdf_path, settings):
+        """Build the cache key from the PDF content and the settings that affect the parse result."""
+        digest = hashlib.sha256()
+        digest.update(self.hash_file(pdf_path).encode("utf-8"))
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached entry for key, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        # Touch the entry so eviction treats it as recently used
+        os.utime(path)
+        return entry
+
+    def put(self, key, markdown, images_with_caption):
+        """Store a parse result and evict old entries if the cache is over its size limit."""
+        entry = {"markdown": markdown, "images_with_caption": images_with_caption}
+
+        write_json_atomic(self._entry_path(key), entry)
+
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total_bytes = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+
+        entries.sort()
+        # Always keep the newest entry, even if it alone exceeds the limit
+        for _, size, path in entries[:-1]:
+            if total_bytes <= self.max_bytes:
+                break
+            os.remove(path)
+            total_bytes -= size
@@ -1,340 +1,646 @@
-import fitz
-import json
-import os
-import nest_asyncio
-import re
-
-from dotenv import load_dotenv
-from llama_parse import LlamaParse
-# from llama_index.embeddings.nvidia import NVIDIAEmbedding
-from sentence_transformers import SentenceTransformer
-
-
-nest_asyncio.apply()
-
-
-class LlamaPDFParser:
-    def __init__(self, pdf_path, output_md_path, output_json_path, image_output_folder):
-        load_dotenv()
-        self.api_key = os.getenv("LLAMA_CLOUD_API_KEY")
-        # self.nim_api_key = os.getenv("NIM_API_KEY")
-        if not self.api_key:
-            raise ValueError("API key for Llama Cloud is not set in the .env file.")
-        os.environ["LLAMA_CLOUD_API_KEY"] = self.api_key
-        # os.environ["NIM_API_KEY"] = self.nim_api_key
-
-        # self.embedding_model = NVIDIAEmbedding(
-        #     model="nvidia/nv-embedqa-e5-v5",
-        #     truncate="END",
-        #     api_key=self.nim_api_key
-        # )
-        self.embedding_model = SentenceTransformer('embaas/sentence-transformers-e5-large-v2')
-
-        self.pdf_path = pdf_path
-        self.output_md_path = output_md_path
-        self.output_json_path = output_json_path
-        self.image_output_path = image_output_folder
-        self.documents, self.images_with_caption = self._parse_pdf_to_markdown()
-
-    def _clean_heading(self, heading):
-        """Helper function to clean and normalize headings."""
-        return heading.strip("# ").strip()
-
-    def _parse_pdf_to_markdown(self):
-        """
-        Parses the input PDF file using LlamaParse and saves it as a Markdown file.
-        """
-        parser = LlamaParse(
-            result_type="markdown",
-            premium_mode=True,
-        )
-        try:
-            # Load data from the PDF (returns a list of Document objects)
-            documents = parser.load_data(self.pdf_path)
-            if not documents:
-                raise ValueError("No data was parsed from the provided PDF.")
-
-            # Extract text from each document object and join them into a single string
-            markdown_content = "\n\n".join([doc.text for doc in documents])  # Assuming each 'doc' has a 'text' attribute
-            
-            # Save Markdown content to a file
-            os.makedirs(os.path.dirname(self.output_md_path), exist_ok=True)
-            with open(self.output_md_path, "w", encoding="utf-8") as md_file:
-                md_file.write(markdown_content)
-
-            images_with_caption = self._extract_images_with_captions()
-
-            # Append images to Markdown file
-            with open(self.output_md_path, "a", encoding="utf-8") as md_file:
-                for img in images_with_caption:
-                    md_file.write(f"\n![Image]({img['metadata']['image']})\n")
-                    md_file.write(f"\n**Caption:** {img['metadata']['caption']}\n\n")            
-            
-            return markdown_content, images_with_caption  # Return the Markdown content as a string
-        except Exception as e:
-            raise ValueError(f"Error parsing PDF: {e}")
-        
-
-    def parse_all_images(self, filename, page, pagenum, text_blocks):
-        """Extract images from a PDF page."""
-        image_docs = []
-        image_info_list = page.get_image_info(xrefs=True)
-        page_rect = page.rect
-
-        for image_info in image_info_list:
-            xref = image_info['xref']
-            if xref == 0:
-                continue
-
-            img_bbox = fitz.Rect(image_info['bbox'])
-            if img_bbox.width < page_rect.width / 20 or img_bbox.height < page_rect.height / 20:
-                continue
-
-            extracted_image = page.parent.extract_image(xref)
-            image_data = extracted_image["image"]
-            imgrefpath = os.path.join(os.getcwd(), f"{filename}")
-            os.makedirs(imgrefpath, exist_ok=True)
-            image_path = os.path.join(imgrefpath, f"image{xref}-page{pagenum}.png")
-            with open(image_path, "wb") as img_file:
-                img_file.write(image_data)
-            before_text, after_text = self.extract_text_around_item(text_blocks, img_bbox, page.rect.height)
-            if before_text == "" and after_text == "":
-                continue
-
-            image_description = " "
-
-            caption = before_text.replace("\n", " ") + image_description + after_text.replace("\n", " ")
-
-            image_metadata = {
-                "source": f"{filename}-page{pagenum}-image{xref}",
-                "image": image_path,
-                "caption": caption,
-                "type": "image",
-                "page_num": pagenum
-            }
-            image_docs.append({
-                "text": "This is an image with the caption: " + caption,
-                "metadata": image_metadata
-            })
-            
-            # breakpoint()
-
-        return image_docs
-
-
-    def _extract_images_with_captions(self):
-        """
-        Extracts images from the PDF with captions and saves them to a folder.
-        Returns a list of image documents with metadata.
-        """
-        os.makedirs(self.image_output_path, exist_ok=True)
-        doc = fitz.open(self.pdf_path)
-        image_docs = []
-
-        for page_num, page in enumerate(doc):
-            text_blocks = page.get_text("blocks")
-            image_docs.extend(self.parse_all_images(self.image_output_path, page, page_num + 1, text_blocks))
-
-        return image_docs
-    
-    
-    
-    def extract_text_around_item(self, text_blocks, bbox, page_height, threshold_percentage=0.1):
-        """Extract text above and below a given bounding box on a page."""
-        before_text, after_text = "", ""
-        vertical_threshold_distance = page_height * threshold_percentage
-        horizontal_threshold_distance = bbox.width * threshold_percentage
-
-        for block in text_blocks:
-            block_bbox = fitz.Rect(block[:4])
-            vertical_distance = min(abs(block_bbox.y1 - bbox.y0), abs(block_bbox.y0 - bbox.y1))
-            horizontal_overlap = max(0, min(block_bbox.x1, bbox.x1) - max(block_bbox.x0, bbox.x0))
-
-            if vertical_distance <= vertical_threshold_distance and horizontal_overlap >= -horizontal_threshold_distance:
-                if block_bbox.y1 < bbox.y0 and not before_text:
-                    before_text = block[4]
-                elif block_bbox.y0 > bbox.y1 and not after_text:
-                    after_text = block[4]
-                    break
-
-        return before_text, after_text
-
-
-
-    def _parse_markdown_to_json(self, md_content):
-        """Parse Markdown file into a hierarchical JSON format."""
-        main_title = ""
-        hierarchy = {}
-        current_levels = []
-
-        for line in md_content.splitlines():
-            # Match for main title (only the first # heading)
-            if re.match(r"^# ", line):
-                if not main_title:  # Capture the first main title
-                    main_title = self._clean_heading(line)
-                continue
-
-            # Match for section and subheadings
-            heading_match = re.match(r"^(#+) (.+)", line)
-            if heading_match:
-                level = len(heading_match.group(1))  # Determine heading level
-                heading_text = heading_match.group(2)
-
-                # Adjust the current level hierarchy
-                while len(current_levels) >= level:
-                    current_levels.pop()
-                current_levels.append(heading_text)
-
-                # Build metadata for the current section
-                metadata = {
-                    "main title": main_title,
-                    "section title": current_levels[0] if len(current_levels) > 0 else "",
-                    "sub heading": current_levels[1] if len(current_levels) > 1 else "",
-                }
-
-                # Navigate to the appropriate level in the hierarchy
-                current_level = hierarchy
-                for lvl in current_levels[:-1]:
-                    current_level = current_level.setdefault(lvl, {"content": "", "subheadings": {}})["subheadings"]
-
-                # Create a new entry for the current heading
-                if current_levels[-1] not in current_level:
-                    current_level[current_levels[-1]] = {"content": "", "metadata": metadata, "subheadings": {}}
-
-            else:
-                # Add content to the most recent heading
-                if current_levels:
-                    current_level = hierarchy
-                    for lvl in current_levels[:-1]:
-                        current_level = current_level[lvl]["subheadings"]
-                    if current_levels[-1] not in current_level:
-                        current_level[current_levels[-1]] = {
-                            "content": "",
-                            "metadata": {
-                                "main title": main_title,
-                                "section title": current_levels[0] if len(current_levels) > 0 else "",
-                                "sub heading": current_levels[1] if len(current_levels) > 1 else ""
-                            },
-                            "subheadings": {}
-                        }
-                    current_level[current_levels[-1]]["content"] += line.strip() + "\n"
-
-        return hierarchy
-
-    def _format_hierarchy_to_json(self, hierarchy):
-        """Recursive function to format the hierarchy into the desired JSON structure."""
-        json_list = []
-        for key, value in hierarchy.items():
-            json_obj = {
-                "content": value["content"].strip(),
-                "metadata": value.get("metadata", {}),
-                "embeddings-Main-Headding": "",
-                "embeddings-Section-Headding": "",
-                "embeddings-Sub-Headding": "",
-                "subheadings": self._format_hierarchy_to_json(value["subheadings"]),
-            }
-            json_list.append(json_obj)
-        return json_list
-
-    def convert_md_to_json(self):
-        """Convert Markdown file to JSON and save it to a file."""
-        md_content = self.documents
-        hierarchy = self._parse_markdown_to_json(md_content)
-        formatted_json = self._format_hierarchy_to_json(hierarchy)
-
-        # Add images to JSON
-        for img in self.images_with_caption:
-            formatted_json.append({
-                "content": f"Image with caption: {img['metadata']['caption']}",
-                "metadata": img["metadata"],
-                "embeddings-Main-Headding": "",
-                "embeddings-Section-Headding": "",
-                "embeddings-Sub-Headding": "",
-                "subheadings": []
-            })
-
-        # Save JSON to a file
-        os.makedirs(os.path.dirname(self.output_json_path), exist_ok=True)
-        with open(self.output_json_path, "w", encoding="utf-8") as json_file:
-            json.dump(formatted_json, json_file, indent=4)
-
-        print(f"Markdown and JSON files saved to {self.output_md_path} and {self.output_json_path}.")
-
-    def split_heading_wise(self):
-        """Splits the parsed Markdown document into a hierarchical structure."""
-        return self._parse_markdown_to_json(self.documents)
-
-    def save_cleaned_data(self, output_path):
-        """
-        Saves the cleaned and merged data to a Markdown file with proper hierarchical structure.
-        """
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        cleaned_data = self.split_heading_wise()
-
-        def write_section(md_file, data, level=1):
-            """Recursively writes sections and sub-sections to the Markdown file."""
-            for heading, content in data.items():
-                md_file.write(f"{'#' * level} {heading}\n\n")
-                if isinstance(content, dict) and "content" in content:
-                    md_file.write(f"{content['content']}\n\n")
-                if isinstance(content, dict) and "subheadings" in content:
-                    write_section(md_file, content["subheadings"], level + 1)
-
-        with open(output_path, "w", encoding="utf-8") as md_file:
-            write_section(md_file, cleaned_data)
-
-        print(f"Parsed Markdown file saved to {output_path}.")
-
-    def get_text_page_nodes(self):
-        """Splits the document into nodes for each heading and subheading."""
-        docs = self.split_heading_wise()
-        nodes = []
-        main_title = list(docs.keys())[0] if docs else "Untitled Document"
-
-        def add_nodes(data, parent_metadata, level=1):
-            for heading, content in data.items():
-                node = {
-                    "text": f"{heading}\n\n{content['content']}",
-                    "metadata": {
-                        "main title": parent_metadata["main title"],
-                        "section title": heading if level == 1 else parent_metadata["section title"],
-                        "sub heading": heading if level > 1 else ""
-                    },
-                    "embeddings-Main-Headding": "",
-                    "embeddings-Section-Headding": "",
-                    "embeddings-Sub-Headding": "",
-                }
-                nodes.append(node)
-                if "subheadings" in content and content["subheadings"]:
-                    add_nodes(content["subheadings"], node["metadata"], level + 1)
-
-        add_nodes(docs, {"main title": main_title, "section title": ""})
-        return nodes
-
-    def generate_embeddings(self):
-        """Generate embeddings for headings and store them in nodes."""
-        embed_model = self.embedding_model
-        nodes = self.get_text_page_nodes()
-
-        for node in nodes:
-            main_heading_text = node['metadata'].get('main title', '')
-            section_heading_text = node['metadata'].get('section title', '')
-
-            if main_heading_text:
-                # node['embeddings-Main-Headding'] = embed_model.get_query_embedding(main_heading_text) #For nv-embed
-                node['embeddings-Main-Headding'] = embed_model.encode(main_heading_text)
-            if section_heading_text:
-                # node['embeddings-Section-Headding'] = embed_model.get_query_embedding(section_heading_text) #For nv-embed
-                node['embeddings-Section-Headding'] = embed_model.encode(section_heading_text)
-
-        print("Embeddings generated and stored in nodes.")
-        return nodes
-
-    @staticmethod
-    def custom_serializer(obj):
-        """Custom serializer for unsupported objects."""
-        if hasattr(obj, "__dict__"):
-            return obj.__dict__
-        return str(obj)
-    
+import asyncio
+import fitz
+import json
+import multiprocessing
+import os
+import nest_asyncio
+import re
+import threading
+
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+from llama_parse import LlamaParse
+# from llama_index.embeddings.nvidia import NVIDIAEmbedding
+
+from embedding_cache import get_embedding_cache
+from embedding_models import DEFAULT_EMBEDDING_MODEL, get_embedding_model
+
+
+nest_asyncio.apply()
+
+# PyMuPDF is not thread-safe, so parsers running in pipeline threads take turns on fitz
+_fitz_lock = threading.Lock()
+
+# Documents with fewer pages than this per worker are not worth sending to the process pool
+MIN_PAGES_PER_IMAGE_WORKER = 8
+
+HEADING_PATTERN = re.compile(r"^(#+) (.+)")
+
+PARSE_ENGINES = ("llamaparse", "local")
+
+# Local engine: a block counts as a heading when its font is this much larger than body text
+LOCAL_HEADING_SIZE_RATIO = 1.15
+LOCAL_MAX_HEADING_WORDS = 15
+
+_image_pool = None
+_image_pool_lock = threading.Lock()
+
+
+def _get_image_pool(max_workers):
+    """Returns the process pool shared by all parsers for image extraction, creating it on first use."""
+    global _image_pool
+    with _image_pool_lock:
+        if _image_pool is None:
+            # Spawn rather than fork: the parent may already hold torch and pipeline threads
+            _image_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return _image_pool
+
+
+class TextBlockIndex:
+    """
+    Text blocks of one page sorted by their bottom and top edges. Each sorted order carries a
+    range-minimum table over the blocks' original positions, so finding the first block (in page
+    order) inside a vertical window is a binary search plus one table lookup.
+    """
+
+    def __init__(self, text_blocks):
+        self.text_blocks = text_blocks
+
+        # Blocks without text never set a caption above an image, so they are left out of that side
+        above = sorted((i for i, block in enumerate(text_blocks) if block[4]), key=lambda i: text_blocks[i][3])
+        self.bottoms = [text_blocks[i][3] for i in above]
+        self.bottom_table = self._build_min_table(above)
+
+        below = sorted(range(len(text_blocks)), key=lambda i: text_blocks[i][1])
+        self.tops = [text_blocks[i][1] for i in below]
+        self.top_table = self._build_min_table(below)
+
+    @staticmethod
+    def _build_min_table(positions):
+        """Sparse table where table[k][i] is the smallest position in positions[i:i + 2**k]."""
+        table = [positions]
+        span = 1
+        while span * 2 <= len(positions):
+            previous = table[-1]
+            table.append([min(previous[i], previous[i + span]) for i in range(len(positions) - span * 2 + 1)])
+            span *= 2
+        return table
+
+    @staticmethod
+    def _range_min(table, lo, hi):
+        """Smallest position in the sorted slice [lo, hi), or None if the slice is empty."""
+        if lo >= hi:
+            return None
+        level = (hi - lo).bit_length() - 1
+        row = table[level]
+        return min(row[lo], row[hi - (1 << level)])
+
+    def first_block_above(self, y, max_distance):
+        """First block in page order whose bottom edge lies in [y - max_distance, y)."""
+        lo = bisect_left(self.bottoms, y - max_distance)
+        hi = bisect_left(self.bottoms, y)
+        return self._range_min(self.bottom_table, lo, hi)
+
+    def first_block_below(self, y, max_distance):
+        """First block in page order whose top edge lies in (y, y + max_distance]."""
+        lo = bisect_right(self.tops, y)
+        hi = bisect_right(self.tops, y + max_distance)
+        return self._range_min(self.top_table, lo, hi)
+
+
+def _extract_images_from_page_range(pdf_path, image_output_path, start_page, end_page):
+    """
+    Extracts images with captions from pages [start_page, end_page) of a PDF.
+    Runs in pool workers, so it opens its own fitz document.
+    """
+    image_docs = []
+    doc = fitz.open(pdf_path)
+    try:
+        for page_num in range(start_page, end_page):
+            page = doc[page_num]
+            text_blocks = page.get_text("blocks")
+            image_docs.extend(LlamaPDFParser.parse_all_images(image_output_path, page, page_num + 1, text_blocks))
+    finally:
+        doc.close()
+    return image_docs
+
+
+class LlamaPDFParser:
+    # Settings passed to LlamaParse; they are part of the parse cache key
+    PARSE_SETTINGS = {
+        "result_type": "markdown",
+        "premium_mode": True,
+    }
+
+    def __init__(self, pdf_path, output_md_path, output_json_path, image_output_folder,
+                 embedding_model_name=DEFAULT_EMBEDDING_MODEL, parse_cache=None, defer_parse=False,
+                 image_workers=None, engine="llamaparse"):
+        load_dotenv()
+        if engine not in PARSE_ENGINES:
+            raise ValueError(f"Unknown parse engine '{engine}'. Use one of: {', '.join(PARSE_ENGINES)}.")
+        self.engine = engine
+
+        self.api_key = os.getenv("LLAMA_CLOUD_API_KEY")
+        # self.nim_api_key = os.getenv("NIM_API_KEY")
+        # The local engine never talks to Llama Cloud, so it does not need a key
+        if not self.api_key and engine == "llamaparse":
+            raise ValueError("API key for Llama Cloud is not set in the .env file.")
+        if self.api_key:
+            os.environ["LLAMA_CLOUD_API_KEY"] = self.api_key
+        # os.environ["NIM_API_KEY"] = self.nim_api_key
+
+        # self.embedding_model = NVIDIAEmbedding(
+        #     model="nvidia/nv-embedqa-e5-v5",
+        #     truncate="END",
+        #     api_key=self.nim_api_key
+        # )
+        self.embedding_model_name = embedding_model_name
+
+        self.pdf_path = pdf_path
+        self.output_md_path = output_md_path
+        self.output_json_path = output_json_path
+        self.image_output_path = image_output_folder
+        self.parse_cache = parse_cache
+        self.image_workers = image_workers or int(os.getenv("IMAGE_WORKERS", str(os.cpu_count() or 1)))
+        self.documents, self.images_with_caption = None, []
+        self._hierarchy = None
+
+        # With defer_parse the caller runs the parse itself, e.g. through create_async
+        if not defer_parse:
+            self.documents, self.images_with_caption = self._parse_pdf_to_markdown()
+
+    @classmethod
+    async def create_async(cls, pdf_path, output_md_path, output_json_path, image_output_folder, **kwargs):
+        """
+        Builds a parser and awaits the LlamaParse job instead of blocking on it,
+        so several PDFs can be parsed concurrently on one event loop.
+        """
+        parser = cls(pdf_path, output_md_path, output_json_path, image_output_folder, defer_parse=True, **kwargs)
+        parser.documents, parser.images_with_caption = await parser._aparse_pdf_to_markdown()
+        return parser
+
+    @property
+    def embedding_model(self):
+        """Shared embedding model, only loaded once embeddings are actually generated."""
+        return get_embedding_model(self.embedding_model_name)
+
+    def _clean_heading(self, heading):
+        """Helper function to clean and normalize headings."""
+        return heading.strip("# ").strip()
+
+    def _parse_pdf_to_markdown(self):
+        """
+        Parses the input PDF file using LlamaParse, or PyMuPDF for the local engine, and saves it as a Markdown file.
+        If a parse cache is configured, a cache hit skips the LlamaParse call entirely.
+        """
+        try:
+            if self.engine == "local":
+                return self._parse_and_save_locally()
+
+            cache_key, cached = self._lookup_parse_cache()
+            if cached:
+                return self._save_markdown(*cached)
+
+            parser = LlamaParse(**self.PARSE_SETTINGS)
+
+            # Load data from the PDF (returns a list of Document objects)
+            documents = parser.load_data(self.pdf_path)
+            return self._save_markdown(*self._process_parsed_documents(documents, cache_key))
+        except Exception as e:
+            raise ValueError(f"Error parsing PDF: {e}")
+
+    async def _aparse_pdf_to_markdown(self):
+        """
+        Async variant of _parse_pdf_to_markdown that awaits the LlamaParse job. Hashing, cache lookups,
+        image extraction and the local engine run in worker threads, so they never block the event loop
+        that other in-flight parses are waiting on.
+        """
+        try:
+            if self.engine == "local":
+                return await asyncio.to_thread(self._parse_and_save_locally)
+
+            cache_key, cached = await asyncio.to_thread(self._lookup_parse_cache)
+            if cached:
+                return await asyncio.to_thread(self._save_markdown, *cached)
+
+            parser = LlamaParse(**self.PARSE_SETTINGS)
+            documents = await parser.aload_data(self.pdf_path)
+            parsed = await asyncio.to_thread(self._process_parsed_documents, documents, cache_key)
+            return await asyncio.to_thread(self._save_markdown, *parsed)
+        except Exception as e:
+            raise ValueError(f"Error parsing PDF: {e}")
+
+    def _parse_and_save_locally(self):
+        """Parses the PDF with the local engine, extracts its images and saves the Markdown."""
+        return self._save_markdown(self._parse_pdf_locally(), self._extract_images_with_captions())
+
+    def _parse_pdf_locally(self):
+        """
+        Converts the PDF to Markdown with PyMuPDF alone. Headings are inferred from font size and weight:
+        the largest heading on the first page becomes the '#' title and the remaining heading sizes map,
+        largest first, to '##', '###' and '####'.
+        """
+        with _fitz_lock:
+            with fitz.open(self.pdf_path) as doc:
+                blocks = []
+                for page_num, page in enumerate(doc):
+                    for block in page.get_text("dict")["blocks"]:
+                        if block.get("type") != 0:
+                            continue
+
+                        # Consecutive lines of a block with the same style form one paragraph or heading
+                        previous = None
+                        for line in block["lines"]:
+                            spans = [span for span in line["spans"] if span["text"].strip()]
+                            if not spans:
+                                continue
+                            text = " ".join("".join(span["text"] for span in line["spans"]).split())
+                            size = round(max(span["size"] for span in spans) * 2) / 2
+                            bold = all(span["flags"] & 16 or "bold" in span["font"].lower() for span in spans)
+
+                            if previous and previous["size"] == size and previous["bold"] == bold:
+                                previous["text"] += " " + text
+                                previous["chars"] += len(text)
+                                continue
+
+                            previous = {"text": text, "size": size, "bold": bold, "chars": len(text), "page": page_num}
+                            blocks.append(previous)
+
+        if not blocks:
+            raise ValueError("No text was found in the provided PDF.")
+
+        # Body text size is the size that covers the most characters
+        size_chars = {}
+        for block in blocks:
+            size_chars[block["size"]] = size_chars.get(block["size"], 0) + block["chars"]
+        body_size = max(size_chars, key=size_chars.get)
+
+        def is_heading(block):
+            text = block["text"]
+            if text.isdigit() or len(text.split()) > LOCAL_MAX_HEADING_WORDS:
+                return False
+            if block["size"] >= body_size * LOCAL_HEADING_SIZE_RATIO:
+                return True
+            # Bold lines at body size are run-in headings unless they read like a sentence
+            return block["bold"] and block["size"] >= body_size and not text.endswith(".")
+
+        for block in blocks:
+            block["heading"] = is_heading(block)
+
+        headings = [block for block in blocks if block["heading"]]
+        first_page = [block for block in headings if block["page"] == 0]
+        title = max(first_page, key=lambda block: block["size"]) if first_page else None
+
+        heading_sizes = sorted({block["size"] for block in headings if block is not title}, reverse=True)
+        levels = {size: min(2 + rank, 4) for rank, size in enumerate(heading_sizes)}
+
+        markdown_lines = []
+        for block in blocks:
+            if block is title:
+                markdown_lines.append(f"# {block['text']}")
+            elif block["heading"]:
+                markdown_lines.append(f"{'#' * levels[block['size']]} {block['text']}")
+            else:
+                markdown_lines.append(block["text"])
+            markdown_lines.append("")
+
+        return "\n".join(markdown_lines)
+
+    def _lookup_parse_cache(self):
+        """Returns the cache key and the cached (markdown, images) pair, or None on a miss."""
+        if not self.parse_cache:
+            return None, None
+
+        cache_key = self.parse_cache.make_key(self.pdf_path, self.PARSE_SETTINGS)
+        cached = self.parse_cache.get(cache_key)
+        if not cached:
+            return cache_key, None
+
+        print(f"Parse cache hit for {self.pdf_path}.")
+        images_with_caption = cached["images_with_caption"]
+
+        # The cached image files may belong to another output folder or have been removed
+        if not self._cached_images_available(images_with_caption):
+            images_with_caption = self._extract_images_with_captions()
+
+        return cache_key, (cached["markdown"], images_with_caption)
+
+    def _process_parsed_documents(self, documents, cache_key=None):
+        """Joins the parsed documents into Markdown, extracts images and fills the parse cache."""
+        if not documents:
+            raise ValueError("No data was parsed from the provided PDF.")
+
+        # Extract text from each document object and join them into a single string
+        markdown_content = "\n\n".join([doc.text for doc in documents])  # Assuming each 'doc' has a 'text' attribute
+
+        images_with_caption = self._extract_images_with_captions()
+
+        if self.parse_cache:
+            self.parse_cache.put(cache_key, markdown_content, images_with_caption)
+
+        return markdown_content, images_with_caption
+
+    def _save_markdown(self, markdown_content, images_with_caption):
+        """Writes the Markdown content followed by the image captions to the output file."""
+        # Save Markdown content to a file
+        os.makedirs(os.path.dirname(self.output_md_path), exist_ok=True)
+        with open(self.output_md_path, "w", encoding="utf-8") as md_file:
+            md_file.write(markdown_content)
+
+        # Append images to Markdown file
+        with open(self.output_md_path, "a", encoding="utf-8") as md_file:
+            for img in images_with_caption:
+                md_file.write(f"\n![Image]({img['metadata']['image']})\n")
+                md_file.write(f"\n**Caption:** {img['metadata']['caption']}\n\n")
+
+        return markdown_content, images_with_caption  # Return the Markdown content as a string
+
+    def _cached_images_available(self, images_with_caption):
+        """Check that cached image metadata points at existing files in this parser's image folder."""
+        image_folder = os.path.join(os.getcwd(), self.image_output_path)
+        for img in images_with_caption:
+            image_path = img["metadata"]["image"]
+            if os.path.dirname(image_path) != image_folder or not os.path.exists(image_path):
+                return False
+        return True
+        
+
+    @staticmethod
+    def parse_all_images(filename, page, pagenum, text_blocks):
+        """Extract images from a PDF page."""
+        image_docs = []
+        image_info_list = page.get_image_info(xrefs=True)
+        page_rect = page.rect
+        block_index = None
+
+        for image_info in image_info_list:
+            xref = image_info['xref']
+            if xref == 0:
+                continue
+
+            img_bbox = fitz.Rect(image_info['bbox'])
+            if img_bbox.width < page_rect.width / 20 or img_bbox.height < page_rect.height / 20:
+                continue
+
+            extracted_image = page.parent.extract_image(xref)
+            image_data = extracted_image["image"]
+            imgrefpath = os.path.join(os.getcwd(), f"{filename}")
+            os.makedirs(imgrefpath, exist_ok=True)
+            image_path = os.path.join(imgrefpath, f"image{xref}-page{pagenum}.png")
+            with open(image_path, "wb") as img_file:
+                img_file.write(image_data)
+            if block_index is None:
+                block_index = TextBlockIndex(text_blocks)
+            before_text, after_text = LlamaPDFParser.extract_text_around_item(block_index, img_bbox, page.rect.height)
+            if before_text == "" and after_text == "":
+                continue
+
+            image_description = " "
+
+            caption = before_text.replace("\n", " ") + image_description + after_text.replace("\n", " ")
+
+            image_metadata = {
+                "source": f"{filename}-page{pagenum}-image{xref}",
+                "image": image_path,
+                "caption": caption,
+                "type": "image",
+                "page_num": pagenum
+            }
+            image_docs.append({
+                "text": "This is an image with the caption: " + caption,
+                "metadata": image_metadata
+            })
+            
+            # breakpoint()
+
+        return image_docs
+
+
+    def _extract_images_with_captions(self):
+        """
+        Extracts images from the PDF with captions and saves them to a folder.
+        Returns a list of image documents with metadata.
+        """
+        os.makedirs(self.image_output_path, exist_ok=True)
+
+        with _fitz_lock:
+            with fitz.open(self.pdf_path) as doc:
+                page_count = doc.page_count
+
+        workers = min(self.image_workers, page_count // MIN_PAGES_PER_IMAGE_WORKER)
+        if workers <= 1:
+            with _fitz_lock:
+                return _extract_images_from_page_range(self.pdf_path, self.image_output_path, 0, page_count)
+
+        # Shard pages into contiguous ranges, a few per worker so uneven pages balance out
+        shard_count = workers * 2
+        shard_size = -(-page_count // shard_count)
+        ranges = [(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+
+        pool = _get_image_pool(self.image_workers)
+        futures = [
+            pool.submit(_extract_images_from_page_range, self.pdf_path, self.image_output_path, start, end)
+            for start, end in ranges
+        ]
+
+        # Collect in submission order so the output is in page order regardless of which shard finishes first
+        image_docs = []
+        for future in futures:
+            image_docs.extend(future.result())
+        return image_docs
+    
+    
+    
+    @staticmethod
+    def extract_text_around_item(text_blocks, bbox, page_height, threshold_percentage=0.1):
+        """
+        Extract text above and below a given bounding box on a page.
+        text_blocks may be a TextBlockIndex, so it can be built once and shared by every image on the page.
+        """
+        if not isinstance(text_blocks, TextBlockIndex):
+            text_blocks = TextBlockIndex(text_blocks)
+
+        vertical_threshold_distance = page_height * threshold_percentage
+
+        # Matches a scan in page order that takes the first block above the image and stops at the
+        # first block below it. The horizontal overlap is clamped at zero, so it never rules a block out.
+        after_index = text_blocks.first_block_below(bbox.y1, vertical_threshold_distance)
+        before_index = text_blocks.first_block_above(bbox.y0, vertical_threshold_distance)
+        if after_index is not None and before_index is not None and before_index > after_index:
+            before_index = None
+
+        before_text = text_blocks.text_blocks[before_index][4] if before_index is not None else ""
+        after_text = text_blocks.text_blocks[after_index][4] if after_index is not None else ""
+        return before_text, after_text
+
+
+
+    def _parse_markdown_to_json(self, md_content):
+        """Parse Markdown file into a hierarchical JSON format."""
+        main_title = ""
+        hierarchy = {}
+        # (heading, node) pairs from the top-level section down to the current heading
+        current_levels = []
+
+        for line in md_content.splitlines():
+            # Match for main title (only the first # heading)
+            if line.startswith("# "):
+                if not main_title:  # Capture the first main title
+                    main_title = self._clean_heading(line)
+                continue
+
+            # Match for section and subheadings
+            heading_match = HEADING_PATTERN.match(line)
+            if heading_match:
+                level = len(heading_match.group(1))  # Determine heading level
+                heading_text = heading_match.group(2)
+
+                # Adjust the current level hierarchy
+                del current_levels[level - 1:]
+                siblings = current_levels[-1][1]["subheadings"] if current_levels else hierarchy
+
+                # Create a new entry for the current heading, or continue a repeated one
+                node = siblings.get(heading_text)
+                if node is None:
+                    path = [text for text, _ in current_levels] + [heading_text]
+                    node = {
+                        "content": [],
+                        "metadata": {
+                            "main title": main_title,
+                            "section title": path[0],
+                            "sub heading": path[1] if len(path) > 1 else "",
+                        },
+                        "subheadings": {}
+                    }
+                    siblings[heading_text] = node
+                current_levels.append((heading_text, node))
+
+            elif current_levels:
+                # Add content to the most recent heading; lines are joined once at the end
+                current_levels[-1][1]["content"].append(line.strip() + "\n")
+
+        # Join the collected lines of every node into its final content string
+        pending = list(hierarchy.values())
+        while pending:
+            node = pending.pop()
+            node["content"] = "".join(node["content"])
+            pending.extend(node["subheadings"].values())
+
+        return hierarchy
+
+    def _format_hierarchy_to_json(self, hierarchy):
+        """Recursive function to format the hierarchy into the desired JSON structure."""
+        json_list = []
+        for key, value in hierarchy.items():
+            json_obj = {
+                "content": value["content"].strip(),
+                "metadata": value.get("metadata", {}),
+                "embeddings-Main-Headding": "",
+                "embeddings-Section-Headding": "",
+                "embeddings-Sub-Headding": "",
+                "subheadings": self._format_hierarchy_to_json(value["subheadings"]),
+            }
+            json_list.append(json_obj)
+        return json_list
+
+    def convert_md_to_json(self):
+        """Convert Markdown file to JSON and save it to a file."""
+        hierarchy = self.split_heading_wise()
+        formatted_json = self._format_hierarchy_to_json(hierarchy)
+
+        # Add images to JSON
+        for img in self.images_with_caption:
+            formatted_json.append({
+                "content": f"Image with caption: {img['metadata']['caption']}",
+                "metadata": img["metadata"],
+                "embeddings-Main-Headding": "",
+                "embeddings-Section-Headding": "",
+                "embeddings-Sub-Headding": "",
+                "subheadings": []
+            })
+
+        # Save JSON to a file
+        os.makedirs(os.path.dirname(self.output_json_path), exist_ok=True)
+        with open(self.output_json_path, "w", encoding="utf-8") as json_file:
+            json.dump(formatted_json, json_file, indent=4)
+
+        print(f"Markdown and JSON files saved to {self.output_md_path} and {self.output_json_path}.")
+
+    def split_heading_wise(self):
+        """
+        Splits the parsed Markdown document into a hierarchical structure.
+        The result is computed once and shared by convert_md_to_json, save_cleaned_data and get_text_page_nodes.
+        """
+        if self._hierarchy is None:
+            self._hierarchy = self._parse_markdown_to_json(self.documents)
+        return self._hierarchy
+
+    def save_cleaned_data(self, output_path):
+        """
+        Saves the cleaned and merged data to a Markdown file with proper hierarchical structure.
+        """
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        cleaned_data = self.split_heading_wise()
+
+        def write_section(md_file, data, level=1):
+            """Recursively writes sections and sub-sections to the Markdown file."""
+            for heading, content in data.items():
+                md_file.write(f"{'#' * level} {heading}\n\n")
+                if isinstance(content, dict) and "content" in content:
+                    md_file.write(f"{content['content']}\n\n")
+                if isinstance(content, dict) and "subheadings" in content:
+                    write_section(md_file, content["subheadings"], level + 1)
+
+        with open(output_path, "w", encoding="utf-8") as md_file:
+            write_section(md_file, cleaned_data)
+
+        print(f"Parsed Markdown file saved to {output_path}.")
+
+    def get_text_page_nodes(self):
+        """Splits the document into nodes for each heading and subheading."""
+        docs = self.split_heading_wise()
+        nodes = []
+        main_title = list(docs.keys())[0] if docs else "Untitled Document"
+
+        def add_nodes(data, parent_metadata, level=1):
+            for heading, content in data.items():
+                node = {
+                    "text": f"{heading}\n\n{content['content']}",
+                    "metadata": {
+                        "main title": parent_metadata["main title"],
+                        "section title": heading if level == 1 else parent_metadata["section title"],
+                        "sub heading": heading if level > 1 else ""
+                    },
+                    "embeddings-Main-Headding": "",
+                    "embeddings-Section-Headding": "",
+                    "embeddings-Sub-Headding": "",
+                }
+                nodes.append(node)
+                if "subheadings" in content and content["subheadings"]:
+                    add_nodes(content["subheadings"], node["metadata"], level + 1)
+
+        add_nodes(docs, {"main title": main_title, "section title": ""})
+        return nodes
+
+    def generate_embeddings(self):
+        """Generate embeddings for headings and store them in nodes."""
+        # Headings repeat across nodes, so go through the cache rather than the model directly
+        embed_model = get_embedding_cache(self.embedding_model_name)
+        nodes = self.get_text_page_nodes()
+
+        for node in nodes:
+            main_heading_text = node['metadata'].get('main title', '')
+            section_heading_text = node['metadata'].get('section title', '')
+
+            if main_heading_text:
+                # node['embeddings-Main-Headding'] = embed_model.get_query_embedding(main_heading_text) #For nv-embed
+                node['embeddings-Main-Headding'] = embed_model.encode_one(main_heading_text)
+            if section_heading_text:
+                # node['embeddings-Section-Headding'] = embed_model.get_query_embedding(section_heading_text) #For nv-embed
+                node['embeddings-Section-Headding'] = embed_model.encode_one(section_heading_text)
+
+        # Persist new headings to the on-disk tier (a no-op without EMBEDDING_CACHE_DIR)
+        embed_model.save()
+        print("Embeddings generated and stored in nodes.")
+        return nodes
+
+    @staticmethod
+    def custom_serializer(obj):
+        """Custom serializer for unsupported objects."""
+        if hasattr(obj, "__dict__"):
+            return obj.__dict__
+        return str(obj)
+    
     
\ No newline at end of file
@@ -0,0 +1,147 @@
+import asyncio
+import queue
+import threading
+import time
+
+from parser import LlamaPDFParser
+
+
+_STOP = object()
+
+
+class PipelineStage:
+    """
+    A pool of worker threads that take items from an input queue, apply a function
+    and put the results on the next stage's queue. A worker that returns None drops the item.
+    """
+
+    def __init__(self, name, func, worker_count, input_queue, output_queue=None, init_worker=None):
+        self.name = name
+        self.func = func
+        self.worker_count = worker_count
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.init_worker = init_worker
+        self.threads = []
+        self.busy_seconds = 0.0
+        self.processed = 0
+        self.failed = 0
+        self._stats_lock = threading.Lock()
+
+    def start(self):
+        for index in range(self.worker_count):
+            thread = threading.Thread(target=self._work, name=f"{self.name}-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Signal every worker to exit once the queue drains, then wait for them."""
+        for _ in self.threads:
+            self.input_queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+
+    def _work(self):
+        if self.init_worker:
+            self.init_worker()
+
+        while True:
+            item = self.input_queue.get()
+            if item is _STOP:
+                break
+
+            start = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                # Items further down the pipeline are tuples that start with the document name
+                label = item[0] if isinstance(item, tuple) else item
+                print(f"[{self.name}] Error processing {label}: {e}")
+                result = None
+                with self._stats_lock:
+                    self.failed += 1
+            elapsed = time.perf_counter() - start
+
+            with self._stats_lock:
+                self.busy_seconds += elapsed
+                if result is not None:
+                    self.processed += 1
+
+            # put() blocks while the next stage is full, which is what gives us backpressure
+            if result is not None and self.output_queue is not None:
+                self.output_queue.put(result)
+
+
+class IngestPipeline:
+    """
+    Runs the dump as three overlapping stages connected by bounded queues:
+    parse (PDF to JSON via LlamaParse), embed (JSON to vectors) and insert (vectors to Milvus).
+    """
+
+    def __init__(self, automation, parse_workers=4, embed_workers=1, insert_workers=1, queue_size=4):
+        # A stage without workers never drains its queue, so the whole pipeline would hang
+        for stage, count in (("parse", parse_workers), ("embed", embed_workers), ("insert", insert_workers)):
+            if count < 1:
+                raise ValueError(f"The {stage} stage needs at least one worker, got {count}.")
+        self.automation = automation
+        self.parse_workers = parse_workers
+        self.embed_workers = embed_workers
+        self.insert_workers = insert_workers
+        self.queue_size = queue_size
+
+    @staticmethod
+    def _init_parse_worker():
+        # LlamaParse drives its own event loop, which worker threads do not have by default
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def _parse(self, pdf_path):
+        print(f"Processing: {pdf_path}")
+        paths = self.automation._begin_pdf(pdf_path)
+        if paths is None:
+            return None
+        base_name, md_path, json_path, image_path = paths
+
+        # Stages the job manifest records as done are skipped, e.g. when resuming an interrupted dump
+        if self.automation._needs_parse(base_name, json_path):
+            parser = LlamaPDFParser(pdf_path, md_path, json_path, image_path, **self.automation.parser_options())
+            self.automation._convert_to_json(parser, base_name, json_path)
+        return base_name, json_path
+
+    def _embed(self, item):
+        base_name, json_path = item
+        return base_name, json_path, self.automation._embed_json(base_name, json_path)
+
+    def _insert(self, item):
+        base_name, json_path, prepared = item
+        self.automation._insert_and_index(base_name, json_path, prepared)
+        return base_name
+
+    def run(self, pdf_paths):
+        """Push every PDF through the pipeline and block until all stages have drained."""
+        parse_queue = queue.Queue(maxsize=self.queue_size)
+        embed_queue = queue.Queue(maxsize=self.queue_size)
+        insert_queue = queue.Queue(maxsize=self.queue_size)
+
+        stages = [
+            PipelineStage("parse", self._parse, self.parse_workers, parse_queue, embed_queue,
+                          init_worker=self._init_parse_worker),
+            PipelineStage("embed", self._embed, self.embed_workers, embed_queue, insert_queue),
+            PipelineStage("insert", self._insert, self.insert_workers, insert_queue),
+        ]
+
+        start = time.perf_counter()
+        for stage in stages:
+            stage.start()
+
+        for pdf_path in pdf_paths:
+            parse_queue.put(pdf_path)
+
+        # Stop the stages in order so each one drains before its consumer is told to finish
+        for stage in stages:
+            stage.stop()
+
+        elapsed = time.perf_counter() - start
+        print(f"Pipeline finished {len(pdf_paths)} PDFs in {elapsed:.1f} s.")
+        for stage in stages:
+            print(f"  {stage.name}: {stage.worker_count} workers, {stage.processed} done, "
+                  f"{stage.failed} failed, {stage.busy_seconds:.1f} s busy.")
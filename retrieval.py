@@ -1,262 +1,1149 @@
-import json
-import os
-import sys
-
-from dotenv import load_dotenv
-# from llama_index.embeddings.nvidia import NVIDIAEmbedding
-from pymilvus import connections, CollectionSchema, FieldSchema, DataType, Collection, list_collections
-from sentence_transformers import SentenceTransformer
-
-class MilvusEmbeddingManager:
-    def __init__(self, host="localhost", port="19530"):
-        self.host = host
-        self.port = port
-
-        load_dotenv()
-
-        # self.nim_api_key = os.getenv("NIM_API_KEY")
-        # if not self.nim_api_key:
-        #     raise ValueError("API key for NIM is not set in the .env file.")
-        # os.environ["NIM_API_KEY"] = self.nim_api_key
-
-        # self.embedder = NVIDIAEmbedding(
-        #     model="nvidia/nv-embedqa-e5-v5",
-        #     truncate="END",
-        #     api_key=self.nim_api_key
-        # )
-        self.embedder = SentenceTransformer('embaas/sentence-transformers-e5-large-v2')
-
-        connections.connect("default", host=host, port=port)
-        print("Connected to Milvus.")
-
-    def create_or_load_collection(self, collection_name):
-        if collection_name in list_collections():
-            print(f"Collection '{collection_name}' already exists. Loading collection.")
-            return Collection(name=collection_name)
-        else:
-            schema = CollectionSchema([
-                FieldSchema(name="id", dtype=DataType.INT64, is_primary=True),
-                FieldSchema(name="main_title_embedding", dtype=DataType.FLOAT_VECTOR, dim=1024),
-                FieldSchema(name="section_title_embedding", dtype=DataType.FLOAT_VECTOR, dim=1024),
-                FieldSchema(name="sub_heading_embedding", dtype=DataType.FLOAT_VECTOR, dim=1024),
-                FieldSchema(name="content_embedding", dtype=DataType.FLOAT_VECTOR, dim=1024),
-                FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
-                FieldSchema(name="sub_heading", dtype=DataType.VARCHAR, max_length=255),
-                FieldSchema(name="image_path", dtype=DataType.VARCHAR, max_length=1024)
-            ], description=f"Embeddings collection for {collection_name}")
-
-            print(f"Creating collection '{collection_name}'.")
-            return Collection(name=collection_name, schema=schema)
-
-    def generate_embeddings(self, text_or_image_caption):
-        """Generate embeddings for the given text."""
-        return self.embedder.encode(text_or_image_caption) if text_or_image_caption else [0.0] * 1024
-
-    def process_and_insert_json(self, json_file):
-        """Process JSON data from a file and insert into Milvus, handling both text and image nodes."""
-        collection_name = os.path.splitext(os.path.basename(json_file))[0]
-        collection = self.create_or_load_collection(collection_name)
-        global_id = 1
-        record_count = 0
-
-        # Load and parse the JSON file
-        with open(json_file, "r", encoding="utf-8") as file:
-            try:
-                json_data = json.load(file)  # Parse JSON file into a Python object
-            except json.JSONDecodeError as e:
-                print(f"Error parsing JSON file: {e}")
-                return
-
-        def process_node(node):
-            nonlocal global_id, record_count
-            node_id = global_id
-            global_id += 1
-
-            # Extract metadata and content
-            main_title = node.get("metadata", {}).get("main title", "")
-            section_title = node.get("metadata", {}).get("section title", "")
-            sub_heading = node.get("metadata", {}).get("sub heading", "").strip()
-            image_path = node.get("metadata", {}).get("image", "No image available")
-            
-            if "image" in node.get("metadata", {}):
-                content = node["metadata"]["caption"]
-                # print("Content: ", content)
-            else:
-                content = node.get("content", "")
-
-            main_title_emb = self.generate_embeddings(main_title)
-            section_title_emb = self.generate_embeddings(section_title)
-            sub_heading_emb = self.generate_embeddings(sub_heading)
-            content_emb = self.generate_embeddings(content)
-
-
-            # Insert text embeddings into Milvus
-            collection.insert([
-                [node_id],
-                [main_title_emb],
-                [section_title_emb],
-                [sub_heading_emb],
-                [content_emb],
-                [content],
-                [sub_heading],
-                [image_path]
-            ])
-            record_count += 1
-
-            # Process subheadings recursively
-            for sub_node in node.get("subheadings", []):
-                process_node(sub_node)
-
-        for node in json_data:
-            process_node(node)
-
-        print(f"Data insertion complete for '{collection_name}'. Total records inserted: {record_count}.")
-
-
-    def create_indexes(self, collection_name):
-        """Create indexes for the collection fields."""
-        collection = self.create_or_load_collection(collection_name)
-        collection.flush()
-        index_params = {"index_type": "HNSW", "metric_type": "IP", "params": {"M": 16, "efConstruction": 200}}
-
-        collection.create_index("main_title_embedding", index_params)
-        collection.create_index("section_title_embedding", index_params)
-        collection.create_index("sub_heading_embedding", index_params)
-        collection.create_index("content_embedding", index_params)
-        print(f"Indexes created for '{collection_name}'.")
-
-    def query(self, query_text, anns_field="sub_heading_embedding", limit=5, threshold=0.80):
-        """Query the collection with a given text and filter results based on similarity threshold."""
-        collections = list_collections()
-        combined_results = {}
-
-        print(f"Provided Answer field is: {anns_field}")
-
-        for collection_name in collections:
-            collection = self.create_or_load_collection(collection_name)
-            collection.load()
-            query_embedding = self.generate_embeddings(query_text)
-
-            search_params = {"metric_type": "IP", "params": {"ef": 128}}
-
-            if anns_field == "content_embedding":
-                results = collection.search(
-                    data=[query_embedding],
-                    anns_field=anns_field,  # Search using content_embedding
-                    param=search_params,
-                    limit=limit * 2,
-                    output_fields=["text", "image_path", "sub_heading"]  # Get full content & metadata
-                )
-
-                filtered_results = []
-                for res in results:
-                    for hit in res:
-                        if hit.distance >= threshold:  # Filter based on similarity threshold
-                            image_path = hit.get("image_path") or "No image provided"    # Check for image field
-
-                            filtered_results.append({
-                                "text": hit.get("text"),  # Retrieve content
-                                "image": image_path,  # Assign image path or "No image provided"
-                                "sub_heading": hit.entity.get("sub_heading"),
-                                "collection_name": collection_name,
-                                "similarity": hit.distance
-                            })
-
-            else:
-                results = collection.search(
-                    data=[query_embedding],
-                    anns_field=anns_field,
-                    param=search_params,
-                    limit=limit * 2,
-                    output_fields=["text", "sub_heading"]
-                )
-                # print("Search result: ", results)
-                filtered_results = []
-                for res in results:
-                    for hit in res:
-                        if hit.distance >= threshold:
-                            filtered_results.append({
-                                "text": hit.entity.get("text"),
-                                "sub_heading": hit.entity.get("sub_heading"),
-                                "collection_name": collection_name,
-                                "similarity": hit.distance
-                            })
-
-            combined_results[collection_name] = filtered_results[:limit]
-
-        return combined_results
-
-    def perform_default_queries(self):
-        """Perform default searches and organize results by collection and query type."""
-        default_queries = ["Introduction", "Abstract", "Conclusion", "References", "Methodology", "Results"]
-        collections = list_collections()
-        organized_results = {query: {} for query in default_queries}
-
-        for collection_name in collections:
-            collection = self.create_or_load_collection(collection_name)
-            collection.load()
-
-            for query_text in default_queries:
-                query_embedding = self.generate_embeddings(query_text)
-                search_params = {"metric_type": "IP", "params": {"ef": 128}}
-
-                results = collection.search(
-                    data=[query_embedding],
-                    anns_field="sub_heading_embedding",
-                    param=search_params,
-                    limit=1,
-                    output_fields=["text", "sub_heading"]
-                )
-
-                for res in results:
-                    for hit in res:
-                        query_results = organized_results[query_text].setdefault(collection_name, [])
-                        query_results.append({
-                            "text": hit.entity.get("text"),
-                            "similarity": hit.distance
-                        })
-
-        return organized_results
-
-    def get_column_counts(self):
-        """Get the count of items in each column of all collections."""
-        collections = list_collections()
-        column_counts = {}
-
-        for collection_name in collections:
-            collection = self.create_or_load_collection(collection_name)
-            collection.load()
-            collection.flush()
-
-            fields = [field.name for field in collection.schema.fields]
-            column_counts[collection_name] = {}
-
-            for field in fields:
-                results = collection.query(expr="", output_fields=[field], limit=10000)
-                column_counts[collection_name][field] = len(results)
-
-        return column_counts
-
-# Example usage
-if __name__ == "__main__":
-
-    manager = MilvusEmbeddingManager()
-
-    json_files = sys.argv[1:]
-
-    if json_files:
-        for json_file in json_files:
-            manager.process_and_insert_json(json_file)
-            manager.create_indexes(os.path.splitext(os.path.basename(json_file))[0])
-
-    user_query = input("Enter your search query: ")
-
-    if user_query.strip():
-        content_results = manager.query(user_query, anns_field="content_embedding", limit=5)
-        # print("Content Results:", json.dumps(content_results, indent=4))
-
-        default_results = manager.perform_default_queries()
-        # print("Default Results:", json.dumps(default_results, indent=4))
-
-    column_counts = manager.get_column_counts()
-    print("Column counts:", json.dumps(column_counts, indent=4))
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import numpy as np
+from dotenv import load_dotenv
+# from llama_index.embeddings.nvidia import NVIDIAEmbedding
+from pymilvus import CollectionSchema, FieldSchema, DataType, AnnSearchRequest, RRFRanker, WeightedRanker
+
+from embedding_cache import ZERO_EMBEDDING, get_embedding_cache
+from embedding_sidecar import EmbeddingSidecar
+from embedding_models import DEFAULT_EMBEDDING_MODEL, EMBEDDING_DIM, get_embedding_model
+from vector_backends import BACKENDS, MilvusBackend, get_local_backend
+
+
+# Storage layouts: one collection per PDF, or one shared collection partitioned by document
+LAYOUTS = ("per_pdf", "corpus")
+CORPUS_COLLECTION = "docfusion_corpus"
+
+# Storage type of the embedding fields: Milvus field type and the numpy type vectors are sent as
+VECTOR_DTYPES = {
+    "float32": (DataType.FLOAT_VECTOR, np.float32),
+    "float16": (DataType.FLOAT16_VECTOR, np.float16),
+}
+VECTOR_FIELDS = ("main_title_embedding", "section_title_embedding", "sub_heading_embedding", "content_embedding")
+# Fields of a per-PDF document collection, in schema order; the corpus collection adds "document"
+DOCUMENT_FIELDS = ("id",) + VECTOR_FIELDS + ("text", "sub_heading", "image_path")
+
+# Build and search parameters per index type. IVF_SQ8 and IVF_PQ quantize the vectors in the index,
+# trading some recall for a fraction of the memory of HNSW or IVF_FLAT.
+INDEX_TYPES = {
+    "HNSW": ({"M": 16, "efConstruction": 200}, {"ef": 128}),
+    "IVF_FLAT": ({"nlist": 1024}, {"nprobe": 32}),
+    "IVF_SQ8": ({"nlist": 1024}, {"nprobe": 32}),
+    "IVF_PQ": ({"nlist": 1024, "m": 64, "nbits": 8}, {"nprobe": 32}),
+}
+
+# Vector fields fused by hybrid_query unless the caller picks others
+HYBRID_FIELDS = ("section_title_embedding", "sub_heading_embedding", "content_embedding")
+
+# Row ids below this come from the old sequential numbering; hashed ids are spread over 63 bits
+LEGACY_ID_LIMIT = 1 << 32
+
+# Assumed average size of a VARCHAR value when estimating how much memory a loaded collection takes
+VARCHAR_ESTIMATE_BYTES = 256
+
+# Section queries run for every search to collect the material for each part of the review paper
+DEFAULT_QUERIES = ["Introduction", "Abstract", "Conclusion", "References", "Methodology", "Results"]
+
+def as_vector(value, dtype=np.float32):
+    """Numpy vector of a vector field value as returned by a Milvus query."""
+    # FLOAT16 vectors come back as raw bytes, wrapped in a one-element list
+    if isinstance(value, list) and len(value) == 1 and isinstance(value[0], bytes):
+        value = value[0]
+    if isinstance(value, bytes):
+        return np.frombuffer(value, dtype=np.float16).astype(dtype)
+    return np.asarray(value, dtype=dtype)
+
+
+# Embedding matrix of DEFAULT_QUERIES per model, computed once per process
+_default_query_embeddings = {}
+_default_query_lock = threading.Lock()
+
+
+class SearchContext:
+    """
+    Query vectors for one search request: the user query is embedded once when the context is
+    created, and the default-query matrix is shared by every request in the process.
+    """
+
+    def __init__(self, query_text, query_embedding, default_queries, default_embeddings):
+        self.query_text = query_text
+        self.query_embedding = query_embedding
+        self.default_queries = default_queries
+        self.default_embeddings = default_embeddings
+
+
+class BufferedInserter:
+    """
+    Collects rows into columnar batches and sends them to Milvus in bulk.
+    A batch is flushed when it reaches max_rows rows or max_bytes estimated payload size.
+    With upsert, rows replace existing rows with the same primary key instead of duplicating them.
+    """
+
+    def __init__(self, collection, max_rows=None, max_bytes=None, upsert=False):
+        self.collection = collection
+        self.upsert = upsert
+        self.max_rows = max_rows or int(os.getenv("INSERT_BATCH_ROWS", "512"))
+        self.max_bytes = max_bytes or int(os.getenv("INSERT_BATCH_BYTES", str(16 * 1024 * 1024)))
+        self.columns = None
+        self.buffered_rows = 0
+        self.buffered_bytes = 0
+        self.total_rows = 0
+        self.batch_latencies = []
+
+    @staticmethod
+    def _estimate_size(value):
+        if isinstance(value, np.ndarray):
+            return value.nbytes
+        if isinstance(value, str):
+            return len(value.encode("utf-8"))
+        return 8
+
+    def add(self, row):
+        """Buffer one row, given as a list of field values in schema order."""
+        row_bytes = sum(self._estimate_size(value) for value in row)
+
+        # Flush first if this row would push the batch past the byte limit
+        if self.buffered_rows and self.buffered_bytes + row_bytes > self.max_bytes:
+            self.flush()
+
+        if self.columns is None:
+            self.columns = [[] for _ in row]
+        for column, value in zip(self.columns, row):
+            column.append(value)
+
+        self.buffered_rows += 1
+        self.buffered_bytes += row_bytes
+
+        if self.buffered_rows >= self.max_rows:
+            self.flush()
+
+    def flush(self):
+        """Insert all buffered rows in a single request."""
+        if not self.buffered_rows:
+            return 0
+
+        start = time.perf_counter()
+        if self.upsert:
+            self.collection.upsert(self.columns)
+        else:
+            self.collection.insert(self.columns)
+        latency = time.perf_counter() - start
+
+        inserted = self.buffered_rows
+        self.batch_latencies.append(latency)
+        self.total_rows += inserted
+        print(f"Inserted batch of {inserted} rows ({self.buffered_bytes / 1024:.1f} KB) "
+              f"into '{self.collection.name}' in {latency * 1000:.1f} ms.")
+
+        self.columns = None
+        self.buffered_rows = 0
+        self.buffered_bytes = 0
+        return inserted
+
+
+class MilvusEmbeddingManager:
+    def __init__(self, host="localhost", port="19530", batch_size=None, model_name=DEFAULT_EMBEDDING_MODEL,
+                 layout=None, backend=None):
+        self.host = host
+        self.port = port
+        self.model_name = model_name
+
+        load_dotenv()
+
+        # Number of strings encoded per forward pass when embedding a document
+        self.batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        self.embedding_cache = get_embedding_cache(model_name)
+
+        # Collections searched in parallel per request, and the RPC timeout for each of them in seconds
+        self.search_concurrency = int(os.getenv("SEARCH_CONCURRENCY", "8"))
+        self.search_timeout = float(os.getenv("SEARCH_TIMEOUT", "10"))
+
+        self.layout = layout or os.getenv("MILVUS_LAYOUT", "per_pdf")
+        if self.layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout '{self.layout}'. Use one of: {', '.join(LAYOUTS)}.")
+        self.corpus_collection = os.getenv("CORPUS_COLLECTION", CORPUS_COLLECTION)
+        # Upper bound on the number of documents a single corpus search returns hits for
+        self.corpus_search_documents = int(os.getenv("CORPUS_SEARCH_DOCUMENTS", "100"))
+
+        # Vector storage type and index type used for new collections and indexes
+        self.vector_dtype = os.getenv("VECTOR_DTYPE", "float32")
+        if self.vector_dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector type '{self.vector_dtype}'. Use one of: {', '.join(VECTOR_DTYPES)}.")
+        self.index_type = os.getenv("INDEX_TYPE", "HNSW")
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{self.index_type}'. Use one of: {', '.join(INDEX_TYPES)}.")
+
+        # Collection handles, the cached name list and the loaded collections in LRU order with their
+        # estimated memory. Collections are released, coldest first, once the budget is exceeded.
+        self.memory_budget = int(os.getenv("MILVUS_MEMORY_BUDGET", str(4 * 1024 ** 3)))
+        self.collection_list_ttl = float(os.getenv("COLLECTION_LIST_TTL", "30"))
+        self._collections = {}
+        self._collection_names = None
+        self._collection_names_time = 0.0
+        self._loaded = OrderedDict()
+        self._pinned = {}
+        self._index_types = {}
+        self._collections_lock = threading.RLock()
+
+        # self.nim_api_key = os.getenv("NIM_API_KEY")
+        # if not self.nim_api_key:
+        #     raise ValueError("API key for NIM is not set in the .env file.")
+        # os.environ["NIM_API_KEY"] = self.nim_api_key
+
+        # self.embedder = NVIDIAEmbedding(
+        #     model="nvidia/nv-embedqa-e5-v5",
+        #     truncate="END",
+        #     api_key=self.nim_api_key
+        # )
+
+        # Where collections live: a Milvus server, or the in-process store under LOCAL_VECTOR_DIR
+        backend = backend or os.getenv("VECTOR_BACKEND", "milvus")
+        if backend == "milvus":
+            self.backend = MilvusBackend(host, port)
+        elif backend == "local":
+            self.backend = get_local_backend()
+        else:
+            raise ValueError(f"Unknown vector backend '{backend}'. Use one of: {', '.join(BACKENDS)}.")
+
+    @property
+    def embedder(self):
+        """Shared embedding model, loaded on first use."""
+        return get_embedding_model(self.model_name)
+
+    def create_or_load_collection(self, collection_name, partition_by_document=False):
+        if collection_name in self.list_collections():
+            print(f"Collection '{collection_name}' already exists. Loading collection.")
+            return self.get_collection(collection_name)
+        else:
+            # FLOAT16 halves the size of every stored vector
+            vector_type = VECTOR_DTYPES[self.vector_dtype][0]
+            fields = [
+                FieldSchema(name="id", dtype=DataType.INT64, is_primary=True),
+                FieldSchema(name="main_title_embedding", dtype=vector_type, dim=1024),
+                FieldSchema(name="section_title_embedding", dtype=vector_type, dim=1024),
+                FieldSchema(name="sub_heading_embedding", dtype=vector_type, dim=1024),
+                FieldSchema(name="content_embedding", dtype=vector_type, dim=1024),
+                FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
+                FieldSchema(name="sub_heading", dtype=DataType.VARCHAR, max_length=255),
+                FieldSchema(name="image_path", dtype=DataType.VARCHAR, max_length=1024)
+            ]
+            if partition_by_document:
+                # Milvus hashes the partition key into partitions, so filtering on it prunes the search
+                fields.append(FieldSchema(name="document", dtype=DataType.VARCHAR, max_length=512,
+                                          is_partition_key=True))
+            schema = CollectionSchema(fields, description=f"Embeddings collection for {collection_name}")
+
+            print(f"Creating collection '{collection_name}'.")
+            collection = self.backend.collection(collection_name, schema=schema)
+            with self._collections_lock:
+                self._collections[collection_name] = collection
+                self._collection_names = None
+            return collection
+
+    def list_collections(self, refresh=False):
+        """
+        Collection names, cached for collection_list_ttl seconds. Creating or dropping a collection
+        through this manager invalidates the cache; the TTL picks up changes made by other processes.
+        """
+        with self._collections_lock:
+            expired = time.monotonic() - self._collection_names_time > self.collection_list_ttl
+            if refresh or self._collection_names is None or expired:
+                self._collection_names = self.backend.list_collections()
+                self._collection_names_time = time.monotonic()
+            return list(self._collection_names)
+
+    def get_collection(self, collection_name):
+        """Cached handle of an existing collection. Raises if the collection does not exist."""
+        with self._collections_lock:
+            collection = self._collections.get(collection_name)
+        if collection is None:
+            # Without a schema, a missing collection raises instead of being created
+            collection = self.backend.collection(collection_name)
+            with self._collections_lock:
+                collection = self._collections.setdefault(collection_name, collection)
+        return collection
+
+    def forget_collection(self, collection_name):
+        """Drop every cached piece of state about a collection, e.g. after it disappeared on the server."""
+        with self._collections_lock:
+            self._collections.pop(collection_name, None)
+            self._loaded.pop(collection_name, None)
+            self._index_types.pop(collection_name, None)
+            self._collection_names = None
+
+    def drop_collection(self, collection_name):
+        """Release and drop a collection and invalidate the caches that mention it."""
+        collection = self.get_collection(collection_name)
+        collection.release()
+        self.backend.drop_collection(collection_name)
+        self.forget_collection(collection_name)
+        print(f"Dropped collection '{collection_name}'.")
+
+    @staticmethod
+    def _estimate_row_bytes(collection):
+        """Approximate in-memory size of one row, from the vector dimensions of the schema."""
+        row_bytes = 0
+        for field in collection.schema.fields:
+            if field.dtype == DataType.FLOAT_VECTOR:
+                row_bytes += field.params["dim"] * 4
+            elif field.dtype == DataType.FLOAT16_VECTOR:
+                row_bytes += field.params["dim"] * 2
+            elif field.dtype == DataType.VARCHAR:
+                row_bytes += VARCHAR_ESTIMATE_BYTES
+            else:
+                row_bytes += 8
+        return row_bytes
+
+    def ensure_loaded(self, collection_name):
+        """
+        Load a collection unless this manager already did, and mark it most recently used.
+        Loading past memory_budget releases the least recently used collections that are not in use.
+        """
+        collection = self.get_collection(collection_name)
+        with self._collections_lock:
+            if collection_name in self._loaded:
+                self._loaded.move_to_end(collection_name)
+                return collection
+
+        collection.load(timeout=self.search_timeout)
+        estimate = collection.num_entities * self._estimate_row_bytes(collection)
+
+        released = []
+        with self._collections_lock:
+            self._loaded[collection_name] = estimate
+            self._loaded.move_to_end(collection_name)
+            total = sum(self._loaded.values())
+            for name in list(self._loaded):
+                if total <= self.memory_budget:
+                    break
+                if name == collection_name or self._pinned.get(name):
+                    continue
+                total -= self._loaded.pop(name)
+                released.append(name)
+
+        for name in released:
+            try:
+                self.get_collection(name).release()
+                print(f"Released collection '{name}' to stay within the memory budget.")
+            except Exception as e:
+                print(f"Could not release collection '{name}': {e}")
+        return collection
+
+    @contextmanager
+    def loaded_collection(self, collection_name):
+        """Loaded collection that is protected from being released while the block runs."""
+        with self._collections_lock:
+            self._pinned[collection_name] = self._pinned.get(collection_name, 0) + 1
+        try:
+            yield self.ensure_loaded(collection_name)
+        finally:
+            with self._collections_lock:
+                self._pinned[collection_name] -= 1
+                if not self._pinned[collection_name]:
+                    del self._pinned[collection_name]
+
+    def is_document_collection(self, collection_name):
+        """
+        Whether a collection has the per-PDF document schema, unlike scratch or unrelated collections.
+        A collection that disappeared since the name list was cached is not one.
+        """
+        try:
+            fields = tuple(field.name for field in self.get_collection(collection_name).schema.fields)
+        except Exception:
+            return False
+        return fields == DOCUMENT_FIELDS
+
+    def list_documents(self, batch_size=1000):
+        """
+        Names of the stored documents: the document collections in the per-PDF layout, or the distinct
+        document tags of the corpus collection, read with a query iterator, in the corpus layout.
+        """
+        if self.layout != "corpus":
+            return [name for name in self.list_collections() if self.is_document_collection(name)]
+        if self.corpus_collection not in self.list_collections():
+            return []
+
+        documents = set()
+        iterator = self.ensure_loaded(self.corpus_collection).query_iterator(
+            batch_size=batch_size, expr="id >= 0", output_fields=["document"])
+        try:
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    break
+                documents.update(entity["document"] for entity in batch)
+        finally:
+            iterator.close()
+        return sorted(documents)
+
+    def delete_document(self, document):
+        """
+        Remove one document: its collection in the per-PDF layout, or only its rows in the corpus layout,
+        where the collection is shared with every other document.
+        """
+        if self.layout != "corpus":
+            self.drop_collection(document)
+            return
+
+        collection = self.get_collection(self.corpus_collection)
+        collection.delete(expr=f"document == {json.dumps(document)}")
+        collection.flush()
+        print(f"Deleted document '{document}' from '{self.corpus_collection}'.")
+
+    def document_collection(self, document):
+        """Name of the collection that stores the given document in the current layout."""
+        return self.corpus_collection if self.layout == "corpus" else document
+
+    def load_document_collection(self, document):
+        """Create or load the collection that stores the given document."""
+        if self.layout == "corpus":
+            return self.create_or_load_collection(self.corpus_collection, partition_by_document=True)
+        return self.create_or_load_collection(document)
+
+    @staticmethod
+    def row_id(document, node_path):
+        """Primary key of a node, stable across re-ingests and unique across documents."""
+        digest = hashlib.blake2b(f"{document}\x00{node_path}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") & ((1 << 63) - 1)
+
+    @staticmethod
+    def vector_numpy_dtype(collection, anns_field="content_embedding"):
+        """Numpy type that vectors of a field must be sent as, from the collection schema."""
+        for field in collection.schema.fields:
+            if field.name == anns_field and field.dtype == DataType.FLOAT16_VECTOR:
+                return np.float16
+        return np.float32
+
+    def search_params(self, collection, anns_field, radius=None):
+        """Search parameters matching the index that is built on anns_field."""
+        with self._collections_lock:
+            index_types = self._index_types.get(collection.name)
+        if index_types is None:
+            index_types = {index.field_name: index.params.get("index_type") for index in collection.indexes}
+            # Collections without indexes yet are looked up again on the next search
+            if index_types:
+                with self._collections_lock:
+                    self._index_types[collection.name] = index_types
+
+        params = dict(INDEX_TYPES.get(index_types.get(anns_field), INDEX_TYPES["HNSW"])[1])
+        if radius is not None:
+            # For IP the radius is the exclusive lower bound of the similarity range
+            params["radius"] = radius
+        return {"metric_type": "IP", "params": params}
+
+    def generate_embeddings(self, text_or_image_caption):
+        """Generate embeddings for the given text."""
+        return self.embedding_cache.encode_one(text_or_image_caption) if text_or_image_caption else ZERO_EMBEDDING
+
+    def generate_embeddings_batch(self, texts, batch_size=None):
+        """
+        Generate embeddings for a list of texts in batches. Empty texts get zero vectors, and repeated
+        or previously seen texts are served from the embedding cache instead of being encoded again.
+        """
+        return self.embedding_cache.encode(texts, batch_size=batch_size or self.batch_size)
+
+    def default_query_embeddings(self):
+        """Embeddings of DEFAULT_QUERIES as a (len(DEFAULT_QUERIES), EMBEDDING_DIM) matrix."""
+        with _default_query_lock:
+            embeddings = _default_query_embeddings.get(self.model_name)
+            if embeddings is None:
+                embeddings = self.generate_embeddings_batch(DEFAULT_QUERIES)
+                _default_query_embeddings[self.model_name] = embeddings
+        return embeddings
+
+    def create_search_context(self, query_text=None):
+        """Embed the user query once so every collection and search mode can reuse the vector."""
+        query_embedding = self.generate_embeddings(query_text) if query_text else None
+        return SearchContext(query_text, query_embedding, DEFAULT_QUERIES, self.default_query_embeddings())
+
+    def _query_context(self, query_text, context=None):
+        """
+        Search context with a query embedding, created unless context already has one.
+        An empty query searches with the zero vector, as generate_embeddings returns for empty text.
+        """
+        if context is None or context.query_embedding is None:
+            context = self.create_search_context(query_text)
+        if context.query_embedding is None:
+            context.query_embedding = ZERO_EMBEDDING
+        return context
+
+    def flatten_json_nodes(self, json_data, document=""):
+        """
+        Walk the JSON tree depth-first and return one row per node, in insertion order.
+        Row ids are hashed from the document and the node path, the chain of heading keys from the root,
+        so a node keeps its id when unrelated sections are added or removed.
+        """
+        rows = []
+        stack = [("", node) for node in reversed(self._keyed_nodes(json_data))]
+
+        while stack:
+            parent_path, (key, node) = stack.pop()
+            metadata = node.get("metadata", {})
+            path = f"{parent_path}/{key}"
+
+            if "image" in metadata:
+                content = metadata["caption"]
+            else:
+                content = node.get("content", "")
+
+            rows.append({
+                "id": self.row_id(document, path),
+                "main_title": metadata.get("main title", ""),
+                "section_title": metadata.get("section title", ""),
+                "sub_heading": metadata.get("sub heading", "").strip(),
+                "content": content,
+                "image_path": metadata.get("image", "No image available")
+            })
+
+            # Push children in reverse so they are visited in document order
+            stack.extend((path, child) for child in reversed(self._keyed_nodes(node.get("subheadings", []))))
+
+        return rows
+
+    @staticmethod
+    def _keyed_nodes(nodes):
+        """Pair sibling nodes with a key made of their headings (or image), numbered when repeated."""
+        keyed = []
+        seen = {}
+        for node in nodes:
+            metadata = node.get("metadata", {})
+            if "image" in metadata:
+                key = f"image:{metadata['image']}"
+            else:
+                key = "|".join(metadata.get(name, "").strip() for name in ("main title", "section title", "sub heading"))
+            seen[key] = seen.get(key, 0) + 1
+            keyed.append((f"{key}#{seen[key]}", node))
+        return keyed
+
+    def existing_rows(self, collection_name, batch_size=1000):
+        """
+        {id: (text, sub_heading, image_path)} of the rows already stored for a document, read without
+        vectors. Empty when the document has not been ingested yet, and when the collection has no indexes
+        yet: Milvus cannot load it to read the rows then, so every row is upserted again and rows the
+        document no longer has stay until it is re-ingested once the indexes exist.
+        """
+        target = self.document_collection(collection_name)
+        if target not in self.list_collections():
+            return {}
+
+        collection = self.get_collection(target)
+        if not collection.indexes:
+            # Deferred index builds leave the collection unindexed until the end of the dump
+            print(f"'{target}' has no indexes yet, so '{collection_name}' is written in full without a diff.")
+            return {}
+
+        collection = self.ensure_loaded(target)
+        expr = f"document == {json.dumps(collection_name)}" if self.layout == "corpus" else "id >= 0"
+        existing = {}
+
+        iterator = collection.query_iterator(batch_size=batch_size, expr=expr,
+                                             output_fields=["id", "text", "sub_heading", "image_path"])
+        try:
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    break
+                for entity in batch:
+                    existing[entity["id"]] = (entity["text"], entity["sub_heading"], entity["image_path"])
+        finally:
+            iterator.close()
+
+        return existing
+
+    def embed_rows(self, rows, batch_size=None):
+        """
+        Embed the main title, section title, sub heading and content of every row at once.
+        Returns an array of shape (len(rows), 4, EMBEDDING_DIM).
+        """
+        texts = []
+        for row in rows:
+            texts.extend([row["main_title"], row["section_title"], row["sub_heading"], row["content"]])
+
+        embeddings = self.generate_embeddings_batch(texts, batch_size=batch_size)
+        return embeddings.reshape(len(rows), 4, EMBEDDING_DIM)
+
+    def load_and_embed_json(self, json_file):
+        """
+        Load a JSON file, compare its nodes with the rows already stored for the document and embed
+        only the nodes that are new or changed.
+        Returns (collection_name, rows, embeddings, stale_ids), where stale_ids are stored rows that no
+        longer exist in the document, or None if the file cannot be parsed.
+        """
+        prepared, _ = self.embed_json(json_file)
+        return prepared
+
+    def embed_json(self, json_file):
+        """
+        load_and_embed_json that also tells whether the returned embeddings are durable, i.e. read from or
+        saved to the sidecar, so they survive a restart before the rows are inserted.
+        Returns (prepared, durable), where prepared is what load_and_embed_json returns.
+        """
+        collection_name = os.path.splitext(os.path.basename(json_file))[0]
+
+        # Load and parse the JSON file
+        with open(json_file, "r", encoding="utf-8") as file:
+            try:
+                json_data = json.load(file)  # Parse JSON file into a Python object
+            except json.JSONDecodeError as e:
+                print(f"Error parsing JSON file: {e}")
+                return None, False
+
+        rows = self.flatten_json_nodes(json_data, collection_name)
+        existing = self.existing_rows(collection_name)
+
+        # Titles are part of the id, so a row with an unchanged id only needs its own fields compared
+        changed = [
+            row for row in rows
+            if existing.get(row["id"]) != (row["content"], row["sub_heading"], row["image_path"])
+        ]
+        stale_ids = sorted(set(existing) - {row["id"] for row in rows})
+        print(f"'{collection_name}': {len(rows)} nodes, {len(changed)} new or changed, {len(stale_ids)} removed.")
+
+        embeddings, durable = self.sidecar_embeddings(json_file, rows, changed)
+        return (collection_name, changed, embeddings, stale_ids), durable
+
+    def sidecar_embeddings(self, json_file, rows, needed):
+        """
+        Embeddings of the needed rows, read from the .npy sidecar next to the JSON file where it has current
+        vectors and computed otherwise. The sidecar is rewritten when this completes it for all rows, so
+        rebuilding a collection later needs no model at all.
+        Returns (embeddings, durable), where durable tells whether they are all stored in the sidecar.
+        """
+        if not needed:
+            # Nothing to embed, e.g. an unchanged or empty document; an empty sidecar would be of no use
+            return np.zeros((0, 4, EMBEDDING_DIM), dtype=np.float32), True
+
+        sidecar = EmbeddingSidecar(json_file, self.model_name)
+        embeddings = sidecar.lookup(needed)
+        if embeddings is not None:
+            print(f"Loaded {len(needed)} embeddings from {sidecar.array_path}.")
+            return embeddings, True
+
+        # Collect every string of the missing nodes first so the model sees large batches instead of single strings
+        missing = [row for row in needed if sidecar.position(row) is None]
+        computed = dict(zip((row["id"] for row in missing), self.embed_rows(missing)))
+        self.embedding_cache.save()
+        print(f"Embedding cache: {self.embedding_cache.stats()}")
+
+        def vectors_of(row):
+            position = sidecar.position(row)
+            return sidecar.vectors[position] if position is not None else computed[row["id"]]
+
+        if all(row["id"] in computed or sidecar.position(row) is not None for row in rows):
+            sidecar.save(rows, np.stack([vectors_of(row) for row in rows]))
+            return sidecar.lookup(needed), True
+
+        return np.stack([vectors_of(row) for row in needed]), False
+
+    def insert_rows(self, collection_name, rows, embeddings, stale_ids=()):
+        """
+        Upsert embedded rows into the collection in buffered batches and delete stale_ids. In the corpus
+        layout the rows go to the shared collection, tagged with collection_name as their document.
+        """
+        collection = self.load_document_collection(collection_name)
+        inserter = BufferedInserter(collection, upsert=True)
+        corpus = self.layout == "corpus"
+        embeddings = np.asarray(embeddings, dtype=self.vector_numpy_dtype(collection))
+
+        for row, (main_title_emb, section_title_emb, sub_heading_emb, content_emb) in zip(rows, embeddings):
+            values = [
+                row["id"],
+                main_title_emb,
+                section_title_emb,
+                sub_heading_emb,
+                content_emb,
+                row["content"],
+                row["sub_heading"],
+                row["image_path"]
+            ]
+            if corpus:
+                values.append(collection_name)
+            inserter.add(values)
+
+        # Final flush so the tail of the document is not left in the buffer
+        inserter.flush()
+
+        stale_ids = list(stale_ids)
+        for start in range(0, len(stale_ids), 1000):
+            collection.delete(expr=f"id in {stale_ids[start:start + 1000]}")
+
+        latencies = inserter.batch_latencies
+        if latencies:
+            print(f"Upsert batches for '{collection_name}': {len(latencies)}, "
+                  f"avg {sum(latencies) / len(latencies) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms.")
+        print(f"Data upsert complete for '{collection_name}'. Records written: {inserter.total_rows}, "
+              f"deleted: {len(stale_ids)}.")
+
+    def process_and_insert_json(self, json_file):
+        """Process JSON data from a file and upsert into Milvus, handling both text and image nodes."""
+        prepared = self.load_and_embed_json(json_file)
+        if prepared:
+            self.insert_rows(*prepared)
+
+
+    def create_indexes(self, collection_name, index_type=None, wait=True):
+        """
+        Create indexes for the collection fields. An existing index of a different type is dropped
+        and rebuilt, which needs the collection released first.
+        The builds of all fields run side by side on the server; with wait=False this returns as soon as
+        Milvus accepted them, and wait_for_indexes polls for completion.
+        """
+        index_type = index_type or self.index_type
+        collection = self.load_document_collection(collection_name)
+        collection.flush()
+        build_params, _ = INDEX_TYPES[index_type]
+        index_params = {"index_type": index_type, "metric_type": "IP", "params": build_params}
+
+        existing = {index.field_name: index for index in collection.indexes}
+        if any(index.params.get("index_type") != index_type for index in existing.values()):
+            collection.release()
+            with self._collections_lock:
+                self._loaded.pop(collection.name, None)
+            for index in existing.values():
+                if index.params.get("index_type") != index_type:
+                    collection.drop_index(index_name=index.index_name)
+
+        for field in VECTOR_FIELDS:
+            # sync=False only waits for Milvus to accept the request, not for the build to finish
+            collection.create_index(field, index_params, sync=False)
+        with self._collections_lock:
+            self._index_types.pop(collection.name, None)
+
+        if wait:
+            self.wait_for_indexes([collection.name])
+            print(f"{index_type} indexes created for '{collection_name}'.")
+        else:
+            print(f"{index_type} index builds started for '{collection_name}'.")
+
+    def wait_for_indexes(self, collection_names, poll_interval=None, timeout=None):
+        """
+        Poll the build progress of every index of the given collections until all are finished,
+        printing the indexed row counts while they are running. Raises if a build fails or timeout
+        seconds pass.
+        """
+        poll_interval = poll_interval or float(os.getenv("INDEX_POLL_INTERVAL", "2"))
+        pending = {
+            (collection_name, index.index_name)
+            for collection_name in collection_names
+            for index in self.get_collection(collection_name).indexes
+        }
+        start = time.monotonic()
+
+        while pending:
+            progress_lines = []
+            for collection_name, index_name in sorted(pending):
+                progress = self.backend.index_building_progress(collection_name, index_name)
+                state = progress.get("state")
+                if state == "Failed":
+                    raise RuntimeError(f"Index '{index_name}' of '{collection_name}' failed to build.")
+                if state == "Finished":
+                    pending.discard((collection_name, index_name))
+                else:
+                    progress_lines.append(f"{collection_name}.{index_name}: "
+                                          f"{progress.get('indexed_rows', 0)}/{progress.get('total_rows', 0)}")
+
+            if not pending:
+                break
+            if timeout is not None and time.monotonic() - start > timeout:
+                raise TimeoutError(f"Index builds still running after {timeout} s: {', '.join(progress_lines)}")
+            print(f"Building indexes ({time.monotonic() - start:.0f} s): {', '.join(progress_lines)}")
+            time.sleep(poll_interval)
+
+    def build_indexes(self, documents, index_type=None):
+        """
+        Build or refresh the indexes once per collection touched by the documents, e.g. after a bulk load.
+        All builds are started before the first one is waited on.
+        """
+        collection_names = sorted({self.document_collection(document) for document in documents})
+        for collection_name in collection_names:
+            self.create_indexes(collection_name, index_type=index_type, wait=False)
+        self.wait_for_indexes(collection_names)
+        print(f"Indexes ready for {len(collection_names)} collection(s).")
+
+    def migrate_to_corpus(self, drop_source=False, batch_size=1000):
+        """
+        Copy every per-PDF collection into the shared corpus collection, tagging rows with their
+        collection name as document. Only collections with the document schema are copied, so scratch
+        and unrelated collections are left alone. Rows are streamed with a query iterator, so a collection
+        never has to fit in memory, and upserted, so an interrupted migration can simply be run again.
+        With drop_source, each source collection is dropped once copied.
+        """
+        corpus = self.create_or_load_collection(self.corpus_collection, partition_by_document=True)
+        sources = [name for name in self.list_collections()
+                   if name != self.corpus_collection and self.is_document_collection(name)]
+        output_fields = [field.name for field in corpus.schema.fields if field.name not in ("id", "document")]
+        vector_dtype = self.vector_numpy_dtype(corpus)
+
+        for collection_name in sources:
+            collection = self.ensure_loaded(collection_name)
+            inserter = BufferedInserter(corpus, upsert=True)
+            copied = 0
+
+            iterator = collection.query_iterator(batch_size=batch_size, expr="id >= 0",
+                                                 output_fields=["id"] + output_fields)
+            try:
+                while True:
+                    batch = iterator.next()
+                    if not batch:
+                        break
+                    for entity in batch:
+                        # Hashed ids are already unique across documents; old sequential ones are not
+                        entity_id = entity["id"]
+                        if entity_id < LEGACY_ID_LIMIT:
+                            entity_id = self.row_id(collection_name, entity_id)
+                        inserter.add([entity_id]
+                                     + [as_vector(entity[field], vector_dtype) if field in VECTOR_FIELDS
+                                        else entity[field] for field in output_fields]
+                                     + [collection_name])
+                    copied += len(batch)
+            finally:
+                iterator.close()
+
+            inserter.flush()
+            print(f"Migrated {copied} rows from '{collection_name}' into '{self.corpus_collection}'.")
+
+            if drop_source:
+                self.drop_collection(collection_name)
+
+        corpus.flush()
+        self.create_indexes(self.corpus_collection)
+        return sources
+
+    def query(self, query_text, anns_field="sub_heading_embedding", limit=5, threshold=0.80, context=None,
+              documents=None):
+        """
+        Query the collection with a given text and keep results at or above the similarity threshold.
+        Per-PDF searches also send the threshold to Milvus as the search radius, so fewer hits come back.
+        Pass a SearchContext to reuse a query embedding that was already computed for this request,
+        and documents to restrict the search to those documents.
+        """
+        print(f"Provided Answer field is: {anns_field}")
+
+        query_embedding = self._query_context(query_text, context).query_embedding
+
+        if anns_field == "content_embedding":
+            output_fields = ["text", "image_path", "sub_heading"]  # Get full content & metadata
+        else:
+            output_fields = ["text", "sub_heading"]
+
+        searched = self._search_documents([query_embedding], anns_field, limit, output_fields, documents,
+                                          threshold=threshold)
+        format_hits = self._content_hits if anns_field == "content_embedding" else self._text_hits
+
+        return {collection_name: format_hits(hits, collection_name, threshold)
+                for collection_name, (hits,) in searched.items()}
+
+    def _search_documents(self, data, anns_field, limit, output_fields, documents=None, threshold=None):
+        """
+        Search every document with the query vectors in data.
+        Returns {document: [hits of row 0, hits of row 1, ...]} with at most limit hits per row and document.
+        With threshold, ungrouped searches are range searches that only return hits scoring at or above it.
+        Milvus rejects range searches grouped by document, so corpus searches return the top hits per
+        document regardless, and callers keep those at or above the threshold.
+        """
+        # Milvus range searches keep scores strictly above the radius, so step just below the threshold
+        radius = None if threshold is None else float(np.nextafter(np.float32(threshold), np.float32(-np.inf)))
+
+        def search(collection, limit, output_fields, expr=None, **grouping):
+            dtype = self.vector_numpy_dtype(collection, anns_field)
+            return collection.search(
+                data=[np.asarray(vector, dtype=dtype) for vector in data],
+                anns_field=anns_field,
+                param=self.search_params(collection, anns_field, None if grouping else radius),
+                limit=limit,
+                expr=expr,
+                output_fields=output_fields,
+                timeout=self.search_timeout,
+                **grouping
+            )
+
+        return self._run_per_document(search, len(data), limit, output_fields, documents)
+
+    def _run_per_document(self, search, rows, limit, output_fields, documents=None):
+        """
+        Run search(collection, limit, output_fields, expr=None, **grouping) for every document and
+        return {document: [hits of row 0, ..., hits of row rows - 1]}. Per-PDF collections are searched
+        in parallel; the corpus collection gets one request grouped by document, so each document
+        contributes up to limit hits per row either way.
+        """
+        if self.layout != "corpus":
+            return self._fan_out(
+                lambda collection_name, collection: [list(hits) for hits in search(collection, limit, output_fields)],
+                documents
+            )
+
+        if self.corpus_collection not in self.list_collections():
+            return {}
+
+        expr = f"document in {json.dumps(list(documents))}" if documents else None
+        with self.loaded_collection(self.corpus_collection) as collection:
+            results = search(collection, self.corpus_search_documents, output_fields + ["document"], expr=expr,
+                             group_by_field="document", group_size=limit)
+
+        grouped = {}
+        for row, hits in enumerate(results):
+            for hit in hits:
+                document_hits = grouped.setdefault(hit.entity.get("document"), [[] for _ in range(rows)])
+                document_hits[row].append(hit)
+        return grouped
+
+    def hybrid_query(self, query_text, anns_fields=HYBRID_FIELDS, limit=5, ranker="rrf", weights=None,
+                     threshold=None, context=None, documents=None):
+        """
+        Search several vector fields with the query in one hybrid request per collection and let Milvus
+        fuse the hit lists, with reciprocal rank fusion or with weights (one per field, in anns_fields order).
+        Returns results shaped like query() on content_embedding; similarity holds the fused score, and
+        threshold, when given, is the minimum fused score. Fused scores are not cosine similarities:
+        RRF scores are at most len(anns_fields) / 61, and weighted scores lie between 0 and the sum of weights.
+        """
+        if ranker == "rrf":
+            rerank = RRFRanker(60)
+        elif ranker == "weighted":
+            if weights is not None and len(weights) != len(anns_fields):
+                raise ValueError(f"Got {len(weights)} weights for {len(anns_fields)} fields; "
+                                 f"pass one weight per field in anns_fields.")
+            rerank = WeightedRanker(*(weights or [1.0 / len(anns_fields)] * len(anns_fields)))
+        else:
+            raise ValueError(f"Unknown ranker '{ranker}'. Use 'rrf' or 'weighted'.")
+
+        context = self._query_context(query_text, context)
+
+        output_fields = ["text", "image_path", "sub_heading"]
+
+        def search(collection, search_limit, output_fields, expr=None, **grouping):
+            # Grouping applies to every sub-request too, so each field yields the same window per document
+            requests = [
+                AnnSearchRequest(data=[np.asarray(context.query_embedding,
+                                                  dtype=self.vector_numpy_dtype(collection, anns_field))],
+                                 anns_field=anns_field, param=self.search_params(collection, anns_field),
+                                 limit=search_limit, expr=expr)
+                for anns_field in anns_fields
+            ]
+            return collection.hybrid_search(requests, rerank, limit=search_limit, output_fields=output_fields,
+                                            timeout=self.search_timeout, **grouping)
+
+        # Fuse a window twice the size of the result, so hits ranked lower on one field can still rise
+        searched = self._run_per_document(search, 1, limit * 2, output_fields, documents)
+        return {collection_name: self._content_hits(hits[:limit], collection_name, threshold)
+                for collection_name, (hits,) in searched.items()}
+
+    def _fan_out(self, search_collection, collection_names=None):
+        """
+        Call search_collection(collection_name, collection) for every collection on a thread pool of
+        search_concurrency workers and return {collection_name: result} in collection order.
+        By default every document collection is searched; the corpus collection and scratch or unrelated
+        collections are not. Collections that are missing, fail to load or exceed search_timeout are
+        reported and left out.
+        """
+        if collection_names is None:
+            # The shared corpus collection only belongs to the corpus layout
+            collection_names = [name for name in self.list_collections()
+                                if name != self.corpus_collection and self.is_document_collection(name)]
+        if not collection_names:
+            return {}
+
+        def run(collection_name):
+            with self.loaded_collection(collection_name) as collection:
+                return search_collection(collection_name, collection)
+
+        results = {}
+        workers = max(1, min(self.search_concurrency, len(collection_names)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run, name): name for name in collection_names}
+            for future in as_completed(futures):
+                collection_name = futures[future]
+                try:
+                    results[collection_name] = future.result()
+                except Exception as e:
+                    print(f"Skipping collection '{collection_name}': {e}")
+                    # A dropped collection is looked up afresh next time. One that timed out or failed otherwise
+                    # stays loaded on the server, so it keeps counting against the memory budget.
+                    if collection_name not in self.list_collections(refresh=True):
+                        self.forget_collection(collection_name)
+
+        return {name: results[name] for name in collection_names if name in results}
+
+    @staticmethod
+    def _text_hits(hits, collection_name, threshold=None):
+        """Format the hits of one query row, keeping only those at or above threshold when one is given."""
+        return [
+            {
+                "text": hit.entity.get("text"),
+                "sub_heading": hit.entity.get("sub_heading"),
+                "collection_name": collection_name,
+                "similarity": hit.distance
+            }
+            for hit in hits
+            if threshold is None or hit.distance >= threshold
+        ]
+
+    @staticmethod
+    def _content_hits(hits, collection_name, threshold=None):
+        """Format hits of a content search, with the image path of each hit, keeping those at or above threshold."""
+        return [
+            {
+                "text": hit.entity.get("text"),  # Retrieve content
+                "image": hit.entity.get("image_path") or "No image provided",  # Image path or "No image provided"
+                "sub_heading": hit.entity.get("sub_heading"),
+                "collection_name": collection_name,
+                "similarity": hit.distance
+            }
+            for hit in hits
+            if threshold is None or hit.distance >= threshold
+        ]
+
+    def _search_sections(self, context, include_query=False, limit=5, documents=None):
+        """
+        Search all default queries, and optionally the user query, on sub_heading_embedding in one request
+        per collection. Result row i belongs to default query i; with include_query the last row belongs to
+        the user query.
+        """
+        data = list(context.default_embeddings)
+        if include_query:
+            data.append(context.query_embedding)
+
+        # Every row shares one limit and one search radius, so the default rows are trimmed to their top hit
+        # afterwards and the user row is held to its threshold by query_with_default_queries
+        return self._search_documents(data, "sub_heading_embedding", limit if include_query else 1,
+                                      ["text", "sub_heading"], documents)
+
+    @staticmethod
+    def _collect_default_hits(organized_results, collection_name, default_queries, results):
+        """Demultiplex a batched search back into organized_results[query][collection_name]."""
+        for query_text, hits in zip(default_queries, results):
+            for hit in list(hits)[:1]:
+                query_results = organized_results[query_text].setdefault(collection_name, [])
+                query_results.append({
+                    "text": hit.entity.get("text"),
+                    "similarity": hit.distance
+                })
+
+    def perform_default_queries(self, context=None, documents=None):
+        """Perform default searches and organize results by collection and query type."""
+        if context is None:
+            context = self.create_search_context()
+        default_queries = context.default_queries
+        organized_results = {query: {} for query in default_queries}
+
+        searched = self._search_sections(context, documents=documents)
+        for collection_name, results in searched.items():
+            self._collect_default_hits(organized_results, collection_name, default_queries, results)
+
+        return organized_results
+
+    def query_with_default_queries(self, query_text, limit=5, threshold=0.80, context=None, documents=None):
+        """
+        Run the user query on sub_heading_embedding together with the default queries,
+        one search request per collection. Returns (query results shaped like query(),
+        default results shaped like perform_default_queries()).
+        """
+        context = self._query_context(query_text, context)
+        default_queries = context.default_queries
+        combined_results = {}
+        organized_results = {query: {} for query in default_queries}
+
+        searched = self._search_sections(context, include_query=True, limit=limit, documents=documents)
+        for collection_name, results in searched.items():
+            self._collect_default_hits(organized_results, collection_name, default_queries, results)
+            # Default rows cannot share a radius with the user row, so its threshold is checked here
+            combined_results[collection_name] = self._text_hits(results[len(default_queries)], collection_name,
+                                                                threshold)
+
+        return combined_results, organized_results
+
+    def get_collection_stats(self, collection_names=None):
+        """
+        Row counts, index state and memory per collection, read from collection metadata without
+        loading or scanning any rows. Rows that were inserted but not yet flushed are not counted.
+        memory_bytes comes from the query nodes when the collection is loaded and is estimated from
+        the schema otherwise. Each collection takes several metadata requests, so collections are
+        read in parallel on search_concurrency threads.
+        """
+        if collection_names is None:
+            collection_names = self.list_collections()
+        if not collection_names:
+            return {}
+
+        workers = max(1, min(self.search_concurrency, len(collection_names)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(collection_names, executor.map(self._collection_stats, collection_names)))
+
+    def _collection_stats(self, collection_name):
+        """Stats of one collection for get_collection_stats, or {"error": message} if they cannot be read."""
+        try:
+            collection = self.get_collection(collection_name)
+            row_count = collection.num_entities
+
+            indexes = {}
+            for index in collection.indexes:
+                progress = self.backend.index_building_progress(collection_name, index.index_name)
+                indexes[index.field_name] = {
+                    "index_type": index.params.get("index_type"),
+                    "indexed_rows": progress.get("indexed_rows", 0),
+                    "pending_rows": progress.get("pending_index_rows", 0),
+                }
+
+            loaded = self.backend.is_loaded(collection_name)
+            if loaded:
+                memory_bytes = self.backend.loaded_memory(collection_name)
+            else:
+                memory_bytes = row_count * self._estimate_row_bytes(collection)
+
+            return {
+                "row_count": row_count,
+                "loaded": loaded,
+                "memory_bytes": memory_bytes,
+                "memory_estimated": not loaded,
+                "indexes": indexes,
+            }
+        except Exception as e:
+            print(f"Could not read stats of collection '{collection_name}': {e}")
+            self.forget_collection(collection_name)
+            return {"error": str(e)}
+
+    def get_column_counts(self):
+        """Get the count of items in each column of all collections."""
+        column_counts = {}
+
+        for collection_name, stats in self.get_collection_stats().items():
+            if "error" in stats:
+                continue
+            # Every field is required, so each column holds exactly one value per row
+            fields = [field.name for field in self.get_collection(collection_name).schema.fields]
+            column_counts[collection_name] = {field: stats["row_count"] for field in fields}
+
+        return column_counts
+
+# Example usage
+if __name__ == "__main__":
+
+    manager = MilvusEmbeddingManager()
+
+    json_files = sys.argv[1:]
+
+    if json_files:
+        for json_file in json_files:
+            manager.process_and_insert_json(json_file)
+            manager.create_indexes(os.path.splitext(os.path.basename(json_file))[0])
+
+    user_query = input("Enter your search query: ")
+
+    if user_query.strip():
+        content_results = manager.query(user_query, anns_field="content_embedding", limit=5)
+        # print("Content Results:", json.dumps(content_results, indent=4))
+
+        default_results = manager.perform_default_queries()
+        # print("Default Results:", json.dumps(default_results, indent=4))
+
+    column_counts = manager.get_column_counts()
+    print("Column counts:", json.dumps(column_counts, indent=4))
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import embedding_cache
+import embedding_models
+from embedding_models import DEFAULT_EMBEDDING_MODEL, EMBEDDING_DIM
+
+
+class FakeEmbeddingModel:
+    """Stand-in for SentenceTransformer: a unit vector seeded by each text, and a log of encode calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    @staticmethod
+    def vector(text):
+        seed = int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:4], "big")
+        vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        self.calls.append(texts)
+        vectors = np.stack([self.vector(text) for text in texts])
+        return vectors[0] if single else vectors
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Replaces the shared embedding model with FakeEmbeddingModel and starts from empty embedding caches."""
+    model = FakeEmbeddingModel()
+    monkeypatch.setitem(embedding_models._models, DEFAULT_EMBEDDING_MODEL, model)
+    monkeypatch.setattr(embedding_cache, "_caches", {})
+    monkeypatch.delenv("EMBEDDING_CACHE_DIR", raising=False)
+    return model
+
+
+@pytest.fixture
+def local_store(tmp_path, monkeypatch):
+    """Directory of a fresh local vector store, used by every manager created in the test."""
+    path = tmp_path / "vectors"
+    monkeypatch.setenv("LOCAL_VECTOR_DIR", str(path))
+    monkeypatch.setenv("INDEX_POLL_INTERVAL", "0.01")
+    # Automation jobs open the default parse cache, which would otherwise live in the real home directory
+    monkeypatch.setenv("PARSE_CACHE_DIR", str(tmp_path / "parse_cache"))
+    for name in ("MILVUS_LAYOUT", "VECTOR_BACKEND", "VECTOR_DTYPE", "INDEX_TYPE", "CORPUS_COLLECTION"):
+        monkeypatch.delenv(name, raising=False)
+    return path
+
+
+@pytest.fixture
+def make_manager(fake_model, local_store):
+    """Builds MilvusEmbeddingManagers on the local backend, so no Milvus server is needed."""
+    from retrieval import MilvusEmbeddingManager
+
+    def make(**kwargs):
+        return MilvusEmbeddingManager(backend="local", **kwargs)
+
+    return make
+
+
+def document_json(main_title="Paper", sections=None, images=()):
+    """
+    Document JSON shaped like the parser output. sections maps a section title to its content, or to a
+    (content, {sub heading: content}) pair; images are (image path, caption) pairs.
+    """
+    sections = sections if sections is not None else {
+        "Introduction": ("We study retrieval.", {"Background": "Earlier work used BM25."}),
+        "Results": "Recall improved.",
+    }
+    nodes = []
+    for section_title, value in sections.items():
+        content, subheadings = value if isinstance(value, tuple) else (value, {})
+        nodes.append({
+            "content": content,
+            "metadata": {"main title": main_title, "section title": section_title, "sub heading": ""},
+            "subheadings": [
+                {
+                    "content": sub_content,
+                    "metadata": {"main title": main_title, "section title": section_title, "sub heading": sub_heading},
+                    "subheadings": [],
+                }
+                for sub_heading, sub_content in subheadings.items()
+            ],
+        })
+    for image_path, caption in images:
+        nodes.append({
+            "content": f"Image with caption: {caption}",
+            "metadata": {"image": image_path, "caption": caption, "type": "image"},
+            "subheadings": [],
+        })
+    return nodes
+
+
+def write_document(directory, name, data=None):
+    """Write document JSON to <directory>/<name>.json and return the path."""
+    path = os.path.join(str(directory), f"{name}.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(document_json() if data is None else data, file)
+    return path
+
+
+def make_pdf(path, pages):
+    """Write a PDF to path. pages holds one list per page of (text, font size) lines, drawn top to bottom."""
+    import fitz
+
+    doc = fitz.open()
+    for lines in pages:
+        page = doc.new_page()
+        y = 72
+        for text, size in lines:
+            page.insert_text((72, y), text, fontsize=size)
+            y += size * 1.8
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def make_pdf_with_figures(path, page_count):
+    """Write a PDF with one captioned figure per page: a text line above the image and a caption below it."""
+    import fitz
+
+    doc = fitz.open()
+    for page_num in range(page_count):
+        page = doc.new_page()
+        pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False)
+        pixmap.set_rect(pixmap.irect, (40 * (page_num % 6), 90, 160))
+        page.insert_text((72, 180), f"Text above figure {page_num + 1}", fontsize=11)
+        page.insert_image(fitz.Rect(72, 200, 272, 400), pixmap=pixmap)
+        page.insert_text((72, 420), f"Figure {page_num + 1}: result on page {page_num + 1}", fontsize=11)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
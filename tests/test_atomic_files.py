@@ -0,0 +1,28 @@
+import json
+import os
+
+import pytest
+
+from atomic_files import write_json_atomic
+
+
+def test_write_replaces_the_file_and_leaves_no_temporary_files(tmp_path):
+    path = str(tmp_path / "data.json")
+    write_json_atomic(path, {"version": 1})
+    write_json_atomic(path, {"version": 2})
+
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file) == {"version": 2}
+    assert os.listdir(tmp_path) == ["data.json"]
+
+
+def test_a_failed_write_keeps_the_old_content(tmp_path):
+    path = str(tmp_path / "data.json")
+    write_json_atomic(path, {"version": 1})
+
+    with pytest.raises(TypeError):
+        write_json_atomic(path, {"version": object()})
+
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file) == {"version": 1}
+    assert os.listdir(tmp_path) == ["data.json"]
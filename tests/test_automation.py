@@ -0,0 +1,92 @@
+import pytest
+
+from automation import parse_concurrency, parse_worker_counts
+
+
+def test_worker_counts_are_three_positive_integers():
+    assert parse_worker_counts("4,1,1") == [4, 1, 1]
+    assert parse_worker_counts(" 2, 3 ,1") == [2, 3, 1]
+
+
+@pytest.mark.parametrize("value", ["4,1", "4,1,1,1", "0,1,1", "4,-1,1", "a,1,1", ""])
+def test_malformed_worker_counts_are_rejected(value):
+    assert parse_worker_counts(value) is None
+
+
+def test_concurrency_is_a_positive_integer():
+    assert parse_concurrency("4") == 4
+    for value in ("0", "-2", "x", ""):
+        assert parse_concurrency(value) is None
+
+
+@pytest.mark.parametrize("options", [["--concurrency", "x"], ["--concurrency", "0"],
+                                     ["--pipeline", "--concurrency", "4"]])
+def test_dump_rejects_bad_concurrency_before_doing_any_work(monkeypatch, capsys, options):
+    import asyncio
+
+    import automation
+
+    monkeypatch.setattr(automation.sys, "argv", ["automation.py", "dump", *options, "paper.pdf", "out"])
+
+    with pytest.raises(SystemExit):
+        asyncio.run(automation.main())
+    assert "--concurrency" in capsys.readouterr().out
+
+
+def test_async_dump_hashes_files_off_the_event_loop(make_manager, tmp_path, monkeypatch):
+    import asyncio
+    import threading
+
+    from automation import PDFToMilvusAutomation
+
+    automation = PDFToMilvusAutomation([str(tmp_path / "a.pdf"), str(tmp_path / "b.pdf")], str(tmp_path / "out"),
+                                       backend="local")
+    threads = []
+
+    def begin_pdf(pdf_path):
+        threads.append(threading.current_thread())
+        return None
+
+    monkeypatch.setattr(automation, "_begin_pdf", begin_pdf)
+    asyncio.run(automation.process_pdfs_and_dump_to_milvus_async(max_concurrency=2))
+
+    assert len(threads) == 2
+    assert all(thread is not threading.main_thread() for thread in threads)
+
+
+def test_embed_is_only_recorded_once_the_vectors_are_durable(make_manager, tmp_path):
+    import glob
+    import os
+
+    from automation import PDFToMilvusAutomation
+    from conftest import document_json, write_document
+
+    automation = PDFToMilvusAutomation(output_dir=str(tmp_path), backend="local")
+    pdf = tmp_path / "paper.pdf"
+    pdf.write_bytes(b"%PDF one")
+    json_path = write_document(tmp_path, "paper")
+    automation.manifest.begin("paper", str(pdf))
+    automation.manifest.mark_done("paper", "parse")
+    automation.manifest.mark_done("paper", "json", json_path=json_path)
+
+    # A first dump embeds every row, so the sidecar holds them all
+    prepared = automation._embed_json("paper", json_path)
+    assert automation.manifest.is_done("paper", "embed")
+    automation._insert_and_index("paper", json_path, prepared)
+
+    # Edited JSON without its sidecar: only the changed row is embedded and nothing holds all vectors
+    for path in glob.glob(os.path.join(str(tmp_path), "paper.embeddings*")):
+        os.remove(path)
+    write_document(tmp_path, "paper", document_json(sections={
+        "Introduction": ("We study retrieval.", {"Background": "Earlier work used BM25."}),
+        "Results": "Recall improved a lot.",
+    }))
+    automation.manifest.mark_done("paper", "json", json_path=json_path)
+
+    prepared = automation._embed_json("paper", json_path)
+    assert len(prepared[1]) == 1
+    assert not automation.manifest.is_done("paper", "embed", json_path)
+
+    automation._insert_and_index("paper", json_path, prepared)
+    assert automation.manifest.is_done("paper", "embed", json_path)
+    assert automation.manifest.is_complete("paper", json_path)
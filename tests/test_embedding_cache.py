@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+
+from conftest import FakeEmbeddingModel
+from embedding_cache import EmbeddingCache
+from embedding_models import DEFAULT_EMBEDDING_MODEL, EMBEDDING_DIM
+
+
+def shard_files(cache):
+    return sorted(name for name in os.listdir(cache.cache_dir) if name.endswith(".npy"))
+
+
+def test_repeated_texts_are_encoded_once(fake_model):
+    cache = EmbeddingCache(DEFAULT_EMBEDDING_MODEL)
+
+    embeddings = cache.encode(["Results", "Methods", "Results", ""])
+    cache.encode(["Methods"])
+
+    assert fake_model.calls == [["Results", "Methods"]]
+    np.testing.assert_array_equal(embeddings[0], embeddings[2])
+    np.testing.assert_array_equal(embeddings[3], np.zeros(EMBEDDING_DIM))
+    assert cache.stats()["hits"] == 2
+
+
+def test_model_encodes_the_original_text_and_whitespace_only_text(fake_model):
+    cache = EmbeddingCache(DEFAULT_EMBEDDING_MODEL)
+
+    embeddings = cache.encode(["Related  work\n", "Related work", "  "])
+
+    # Spacing variants share one entry, but the model sees the text as written
+    assert fake_model.calls == [["Related  work\n", "  "]]
+    np.testing.assert_allclose(embeddings[1], FakeEmbeddingModel.vector("Related  work\n"), atol=1e-6)
+    np.testing.assert_allclose(cache.encode_one("  "), FakeEmbeddingModel.vector("  "), atol=1e-6)
+
+
+def test_saved_embeddings_are_read_back_by_a_new_cache(fake_model, tmp_path):
+    cache = EmbeddingCache(DEFAULT_EMBEDDING_MODEL, cache_dir=str(tmp_path))
+    expected = cache.encode(["Introduction", "Conclusion"])
+    assert cache.save() == 2
+    assert cache.save() == 0
+
+    reloaded = EmbeddingCache(DEFAULT_EMBEDDING_MODEL, cache_dir=str(tmp_path))
+
+    np.testing.assert_array_equal(reloaded.encode(["Conclusion", "Introduction"]), expected[::-1])
+    assert len(fake_model.calls) == 1
+    assert reloaded.stats()["disk_entries"] == 2
+
+
+def test_shards_are_merged_as_saves_accumulate(fake_model, tmp_path):
+    cache = EmbeddingCache(DEFAULT_EMBEDDING_MODEL, cache_dir=str(tmp_path))
+    for number in range(40):
+        cache.encode([f"Heading {number}"])
+        cache.save()
+
+    # One shard per set bit of the number of saves
+    assert len(shard_files(cache)) == bin(40).count("1")
+    reloaded = EmbeddingCache(DEFAULT_EMBEDDING_MODEL, cache_dir=str(tmp_path))
+    assert reloaded.stats()["disk_entries"] == 40
+
+
+def test_shards_from_many_processes_are_merged_on_load(fake_model, tmp_path):
+    # Dump processes running side by side each start before the others save, so none merges their shards
+    caches = [EmbeddingCache(DEFAULT_EMBEDDING_MODEL, cache_dir=str(tmp_path)) for _ in range(5)]
+    for number, cache in enumerate(caches):
+        cache.encode([f"Heading {number}"])
+        cache.save()
+    assert len(shard_files(cache)) == 5
+
+    reloaded = EmbeddingCache(DEFAULT_EMBEDDING_MODEL, cache_dir=str(tmp_path), max_shards=3)
+
+    assert len(shard_files(reloaded)) == 1
+    reloaded.encode([f"Heading {number}" for number in range(5)])
+    assert len(fake_model.calls) == 5
@@ -0,0 +1,34 @@
+import sys
+import threading
+import time
+import types
+
+import embedding_models
+
+
+class CountingModel:
+    loads = 0
+
+    def __init__(self, name):
+        # Slow enough that concurrent callers overlap while the first one is loading
+        time.sleep(0.05)
+        CountingModel.loads += 1
+        self.name = name
+
+
+def test_model_is_loaded_once_and_shared_across_threads(monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=CountingModel))
+    monkeypatch.setattr(embedding_models, "_models", {})
+    CountingModel.loads = 0
+
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(embedding_models.get_embedding_model("m")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert CountingModel.loads == 1
+    assert all(model is models[0] for model in models)
+    assert embedding_models._models == {"m": models[0]}
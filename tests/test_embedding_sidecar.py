@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+
+from conftest import write_document
+from embedding_models import EMBEDDING_DIM
+from embedding_sidecar import EmbeddingSidecar, sidecar_path
+
+
+def make_rows(*contents):
+    return [{"id": number, "main_title": "Paper", "section_title": "Results", "sub_heading": "",
+             "content": content} for number, content in enumerate(contents)]
+
+
+def make_vectors(count):
+    return np.random.default_rng(count).standard_normal((count, 4, EMBEDDING_DIM)).astype(np.float32)
+
+
+def test_saved_vectors_are_looked_up_by_a_new_sidecar(tmp_path):
+    json_file = str(tmp_path / "paper.json")
+    rows, vectors = make_rows("a", "b", "c"), make_vectors(3)
+    EmbeddingSidecar(json_file, "model").save(rows, vectors)
+
+    sidecar = EmbeddingSidecar(json_file, "model")
+
+    # The stored rows in order come back as the memory map itself
+    assert isinstance(sidecar.lookup(rows), np.memmap)
+    np.testing.assert_array_equal(sidecar.lookup(rows), vectors)
+    np.testing.assert_array_equal(sidecar.lookup([rows[2], rows[0]]), vectors[[2, 0]])
+
+
+def test_rows_with_changed_text_are_stale(tmp_path):
+    json_file = str(tmp_path / "paper.json")
+    rows = make_rows("a", "b")
+    EmbeddingSidecar(json_file, "model").save(rows, make_vectors(2))
+    sidecar = EmbeddingSidecar(json_file, "model")
+
+    edited = make_rows("a", "b, revised")
+
+    assert sidecar.position(edited[0]) == 0
+    assert sidecar.position(edited[1]) is None
+    assert sidecar.lookup(edited) is None
+
+
+def test_saving_again_replaces_the_array_file(tmp_path):
+    json_file = str(tmp_path / "paper.json")
+    sidecar = EmbeddingSidecar(json_file, "model")
+    sidecar.save(make_rows("a"), make_vectors(1))
+    sidecar.save(make_rows("a", "b"), make_vectors(2))
+
+    arrays = [name for name in os.listdir(tmp_path) if name.endswith(".npy")]
+    assert arrays == [os.path.basename(sidecar.array_path)]
+    np.testing.assert_array_equal(EmbeddingSidecar(json_file, "model").lookup(make_rows("a", "b")), make_vectors(2))
+
+
+def test_vectors_of_another_model_are_ignored(tmp_path):
+    json_file = str(tmp_path / "paper.json")
+    rows = make_rows("a")
+    EmbeddingSidecar(json_file, "model").save(rows, make_vectors(1))
+
+    assert EmbeddingSidecar(json_file, "other-model").lookup(rows) is None
+
+
+def test_unreadable_metadata_is_ignored(tmp_path):
+    json_file = str(tmp_path / "paper.json")
+    with open(sidecar_path(json_file), "w", encoding="utf-8") as file:
+        file.write("{not json")
+
+    assert EmbeddingSidecar(json_file, "model").lookup(make_rows("a")) is None
+
+
+def test_an_empty_document_is_ingested_without_a_sidecar(make_manager, tmp_path):
+    manager = make_manager()
+    json_file = write_document(tmp_path, "empty", [])
+
+    collection_name, rows, embeddings, stale_ids = manager.load_and_embed_json(json_file)
+    manager.insert_rows(collection_name, rows, embeddings, stale_ids)
+
+    assert embeddings.shape == (0, 4, EMBEDDING_DIM)
+    assert not os.path.exists(sidecar_path(json_file))
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+import index_benchmark
+
+
+def test_exact_top_k_matches_a_full_sort():
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((200, 16)).astype(np.float32)
+    queries = rng.standard_normal((5, 16)).astype(np.float32)
+
+    top = index_benchmark.exact_top_k(vectors, queries, 10)
+
+    expected = np.argsort(-(queries @ vectors.T), axis=1, kind="stable")[:, :10]
+    np.testing.assert_array_equal(top, expected)
+
+
+def test_scratch_collections_get_unique_names():
+    names = {index_benchmark.scratch_collection_name("paper", "float16") for _ in range(20)}
+
+    assert len(names) == 20
+    assert all(name.startswith("paper_bench_float16_") for name in names)
+
+
+def test_existing_collections_are_never_dropped(monkeypatch):
+    dropped = []
+    monkeypatch.setattr(index_benchmark.utility, "has_collection", lambda name: True)
+    monkeypatch.setattr(index_benchmark.utility, "drop_collection", dropped.append)
+
+    with pytest.raises(ValueError, match="already exists"):
+        index_benchmark.create_scratch_collection("paper_bench_float32", np.zeros((2, 4)), [1, 2], "float32")
+    assert dropped == []
@@ -0,0 +1,78 @@
+from job_manifest import STAGES, JobManifest
+from parse_cache import ParseCache
+
+
+def write(path, data):
+    with open(path, "wb") as file:
+        file.write(data)
+    return str(path)
+
+
+def test_a_restarted_job_resumes_from_the_recorded_stages(tmp_path):
+    pdf = write(tmp_path / "paper.pdf", b"%PDF one")
+    json_path = write(tmp_path / "paper.json", b"[]")
+    manifest = JobManifest(str(tmp_path))
+    manifest.begin("paper", pdf)
+    for stage in ("parse", "json", "embed"):
+        manifest.mark_done("paper", stage, json_path=json_path)
+
+    resumed = JobManifest(str(tmp_path))
+    resumed.begin("paper", pdf)
+
+    assert [stage for stage in STAGES if resumed.is_done("paper", stage, json_path)] == ["parse", "json", "embed"]
+    assert not resumed.is_complete("paper", json_path)
+    for stage in ("insert", "index"):
+        resumed.mark_done("paper", stage)
+    assert JobManifest(str(tmp_path)).is_complete("paper", json_path)
+
+
+def test_a_changed_pdf_starts_over(tmp_path):
+    pdf = write(tmp_path / "paper.pdf", b"%PDF one")
+    manifest = JobManifest(str(tmp_path))
+    manifest.begin("paper", pdf)
+    manifest.mark_done("paper", "parse")
+
+    write(tmp_path / "paper.pdf", b"%PDF two")
+    manifest.begin("paper", pdf)
+
+    assert not manifest.is_done("paper", "parse")
+
+
+def test_a_changed_json_invalidates_the_stages_built_from_it(tmp_path):
+    pdf = write(tmp_path / "paper.pdf", b"%PDF one")
+    json_path = write(tmp_path / "paper.json", b"[]")
+    manifest = JobManifest(str(tmp_path))
+    manifest.begin("paper", pdf)
+    for stage in STAGES:
+        manifest.mark_done("paper", stage, json_path=json_path)
+
+    # Edited by hand after the dump: every stage from json on is stale until json is recorded again
+    write(tmp_path / "paper.json", b"[{}]")
+    assert manifest.is_done("paper", "parse", json_path)
+    assert not manifest.is_done("paper", "embed", json_path)
+
+    manifest.mark_done("paper", "json", json_path=json_path)
+    assert [stage for stage in STAGES if manifest.is_done("paper", stage, json_path)] == ["parse", "json"]
+
+
+def test_an_unchanged_json_is_hashed_once(tmp_path, monkeypatch):
+    pdf = write(tmp_path / "paper.pdf", b"%PDF one")
+    json_path = write(tmp_path / "paper.json", b"[]")
+    hashed = []
+    hash_file = ParseCache.hash_file
+    monkeypatch.setattr(ParseCache, "hash_file", staticmethod(lambda path: hashed.append(path) or hash_file(path)))
+    manifest = JobManifest(str(tmp_path))
+    manifest.begin("paper", pdf)
+    hashed.clear()
+
+    manifest.mark_done("paper", "json", json_path=json_path)
+    for stage in STAGES:
+        manifest.is_done("paper", stage, json_path)
+
+    assert hashed == [json_path]
+
+
+def test_an_unreadable_manifest_is_ignored(tmp_path):
+    write(tmp_path / JobManifest.FILE_NAME, b"{not json")
+
+    assert JobManifest(str(tmp_path)).documents == {}
@@ -0,0 +1,52 @@
+import os
+import time
+
+from parse_cache import ParseCache
+
+
+def write_file(path, data):
+    with open(path, "wb") as file:
+        file.write(data)
+    return str(path)
+
+
+def test_key_depends_on_pdf_content_and_settings(tmp_path):
+    cache = ParseCache(cache_dir=str(tmp_path / "cache"))
+    first = write_file(tmp_path / "a.pdf", b"%PDF one")
+    copy = write_file(tmp_path / "copy.pdf", b"%PDF one")
+    other = write_file(tmp_path / "b.pdf", b"%PDF two")
+    settings = {"result_type": "markdown", "premium_mode": True}
+
+    assert cache.make_key(first, settings) == cache.make_key(copy, dict(reversed(list(settings.items()))))
+    assert cache.make_key(first, settings) != cache.make_key(other, settings)
+    assert cache.make_key(first, settings) != cache.make_key(first, {"result_type": "text"})
+
+
+def test_put_then_get_round_trips_and_misses_return_none(tmp_path):
+    cache = ParseCache(cache_dir=str(tmp_path / "cache"))
+    images = [{"text": "caption", "metadata": {"image": "/img/a.png", "caption": "caption"}}]
+
+    assert cache.get("missing") is None
+    cache.put("key", "# Title\n", images)
+
+    assert cache.get("key") == {"markdown": "# Title\n", "images_with_caption": images}
+    assert not [name for name in os.listdir(cache.cache_dir) if name.endswith(".tmp")]
+
+
+def test_eviction_removes_least_recently_used_entries(tmp_path):
+    cache = ParseCache(cache_dir=str(tmp_path / "cache"), max_bytes=1 << 20)
+    cache.put("old", "a" * 100, [])
+    cache.put("used", "b" * 100, [])
+    # Make "old" the oldest entry and "used" a recently read one
+    past = time.time() - 100
+    os.utime(cache._entry_path("old"), (past, past))
+    os.utime(cache._entry_path("used"), (past + 1, past + 1))
+    cache.get("used")
+
+    # Room for two entries, so adding a third evicts exactly one
+    cache.max_bytes = os.path.getsize(cache._entry_path("used")) * 5 // 2
+    cache.put("new", "c" * 100, [])
+
+    assert cache.get("old") is None
+    assert cache.get("used") is not None
+    assert cache.get("new") is not None
@@ -0,0 +1,230 @@
+import types
+
+import parser as pdf_parser
+from conftest import make_pdf
+from parse_cache import ParseCache
+
+
+def output_paths(tmp_path, name="paper"):
+    return (str(tmp_path / "out" / f"{name}.md"), str(tmp_path / "out" / f"{name}.json"),
+            str(tmp_path / "out" / name))
+
+
+def test_llamaparse_results_are_served_from_the_parse_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLAMA_CLOUD_API_KEY", "test-key")
+    pdf_path = make_pdf(tmp_path / "paper.pdf", [[("Body text", 11)]])
+    calls = []
+
+    class FakeLlamaParse:
+        def __init__(self, **settings):
+            pass
+
+        def load_data(self, path):
+            calls.append(path)
+            return [types.SimpleNamespace(text="# Paper\n\n## Introduction\nHello.")]
+
+    monkeypatch.setattr(pdf_parser, "LlamaParse", FakeLlamaParse)
+    cache = ParseCache(cache_dir=str(tmp_path / "cache"))
+
+    first = pdf_parser.LlamaPDFParser(pdf_path, *output_paths(tmp_path), parse_cache=cache)
+    second = pdf_parser.LlamaPDFParser(pdf_path, *output_paths(tmp_path, "again"), parse_cache=cache)
+
+    assert calls == [pdf_path]
+    assert first.documents == second.documents == "# Paper\n\n## Introduction\nHello."
+    with open(output_paths(tmp_path, "again")[0], encoding="utf-8") as file:
+        assert file.read().startswith("# Paper")
+
+
+def test_async_parses_run_off_the_event_loop(tmp_path, monkeypatch):
+    import asyncio
+    import time
+
+    def slow_parse(self):
+        time.sleep(0.3)
+        return "# Paper\n\n## Introduction\nHello."
+
+    monkeypatch.setattr(pdf_parser.LlamaPDFParser, "_parse_pdf_locally", slow_parse)
+    pdf_paths = [make_pdf(tmp_path / f"paper{index}.pdf", [[("Body text", 11)]]) for index in range(3)]
+    ticks = []
+
+    async def ticker():
+        # Keeps running only if the parses leave the event loop free
+        while len(ticks) < 5:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.02)
+
+    async def main():
+        start = time.perf_counter()
+        parsers = await asyncio.gather(
+            *[pdf_parser.LlamaPDFParser.create_async(path, *output_paths(tmp_path, f"paper{index}"), engine="local")
+              for index, path in enumerate(pdf_paths)],
+            ticker(),
+        )
+        return parsers[:-1], time.perf_counter() - start
+
+    parsers, elapsed = asyncio.run(main())
+
+    assert [parser.documents for parser in parsers] == ["# Paper\n\n## Introduction\nHello."] * 3
+    assert elapsed < 0.8
+    assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.25
+
+
+def test_pooled_image_extraction_matches_the_serial_scan(tmp_path, monkeypatch):
+    from conftest import make_pdf_with_figures
+
+    pdf_path = make_pdf_with_figures(tmp_path / "figures.pdf", 6)
+    serial = pdf_parser._extract_images_from_page_range(pdf_path, str(tmp_path / "serial"), 0, 6)
+
+    monkeypatch.setattr(pdf_parser, "MIN_PAGES_PER_IMAGE_WORKER", 1)
+    parser = pdf_parser.LlamaPDFParser(pdf_path, *output_paths(tmp_path), defer_parse=True, engine="local",
+                                       image_workers=2)
+    pooled = parser._extract_images_with_captions()
+
+    assert [image["metadata"]["page_num"] for image in pooled] == [1, 2, 3, 4, 5, 6]
+    assert [image["metadata"]["caption"] for image in pooled] == [image["metadata"]["caption"] for image in serial]
+    assert " ".join(pooled[0]["metadata"]["caption"].split()) == "Text above figure 1 Figure 1: result on page 1"
+
+
+def scan_text_around_item(text_blocks, bbox, page_height, threshold_percentage=0.1):
+    """The original page-order scan that TextBlockIndex replaces, kept as the reference behaviour."""
+    before_text, after_text = "", ""
+    vertical_threshold_distance = page_height * threshold_percentage
+    for block in text_blocks:
+        vertical_distance = min(abs(block[3] - bbox.y0), abs(block[1] - bbox.y1))
+        if vertical_distance <= vertical_threshold_distance:
+            if block[3] < bbox.y0 and not before_text:
+                before_text = block[4]
+            elif block[1] > bbox.y1 and not after_text:
+                after_text = block[4]
+                break
+    return before_text, after_text
+
+
+def test_text_block_index_matches_the_page_order_scan():
+    import random
+
+    import fitz
+
+    rng = random.Random(7)
+    for _ in range(300):
+        blocks = []
+        for index in range(rng.randint(0, 25)):
+            y0 = rng.uniform(0, 780)
+            # Some blocks have no text, which the scan skips above an image but not below it
+            text = "" if rng.random() < 0.15 else f"block {index}"
+            blocks.append((rng.uniform(0, 300), y0, rng.uniform(300, 600), y0 + rng.uniform(5, 60), text))
+        y0 = rng.uniform(50, 700)
+        bbox = fitz.Rect(100, y0, 400, y0 + rng.uniform(10, 200))
+
+        index = pdf_parser.TextBlockIndex(blocks)
+        for threshold in (0.05, 0.1, 0.3):
+            assert pdf_parser.LlamaPDFParser.extract_text_around_item(index, bbox, 842, threshold) == \
+                scan_text_around_item(blocks, bbox, 842, threshold)
+
+
+def test_text_block_index_handles_pages_without_text():
+    import fitz
+
+    index = pdf_parser.TextBlockIndex([])
+    assert pdf_parser.LlamaPDFParser.extract_text_around_item(index, fitz.Rect(0, 100, 10, 200), 842) == ("", "")
+
+
+def nested_parse_markdown(md_content):
+    """The original parser that re-walked the hierarchy for every line, kept as the reference behaviour."""
+    main_title = ""
+    hierarchy = {}
+    current_levels = []
+
+    for line in md_content.splitlines():
+        if line.startswith("# "):
+            if not main_title:
+                main_title = line.strip("# ").strip()
+            continue
+
+        heading_match = pdf_parser.HEADING_PATTERN.match(line)
+        if heading_match:
+            level = len(heading_match.group(1))
+            while len(current_levels) >= level:
+                current_levels.pop()
+            current_levels.append(heading_match.group(2))
+            metadata = {
+                "main title": main_title,
+                "section title": current_levels[0],
+                "sub heading": current_levels[1] if len(current_levels) > 1 else "",
+            }
+            current_level = hierarchy
+            for heading in current_levels[:-1]:
+                current_level = current_level.setdefault(heading, {"content": "", "subheadings": {}})["subheadings"]
+            if current_levels[-1] not in current_level:
+                current_level[current_levels[-1]] = {"content": "", "metadata": metadata, "subheadings": {}}
+        elif current_levels:
+            current_level = hierarchy
+            for heading in current_levels[:-1]:
+                current_level = current_level[heading]["subheadings"]
+            current_level[current_levels[-1]]["content"] += line.strip() + "\n"
+
+    return hierarchy
+
+
+def markdown_parser():
+    return pdf_parser.LlamaPDFParser(None, None, None, None, defer_parse=True, engine="local")
+
+
+def test_markdown_hierarchy_keeps_headings_content_and_metadata():
+    hierarchy = markdown_parser()._parse_markdown_to_json(
+        "# Paper\n\n## Introduction\nFirst line.\n  Second line.  \n### Background\nOld work.\n"
+    )
+
+    introduction = hierarchy["Introduction"]
+    assert introduction["content"] == "First line.\nSecond line.\n"
+    assert introduction["metadata"] == {"main title": "Paper", "section title": "Introduction", "sub heading": ""}
+    background = introduction["subheadings"]["Background"]
+    assert background["content"] == "Old work.\n"
+    assert background["metadata"]["sub heading"] == "Background"
+
+
+def test_markdown_hierarchy_matches_the_nested_parser_on_random_documents():
+    import random
+
+    rng = random.Random(3)
+    line_choices = ["# Title", "# Second title", "## Intro", "## Methods", "### Setup", "### Intro", "#### Deep",
+                    "##### Deeper", "#NoSpace", "plain text", "  indented text  ", "", "- a list item",
+                    "Results ## not a heading"]
+    parser = markdown_parser()
+    for _ in range(500):
+        markdown = "\n".join(rng.choice(line_choices) for _ in range(rng.randint(0, 40)))
+        assert parser._parse_markdown_to_json(markdown) == nested_parse_markdown(markdown)
+
+
+def test_local_engine_infers_heading_levels_from_font_size(tmp_path, monkeypatch):
+    monkeypatch.delenv("LLAMA_CLOUD_API_KEY", raising=False)
+    body = "This sentence is ordinary body text of the paper."
+    pdf_path = make_pdf(tmp_path / "paper.pdf", [
+        [("A Study of Retrieval", 20), ("Introduction", 15), (body, 11), (body, 11), ("Background", 13), (body, 11)],
+        [("3", 11), ("Results", 15), (body, 11), (body, 11)],
+    ])
+
+    parser = pdf_parser.LlamaPDFParser(pdf_path, *output_paths(tmp_path), engine="local")
+    headings = [line for line in parser.documents.splitlines() if line.startswith("#")]
+
+    assert headings == ["# A Study of Retrieval", "## Introduction", "### Background", "## Results"]
+    # Page numbers stay body text even though they are short
+    assert "3" in parser.documents.splitlines()
+    hierarchy = parser.split_heading_wise()
+    assert list(hierarchy) == ["Introduction"]
+    assert list(hierarchy["Introduction"]["subheadings"]) == ["Background", "Results"]
+
+
+def test_local_engine_rejects_pdfs_without_text(tmp_path):
+    import pytest
+
+    pdf_path = make_pdf(tmp_path / "empty.pdf", [[]])
+    with pytest.raises(ValueError):
+        pdf_parser.LlamaPDFParser(pdf_path, *output_paths(tmp_path), engine="local")
+
+
+def test_unknown_parse_engine_is_rejected(tmp_path):
+    import pytest
+
+    with pytest.raises(ValueError):
+        pdf_parser.LlamaPDFParser(None, *output_paths(tmp_path), engine="ocr")
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from pipeline import IngestPipeline
+
+
+class FakeAutomation:
+    """Automation double whose stage helpers record what passed through them."""
+
+    def __init__(self, fail_embed=()):
+        self.fail_embed = set(fail_embed)
+        self.inserted = []
+        self.lock = threading.Lock()
+
+    def _begin_pdf(self, pdf_path):
+        base_name = pdf_path[:-len(".pdf")]
+        if base_name == "done":
+            return None
+        return base_name, f"{base_name}.md", f"{base_name}.json", base_name
+
+    def _needs_parse(self, base_name, json_path):
+        return False
+
+    def _embed_json(self, base_name, json_path):
+        if base_name in self.fail_embed:
+            raise RuntimeError("embedding failed")
+        return f"vectors of {base_name}"
+
+    def _insert_and_index(self, base_name, json_path, prepared):
+        with self.lock:
+            self.inserted.append((base_name, json_path, prepared))
+
+
+def test_every_pdf_flows_through_all_stages():
+    automation = FakeAutomation()
+    pdf_paths = [f"doc{index}.pdf" for index in range(10)]
+
+    IngestPipeline(automation, parse_workers=3, embed_workers=2, insert_workers=2, queue_size=1).run(pdf_paths)
+
+    assert sorted(automation.inserted) == sorted(
+        (f"doc{index}", f"doc{index}.json", f"vectors of doc{index}") for index in range(10)
+    )
+
+
+def test_failed_and_finished_documents_do_not_stop_the_others():
+    automation = FakeAutomation(fail_embed={"doc1"})
+
+    IngestPipeline(automation, parse_workers=2).run(["doc0.pdf", "doc1.pdf", "done.pdf", "doc2.pdf"])
+
+    assert sorted(base_name for base_name, _, _ in automation.inserted) == ["doc0", "doc2"]
+
+
+@pytest.mark.parametrize("workers", [(0, 1, 1), (4, 0, 1), (4, 1, -1)])
+def test_stages_without_workers_are_rejected(workers):
+    with pytest.raises(ValueError):
+        IngestPipeline(FakeAutomation(), *workers)
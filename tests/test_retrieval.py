@@ -0,0 +1,455 @@
+import numpy as np
+import pytest
+
+from conftest import FakeEmbeddingModel, document_json
+from embedding_models import EMBEDDING_DIM
+
+
+def test_flatten_json_nodes_walks_the_tree_in_document_order(make_manager):
+    manager = make_manager()
+    data = document_json(images=[("/img/fig1.png", "Architecture overview")])
+
+    rows = manager.flatten_json_nodes(data, "paper")
+
+    assert [(row["section_title"], row["sub_heading"]) for row in rows] == [
+        ("Introduction", ""), ("Introduction", "Background"), ("Results", ""), ("", ""),
+    ]
+    assert rows[1]["content"] == "Earlier work used BM25."
+    # Image nodes are searched by their caption and keep their file
+    assert rows[3]["content"] == "Architecture overview"
+    assert rows[3]["image_path"] == "/img/fig1.png"
+    assert rows[0]["image_path"] == "No image available"
+
+
+def test_embed_rows_encodes_every_string_of_a_document_in_one_call(make_manager, fake_model):
+    manager = make_manager()
+    rows = manager.flatten_json_nodes(document_json(), "paper")
+
+    embeddings = manager.embed_rows(rows)
+
+    assert embeddings.shape == (len(rows), 4, EMBEDDING_DIM)
+    assert len(fake_model.calls) == 1
+    for row, vectors in zip(rows, embeddings):
+        texts = (row["main_title"], row["section_title"], row["sub_heading"], row["content"])
+        for text, vector in zip(texts, vectors):
+            expected = FakeEmbeddingModel.vector(text) if text else np.zeros(EMBEDDING_DIM)
+            np.testing.assert_allclose(vector, expected, atol=1e-6)
+
+
+class RecordingCollection:
+    """Collection double that records the batches sent to insert and upsert."""
+
+    name = "recording"
+
+    def __init__(self):
+        self.batches = []
+
+    def insert(self, columns):
+        self.batches.append(("insert", columns))
+
+    def upsert(self, columns):
+        self.batches.append(("upsert", columns))
+
+
+def test_buffered_inserter_sends_columnar_batches_of_max_rows():
+    from retrieval import BufferedInserter
+
+    collection = RecordingCollection()
+    inserter = BufferedInserter(collection, max_rows=2, max_bytes=1 << 20)
+    for row_id in range(5):
+        inserter.add([row_id, f"text {row_id}"])
+    inserter.flush()
+
+    assert [(kind, columns[0]) for kind, columns in collection.batches] == [
+        ("insert", [0, 1]), ("insert", [2, 3]), ("insert", [4]),
+    ]
+    assert collection.batches[0][1][1] == ["text 0", "text 1"]
+    assert inserter.total_rows == 5
+    assert inserter.flush() == 0
+
+
+def test_buffered_inserter_flushes_before_a_row_would_pass_max_bytes():
+    from retrieval import BufferedInserter
+
+    collection = RecordingCollection()
+    inserter = BufferedInserter(collection, max_rows=100, max_bytes=4096 + 100, upsert=True)
+    vector = np.zeros(1024, dtype=np.float32)
+    for row_id in range(3):
+        inserter.add([row_id, vector])
+    inserter.flush()
+
+    assert [(kind, columns[0]) for kind, columns in collection.batches] == [
+        ("upsert", [0]), ("upsert", [1]), ("upsert", [2]),
+    ]
+
+
+def test_empty_query_searches_with_the_zero_vector(make_manager, tmp_path):
+    from conftest import write_document
+
+    manager = make_manager()
+    manager.process_and_insert_json(write_document(tmp_path, "paper"))
+
+    # Every stored vector scores 0 against the zero vector, so nothing reaches the threshold
+    assert manager.query("", threshold=0.5) == {"paper": []}
+    assert manager.query(None, anns_field="content_embedding", threshold=0.5) == {"paper": []}
+    combined, defaults = manager.query_with_default_queries("", threshold=0.5)
+    assert combined == {"paper": []}
+    assert set(defaults) == set(manager.create_search_context().default_queries)
+    fused = manager.hybrid_query("", limit=2)
+    assert len(fused["paper"]) == 2
+
+
+def ingest(manager, directory, *names):
+    """Ingest one default document per name and return the JSON paths."""
+    from conftest import write_document
+
+    paths = [write_document(directory, name) for name in names]
+    for path in paths:
+        manager.process_and_insert_json(path)
+    return paths
+
+
+def count_searches(monkeypatch):
+    """Record the number of query vectors of every local search request."""
+    from vector_backends import LocalCollection
+
+    requests = []
+    search = LocalCollection.search
+
+    def recording_search(self, data, *args, **kwargs):
+        requests.append((self.name, len(data)))
+        return search(self, data, *args, **kwargs)
+
+    monkeypatch.setattr(LocalCollection, "search", recording_search)
+    return requests
+
+
+def test_default_queries_are_one_batched_search_per_collection(make_manager, tmp_path, monkeypatch):
+    manager = make_manager()
+    ingest(manager, tmp_path, "paper", "other")
+    context = manager.create_search_context("retrieval recall")
+    requests = count_searches(monkeypatch)
+
+    combined, defaults = manager.query_with_default_queries("retrieval recall", threshold=-1.0, context=context)
+
+    rows = len(context.default_queries) + 1
+    assert sorted(requests) == [("other", rows), ("paper", rows)]
+    # Each default query keeps the top hit a search of its own would find
+    for query_text, vector in zip(context.default_queries, context.default_embeddings):
+        for name in ("paper", "other"):
+            (hits,) = manager.get_collection(name).search([vector], "sub_heading_embedding", {"params": {}}, 1,
+                                                          output_fields=["text"])
+            (hit,) = defaults[query_text][name]
+            assert hit["text"] == hits[0].entity.get("text")
+            assert hit["similarity"] == pytest.approx(hits[0].distance, abs=1e-6)
+    single = manager.query("retrieval recall", threshold=-1.0, context=context)
+    assert {name: [hit["text"] for hit in hits] for name, hits in combined.items()} == \
+        {name: [hit["text"] for hit in hits] for name, hits in single.items()}
+
+
+def test_fan_out_searches_collections_in_parallel_up_to_the_cap(make_manager, tmp_path):
+    import threading
+    import time
+
+    manager = make_manager()
+    ingest(manager, tmp_path, "a", "b", "c", "d")
+    manager.search_concurrency = 2
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def search(collection_name, collection):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return collection_name.upper()
+
+    assert manager._fan_out(search) == {"a": "A", "b": "B", "c": "C", "d": "D"}
+    assert peak[0] == 2
+
+
+def test_fan_out_leaves_out_missing_and_failing_collections(make_manager, tmp_path):
+    manager = make_manager()
+    ingest(manager, tmp_path, "paper", "broken")
+
+    def search(collection_name, collection):
+        if collection_name == "broken":
+            raise TimeoutError("search timed out")
+        return collection.num_entities
+
+    assert manager._fan_out(search, ["missing", "paper", "broken"]) == {"paper": 3}
+    # A timed-out collection is still loaded on the server and keeps counting against the memory budget
+    assert "broken" in manager._loaded
+    assert "missing" not in manager._collections
+    # Searches through the public API skip the failing collection the same way
+    assert list(manager.query("retrieval", threshold=-1.0, documents=["missing", "paper"])) == ["paper"]
+
+
+def test_fan_out_skips_collections_that_are_not_documents(make_manager, tmp_path):
+    from pymilvus import CollectionSchema, DataType, FieldSchema
+
+    manager = make_manager()
+    ingest(manager, tmp_path, "paper")
+    scratch = CollectionSchema([FieldSchema(name="id", dtype=DataType.INT64, is_primary=True),
+                                FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=EMBEDDING_DIM)])
+    manager.backend.collection("paper_bench_float32_1a2b3c4d", schema=scratch)
+    searched = []
+
+    manager._fan_out(lambda collection_name, collection: searched.append(collection_name))
+
+    assert manager.list_collections(refresh=True) == ["paper", "paper_bench_float32_1a2b3c4d"]
+    assert searched == ["paper"]
+
+
+def test_migrate_to_corpus_copies_only_document_collections_and_can_be_rerun(make_manager, tmp_path):
+    from pymilvus import CollectionSchema, DataType, FieldSchema
+
+    per_pdf = make_manager()
+    ingest(per_pdf, tmp_path, "paper", "other")
+    scratch = CollectionSchema([FieldSchema(name="id", dtype=DataType.INT64, is_primary=True),
+                                FieldSchema(name="content_embedding", dtype=DataType.FLOAT_VECTOR, dim=EMBEDDING_DIM)])
+    per_pdf.backend.collection("paper_bench_float16_1a2b3c4d", schema=scratch)
+
+    corpus = make_manager(layout="corpus")
+    assert corpus.migrate_to_corpus() == ["other", "paper"]
+    # Running again after an interruption upserts the same rows instead of duplicating them
+    corpus.migrate_to_corpus()
+
+    assert corpus.get_collection(corpus.corpus_collection).num_entities == 6
+    assert corpus.list_documents() == ["other", "paper"]
+    assert per_pdf.list_documents() == ["other", "paper"]
+
+
+def test_delete_document_in_the_corpus_layout_keeps_other_documents(make_manager, tmp_path):
+    manager = make_manager(layout="corpus")
+    ingest(manager, tmp_path, "paper", "other")
+
+    manager.delete_document("paper")
+
+    assert manager.list_collections(refresh=True) == [manager.corpus_collection]
+    assert manager.list_documents() == ["other"]
+    assert list(manager.query("retrieval", threshold=-1.0)) == ["other"]
+
+
+def test_collection_handles_and_names_are_cached_until_created_or_dropped(make_manager, tmp_path):
+    manager = make_manager()
+    ingest(manager, tmp_path, "paper")
+
+    assert manager.get_collection("paper") is manager.get_collection("paper")
+    assert manager.list_collections() == ["paper"]
+    # A collection created behind the manager's back only shows up after a refresh
+    manager.backend.collection("outside", schema=manager.get_collection("paper").schema)
+    assert manager.list_collections() == ["paper"]
+    assert manager.list_collections(refresh=True) == ["outside", "paper"]
+
+    manager.drop_collection("outside")
+    assert manager.list_collections() == ["paper"]
+
+
+def test_loaded_collections_are_released_coldest_first_past_the_memory_budget(make_manager, tmp_path):
+    ingest(make_manager(), tmp_path, "a", "b", "c")
+    manager = make_manager()
+    collection_bytes = manager.get_collection("a").num_entities * manager._estimate_row_bytes(manager.get_collection("a"))
+    manager.memory_budget = 2 * collection_bytes
+    for name in ("a", "b", "c"):
+        manager.get_collection(name).release()
+
+    manager.ensure_loaded("a")
+    manager.ensure_loaded("b")
+    manager.ensure_loaded("a")
+    manager.ensure_loaded("c")
+
+    assert list(manager._loaded) == ["a", "c"]
+    assert [manager.backend.is_loaded(name) for name in ("a", "b", "c")] == [True, False, True]
+
+    # A collection in use by a search is not released, even when it is the coldest
+    with manager.loaded_collection("a"):
+        manager.ensure_loaded("b")
+        manager.ensure_loaded("c")
+    assert list(manager._loaded) == ["a", "c"]
+    assert not manager.backend.is_loaded("b")
+
+
+def test_collection_stats_come_from_metadata_without_scanning_rows(make_manager, tmp_path, monkeypatch):
+    from vector_backends import LocalCollection
+
+    manager = make_manager()
+    ingest(manager, tmp_path, "paper")
+    manager.create_indexes("paper")
+    manager.get_collection("paper").release()
+
+    def no_scans(*args, **kwargs):
+        raise AssertionError("collection stats must not read rows")
+
+    monkeypatch.setattr(LocalCollection, "query_iterator", no_scans)
+    monkeypatch.setattr(LocalCollection, "search", no_scans)
+
+    stats = manager.get_collection_stats(["paper", "missing"])
+
+    paper = stats["paper"]
+    assert paper["row_count"] == 3
+    assert not paper["loaded"] and paper["memory_estimated"]
+    assert paper["memory_bytes"] == 3 * manager._estimate_row_bytes(manager.get_collection("paper"))
+    assert paper["indexes"]["content_embedding"] == {"index_type": "HNSW", "indexed_rows": 3, "pending_rows": 0}
+    assert "error" in stats["missing"]
+    assert manager.get_column_counts() == {"paper": {field: 3 for field in
+                                                     ("id", "main_title_embedding", "section_title_embedding",
+                                                      "sub_heading_embedding", "content_embedding", "text",
+                                                      "sub_heading", "image_path")}}
+
+
+def test_hybrid_query_checks_one_weight_per_field(make_manager, tmp_path):
+    manager = make_manager()
+    ingest(manager, tmp_path, "paper")
+
+    with pytest.raises(ValueError, match="2 weights for 3 fields"):
+        manager.hybrid_query("retrieval", ranker="weighted", weights=[0.5, 0.5])
+    with pytest.raises(ValueError, match="Unknown ranker"):
+        manager.hybrid_query("retrieval", ranker="max")
+
+    weighted = manager.hybrid_query("retrieval", ranker="weighted", weights=[0.2, 0.3, 0.5], limit=3)
+    assert all(0.0 < hit["similarity"] < 1.0 for hit in weighted["paper"])
+
+
+def test_hybrid_query_keeps_fused_scores_at_or_above_the_threshold(make_manager, tmp_path):
+    manager = make_manager()
+    ingest(manager, tmp_path, "paper")
+
+    # Weighted scores follow the similarities, so unlike rank-based RRF scores they do not tie
+    fused = manager.hybrid_query("retrieval", limit=3, ranker="weighted")["paper"]
+    scores = sorted(hit["similarity"] for hit in fused)
+    filtered = manager.hybrid_query("retrieval", limit=3, ranker="weighted", threshold=scores[1])["paper"]
+
+    assert [hit["similarity"] for hit in filtered] == sorted(scores[1:], reverse=True)
+
+
+@pytest.mark.parametrize("layout", ["per_pdf", "corpus"])
+def test_query_threshold_is_inclusive_and_never_combined_with_grouping(make_manager, tmp_path, monkeypatch, layout):
+    from vector_backends import LocalCollection
+
+    manager = make_manager(layout=layout)
+    ingest(manager, tmp_path, "paper", "other")
+    search = LocalCollection.search
+
+    def milvus_search(self, data, anns_field, param, limit, group_by_field=None, **kwargs):
+        # Milvus refuses range searches grouped by a field
+        if group_by_field and "radius" in param["params"]:
+            raise ValueError("range search does not support group by")
+        return search(self, data, anns_field, param, limit, group_by_field=group_by_field, **kwargs)
+
+    monkeypatch.setattr(LocalCollection, "search", milvus_search)
+
+    everything = manager.query("retrieval", threshold=-1.0)
+    for anns_field in ("sub_heading_embedding", "content_embedding"):
+        scores = [hit["similarity"] for hit in manager.query("retrieval", anns_field=anns_field,
+                                                             threshold=-1.0)["paper"]]
+        threshold = sorted(scores)[1]
+        kept = manager.query("retrieval", anns_field=anns_field, threshold=threshold)
+
+        # The hit scoring exactly the threshold is kept
+        assert sorted(hit["similarity"] for hit in kept["paper"]) == sorted(score for score in scores
+                                                                            if score >= threshold)
+        assert threshold in [hit["similarity"] for hit in kept["paper"]]
+        assert all(hit["similarity"] >= threshold for hits in kept.values() for hit in hits)
+    assert sorted(everything) == ["other", "paper"]
+
+
+def test_reingest_is_idempotent_and_rewrites_only_the_changed_sections(make_manager, tmp_path, fake_model):
+    from conftest import write_document
+
+    manager = make_manager()
+    path = write_document(tmp_path, "paper")
+    manager.process_and_insert_json(path)
+    # Rows are read back for the diff once the collection is indexed, as after a normal dump
+    manager.create_indexes("paper")
+    ids = manager.existing_rows("paper")
+
+    # Re-dumping the same document changes nothing
+    _, changed, embeddings, stale_ids = manager.load_and_embed_json(path)
+    assert changed == [] and stale_ids == [] and len(embeddings) == 0
+    manager.process_and_insert_json(path)
+    assert manager.existing_rows("paper") == ids
+
+    fake_model.calls.clear()
+    write_document(tmp_path, "paper", document_json(sections={
+        "Introduction": ("We study retrieval.", {"Background": "Earlier work used BM25 and DPR."}),
+    }))
+    _, changed, embeddings, stale_ids = manager.load_and_embed_json(path)
+    manager.process_and_insert_json(path)
+
+    assert [row["content"] for row in changed] == ["Earlier work used BM25 and DPR."]
+    assert embeddings.shape == (1, 4, EMBEDDING_DIM)
+    assert fake_model.calls == [["Earlier work used BM25 and DPR."]]
+    # Ids follow the node path, so the edited section keeps its row and the dropped one is deleted
+    rows = manager.existing_rows("paper")
+    assert set(rows) == set(ids) - set(stale_ids)
+    assert len(stale_ids) == 1
+    assert ids[stale_ids[0]][0] == "Recall improved."
+    assert manager.get_collection("paper").num_entities == 2
+
+
+def refuse_loading_unindexed_collections(monkeypatch):
+    """Make local collections refuse to load without indexes, as Milvus does."""
+    from vector_backends import LocalCollection
+
+    load = LocalCollection.load
+
+    def milvus_load(self, **kwargs):
+        if not self.indexes:
+            raise RuntimeError(f"index not found for collection '{self.name}'")
+        load(self, **kwargs)
+
+    monkeypatch.setattr(LocalCollection, "load", milvus_load)
+
+
+def test_deferred_corpus_ingest_loads_every_document_before_building_indexes(make_manager, tmp_path, monkeypatch):
+    refuse_loading_unindexed_collections(monkeypatch)
+    manager = make_manager(layout="corpus")
+
+    # Nothing is indexed until the end of the dump, so neither document can be diffed against the corpus
+    ingest(manager, tmp_path, "paper", "other")
+    assert manager.get_collection(manager.corpus_collection).num_entities == 6
+
+    manager.build_indexes(["paper", "other"])
+    assert sorted(manager.query("retrieval", threshold=-1.0)) == ["other", "paper"]
+    assert len(manager.existing_rows("paper")) == 3
+
+
+def test_per_pdf_redump_after_an_interrupted_deferred_build(make_manager, tmp_path, monkeypatch):
+    refuse_loading_unindexed_collections(monkeypatch)
+    manager = make_manager()
+    ingest(manager, tmp_path, "paper")
+
+    # Re-dumping before the indexes were built upserts the same rows again
+    ingest(manager, tmp_path, "paper")
+    manager.build_indexes(["paper"])
+
+    assert manager.get_collection("paper").num_entities == 3
+
+
+def test_collection_stats_are_read_in_parallel(make_manager, tmp_path, monkeypatch):
+    import threading
+    import time
+
+    manager = make_manager()
+    ingest(manager, tmp_path, "a", "b", "c", "d")
+    manager.search_concurrency = 4
+    threads = set()
+    estimate = manager._estimate_row_bytes
+
+    def slow_estimate(collection):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        return estimate(collection)
+
+    monkeypatch.setattr(manager, "_estimate_row_bytes", slow_estimate)
+    for name in "abcd":
+        manager.get_collection(name).release()
+
+    stats = manager.get_collection_stats()
+
+    assert list(stats) == ["a", "b", "c", "d"]
+    assert all(collection_stats["row_count"] == 3 for collection_stats in stats.values())
+    assert len(threads) > 1
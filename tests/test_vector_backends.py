@@ -0,0 +1,161 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from pymilvus import CollectionSchema, DataType, FieldSchema
+
+from vector_backends import LocalCollection
+
+DIM = 8
+
+
+def make_collection(tmp_path, vector_type=DataType.FLOAT_VECTOR):
+    schema = CollectionSchema([
+        FieldSchema(name="id", dtype=DataType.INT64, is_primary=True),
+        FieldSchema(name="vector", dtype=vector_type, dim=DIM),
+        FieldSchema(name="document", dtype=DataType.VARCHAR, max_length=64),
+    ])
+    return LocalCollection.create("test", str(tmp_path / "test"), schema)
+
+
+def reopen(collection):
+    return LocalCollection(collection.name, collection.path)
+
+
+def random_vectors(count, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def insert(collection, ids, vectors, documents=None, upsert=False):
+    documents = documents or ["a"] * len(ids)
+    write = collection.upsert if upsert else collection.insert
+    write([list(ids), list(vectors), documents])
+
+
+def search(collection, query, limit, **kwargs):
+    (hits,) = collection.search([query], "vector", {"params": kwargs.pop("params", {})}, limit,
+                                output_fields=["document"], **kwargs)
+    return [(hit.id, hit.distance) for hit in hits]
+
+
+@pytest.mark.parametrize("vector_type, dtype", [(DataType.FLOAT_VECTOR, np.float32),
+                                                (DataType.FLOAT16_VECTOR, np.float16)])
+def test_search_is_exact_and_survives_a_reopen(tmp_path, vector_type, dtype):
+    collection = make_collection(tmp_path, vector_type)
+    vectors = random_vectors(50)
+    insert(collection, range(50), vectors)
+    query = random_vectors(1, seed=1)[0]
+
+    scores = vectors.astype(dtype).astype(np.float32) @ query
+    expected = [(int(row), pytest.approx(float(scores[row]), abs=1e-5)) for row in np.argsort(-scores)[:5]]
+    assert search(collection, query, 5) == expected
+    collection.flush()
+    assert search(reopen(collection), query, 5) == expected
+
+
+def test_radius_is_an_exclusive_lower_bound_and_groups_cap_hits(tmp_path):
+    collection = make_collection(tmp_path)
+    vectors = random_vectors(30)
+    insert(collection, range(30), vectors, documents=[f"doc{row % 3}" for row in range(30)])
+    query = vectors[0]
+    scores = vectors @ query
+    radius = float(np.sort(scores)[-4])
+
+    assert sorted(hit_id for hit_id, _ in search(collection, query, 10, params={"radius": radius})) == \
+        sorted(int(row) for row in np.flatnonzero(scores > radius))
+
+    (hits,) = collection.search([query], "vector", {"params": {}}, 2, output_fields=["document"],
+                                group_by_field="document", group_size=3)
+    documents = [hit.entity.get("document") for hit in hits]
+    assert len(set(documents)) == 2 and all(documents.count(document) == 3 for document in set(documents))
+
+
+def test_upsert_replaces_rows_and_delete_removes_them_across_reopens(tmp_path):
+    collection = make_collection(tmp_path)
+    vectors = random_vectors(6)
+    insert(collection, range(4), vectors[:4], documents=["a", "a", "b", "b"])
+    collection.flush()
+
+    insert(collection, [1, 5], vectors[4:], documents=["a", "c"], upsert=True)
+    collection.delete(expr='document == "b"')
+    collection.flush()
+
+    for view in (collection, reopen(collection)):
+        assert view.num_entities == 3
+        assert sorted(hit_id for hit_id, _ in search(view, vectors[4], 10)) == [0, 1, 5]
+        assert search(view, vectors[4], 1) == [(1, pytest.approx(1.0, abs=1e-5))]
+
+
+def test_flush_writes_only_new_rows_and_merges_segments(tmp_path, monkeypatch):
+    collection = make_collection(tmp_path)
+    written = []
+    save = np.save
+
+    def counting_save(path, array, *args, **kwargs):
+        if os.path.basename(str(path)).startswith("vector-"):
+            written.append(len(array))
+        save(path, array, *args, **kwargs)
+
+    monkeypatch.setattr(np, "save", counting_save)
+    vectors = random_vectors(64)
+    for row in range(64):
+        insert(collection, [row], vectors[row:row + 1])
+        collection.flush()
+
+    # A full rewrite per flush would write 64 * 65 / 2 = 2080 rows; merging like a binary counter
+    # writes each row once per merge level
+    assert sum(written) <= 64 * 7
+    assert len([name for name in os.listdir(collection.path) if name.startswith("vector-")]) == 1
+    assert reopen(collection).num_entities == 64
+
+
+def test_segments_stay_memory_mapped_through_writes_and_searches(tmp_path):
+    collection = make_collection(tmp_path)
+    vectors = random_vectors(7)
+    for rows in (range(4), range(4, 6)):
+        insert(collection, rows, vectors[rows.start:rows.stop])
+        collection.flush()
+    insert(collection, [6], vectors[6:])
+    collection.delete(expr="id in [1]")
+
+    assert sorted(hit_id for hit_id, _ in search(collection, vectors[6], 10)) == [0, 2, 3, 4, 5, 6]
+    assert search(collection, vectors[5], 1) == [(5, pytest.approx(1.0, abs=1e-5))]
+    chunks = collection.vector_chunks["vector"]
+    # One map per segment, with the unflushed row kept in memory after them
+    assert [type(chunk) for chunk in chunks] == [np.memmap, np.memmap, np.ndarray]
+
+    collection.flush()
+    reopened = reopen(collection)
+    assert search(reopened, vectors[6], 1) == [(6, pytest.approx(1.0, abs=1e-5))]
+    assert all(type(chunk) is np.memmap for chunk in reopened.vector_chunks["vector"])
+
+
+def test_mostly_deleted_collections_are_compacted(tmp_path):
+    collection = make_collection(tmp_path)
+    vectors = random_vectors(10)
+    insert(collection, range(10), vectors)
+    collection.flush()
+
+    collection.delete(expr=f"id in {list(range(6))}")
+    collection.flush()
+
+    with open(os.path.join(collection.path, LocalCollection.META_FILE), encoding="utf-8") as file:
+        segments = json.load(file)["segments"]
+    assert [(segment["rows"], segment["deleted"]) for segment in segments] == [(4, [])]
+    assert sorted(hit_id for hit_id, _ in search(reopen(collection), vectors[0], 10)) == [6, 7, 8, 9]
+
+
+def test_query_iterators_keep_their_rows_through_a_compaction(tmp_path):
+    collection = make_collection(tmp_path)
+    insert(collection, range(4), random_vectors(4), documents=["a", "a", "a", "b"])
+    collection.flush()
+    iterator = collection.query_iterator(batch_size=10, expr='document == "b"', output_fields=["document"])
+
+    # Deleting most rows compacts the collection, so row positions change
+    collection.delete(expr='document == "a"')
+    collection.flush()
+
+    assert iterator.next() == [{"id": 3, "document": "b"}]
+    assert iterator.next() == []
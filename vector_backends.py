@@ -0,0 +1,609 @@
+import atexit
+import json
+import os
+import re
+import shutil
+import threading
+
+import numpy as np
+from pymilvus import connections, Collection, CollectionSchema, DataType, list_collections, utility
+from pymilvus.client.types import LoadState
+
+from atomic_files import write_json_atomic
+
+
+BACKENDS = ("milvus", "local")
+
+# Numpy type each vector field type is stored and searched as by the local backend
+LOCAL_VECTOR_TYPES = {
+    DataType.FLOAT_VECTOR: np.float32,
+    DataType.FLOAT16_VECTOR: np.float16,
+}
+
+# Rows scored per matrix product, which bounds the float32 copy of float16 or filtered vectors
+SEARCH_CHUNK_ROWS = 65536
+
+_local_backends = {}
+_local_backends_lock = threading.Lock()
+
+
+class MilvusBackend:
+    """Collections on a Milvus server, through the pymilvus ORM."""
+
+    name = "milvus"
+
+    def __init__(self, host="localhost", port="19530"):
+        connections.connect("default", host=host, port=port)
+        print("Connected to Milvus.")
+
+    def collection(self, name, schema=None):
+        """Handle of a collection. Without a schema, a missing collection raises instead of being created."""
+        return Collection(name=name, schema=schema)
+
+    def list_collections(self):
+        return list_collections()
+
+    def drop_collection(self, name):
+        utility.drop_collection(name)
+
+    def index_building_progress(self, collection_name, index_name):
+        return utility.index_building_progress(collection_name, index_name=index_name)
+
+    def is_loaded(self, collection_name):
+        return utility.load_state(collection_name) == LoadState.Loaded
+
+    def loaded_memory(self, collection_name):
+        """Memory the query nodes use for a loaded collection."""
+        return sum(segment.mem_size for segment in utility.get_query_segment_info(collection_name))
+
+
+class LocalHit:
+    """Search hit of the local backend, with the attributes of a pymilvus Hit that the manager reads."""
+
+    def __init__(self, id, distance, fields, position):
+        self.id = id
+        self.distance = distance
+        self.fields = fields
+        # Row position inside the collection, which hybrid search fuses on
+        self.position = position
+
+    @property
+    def entity(self):
+        return self
+
+    def get(self, name):
+        return self.fields.get(name)
+
+
+class LocalIndex:
+    """Index description of the local backend, shaped like a pymilvus Index."""
+
+    def __init__(self, field_name, params):
+        self.field_name = field_name
+        self.index_name = field_name
+        self.params = params
+
+
+class LocalQueryIterator:
+    """
+    Batches of matching rows, with the next()/close() interface of a pymilvus query iterator. The rows
+    are taken when the iterator is created, since a later flush may compact the collection and renumber them.
+    """
+
+    def __init__(self, rows, batch_size):
+        self.rows = rows
+        self.batch_size = batch_size
+        self.offset = 0
+
+    def next(self):
+        batch = self.rows[self.offset:self.offset + self.batch_size]
+        self.offset += len(batch)
+        return batch
+
+    def close(self):
+        self.rows = []
+
+
+def _parse_expr(expr):
+    """
+    Split a filter into (field, operator, value). The local backend understands the filters the manager
+    writes: 'field in [...]', 'field == value' and 'field >= number'.
+    """
+    match = re.fullmatch(r"\s*(\w+)\s*(in|==|>=)\s*(.+?)\s*", expr, re.S)
+    if not match:
+        raise ValueError(f"Unsupported filter expression for the local backend: {expr}")
+    field, operator, value = match.groups()
+    return field, operator, json.loads(value)
+
+
+def _fuse_scores(rerank, hit_lists):
+    """Combine the hit lists of a hybrid search into {row position: score}, as Milvus rankers do."""
+    strategy = rerank.dict()
+    scores = {}
+    for request_index, hits in enumerate(hit_lists):
+        for rank, hit in enumerate(hits):
+            if strategy["strategy"] == "rrf":
+                score = 1.0 / (strategy["params"]["k"] + rank + 1)
+            else:
+                # Milvus maps inner products into (0, 1) with arctan before weighting them
+                weight = strategy["params"]["weights"][request_index]
+                score = weight * (0.5 + np.arctan(hit.distance) / np.pi)
+            scores[hit.position] = scores.get(hit.position, 0.0) + score
+    return scores
+
+
+class LocalCollection:
+    """
+    One collection of the local backend, in a directory of its own. Rows are stored in append-only
+    segments: per segment, every vector field as an .npy array, opened as a memory map, and the scalar
+    fields as JSON columns. meta.json holds the schema, the indexes and the segments with their deleted
+    rows. Writes are kept in memory until flush(), which only writes the rows added since the last flush
+    as a new segment and then switches meta.json to it, so readers always see a complete state.
+    Like Milvus compaction, trailing segments are merged as they accumulate and deleted rows are dropped
+    once they make up half of the collection, so a flush costs about as much I/O as the rows it adds.
+    Searches are exact brute-force inner products; index builds are recorded but have nothing to build.
+    """
+
+    META_FILE = "meta.json"
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._read()
+
+    @classmethod
+    def create(cls, name, path, schema):
+        os.makedirs(path, exist_ok=True)
+        meta = {"schema": schema.to_dict(), "indexes": {}, "segments": [], "next_segment": 1}
+        cls._write_meta(path, meta)
+        return cls(name, path)
+
+    @classmethod
+    def _write_meta(cls, path, meta):
+        write_json_atomic(os.path.join(path, cls.META_FILE), meta)
+
+    def _data_path(self, segment, field, extension):
+        return os.path.join(self.path, f"{field}-{segment}.{extension}")
+
+    def _meta(self):
+        return {"schema": self.schema.to_dict(), "indexes": self.indexes_params, "segments": self.segments,
+                "next_segment": self.next_segment}
+
+    def _read(self):
+        """(Re)load schema, indexes and the persisted rows of every segment."""
+        meta_path = os.path.join(self.path, self.META_FILE)
+        with open(meta_path, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        self._meta_mtime = os.path.getmtime(meta_path)
+
+        self.schema = CollectionSchema.construct_from_dict(meta["schema"])
+        self.indexes_params = meta["indexes"]
+        self.segments = meta["segments"]
+        self.next_segment = meta["next_segment"]
+
+        fields = self.schema.fields
+        self.primary_field = next(field.name for field in fields if field.is_primary)
+        self.vector_fields = {field.name: (LOCAL_VECTOR_TYPES[field.dtype], field.params["dim"])
+                              for field in fields if field.dtype in LOCAL_VECTOR_TYPES}
+        self.scalar_fields = [field.name for field in fields if field.name not in self.vector_fields]
+        self.field_order = [field.name for field in fields]
+
+        self.columns = {name: [] for name in self.scalar_fields}
+        # Per vector field, one memory map per segment followed by the arrays written since the last flush
+        self.vector_chunks = {name: [] for name in self.vector_fields}
+        alive = []
+        for segment in self.segments:
+            with open(self._data_path(segment["name"], "scalars", "json"), "r", encoding="utf-8") as file:
+                columns = json.load(file)
+            for name in self.scalar_fields:
+                self.columns[name].extend(columns[name])
+            for name in self.vector_fields:
+                self.vector_chunks[name].append(np.load(self._data_path(segment["name"], name, "npy"), mmap_mode="r"))
+            segment["rows"] = len(columns[self.primary_field])
+            segment_alive = np.ones(segment["rows"], dtype=bool)
+            segment_alive[segment["deleted"]] = False
+            alive.append(segment_alive)
+
+        self.alive = np.concatenate(alive) if alive else np.zeros(0, dtype=bool)
+        ids = self.columns[self.primary_field]
+        self.positions = {ids[position]: int(position) for position in np.flatnonzero(self.alive)}
+        # Rows before this position are stored in segments; rows from it on were added since the last flush
+        self.persisted_rows = len(self.alive)
+        self.dirty = False
+
+    def _refresh(self):
+        """Pick up a flush made by another process, unless this one holds unflushed writes."""
+        if self.dirty:
+            return
+        try:
+            mtime = os.path.getmtime(os.path.join(self.path, self.META_FILE))
+        except OSError:
+            return
+        if mtime != self._meta_mtime:
+            self._read()
+
+    def _chunks(self, field):
+        """
+        Arrays of a vector field and the row position each starts at, with the row count last. The arrays
+        written since the last flush are merged into one first; the segments stay memory-mapped.
+        """
+        chunks = self.vector_chunks[field]
+        unflushed = len(self.segments)
+        if len(chunks) > unflushed + 1:
+            chunks[unflushed:] = [np.concatenate(chunks[unflushed:])]
+        return chunks, np.cumsum([0] + [len(chunk) for chunk in chunks])
+
+    def _map_last_segment(self):
+        """Replace the arrays holding the rows of the last segment, just written, by memory maps of its files."""
+        name = self.segments[-1]["name"]
+        for field in self.vector_fields:
+            self.vector_chunks[field][len(self.segments) - 1:] = [
+                np.load(self._data_path(name, field, "npy"), mmap_mode="r")
+            ]
+
+    def _gather(self, field, positions):
+        """Vectors of a field at sorted row positions, reading only the chunks that hold them."""
+        chunks, starts = self._chunks(field)
+        cuts = np.searchsorted(positions, starts)
+        parts = [chunk[positions[low:high] - start]
+                 for chunk, start, low, high in zip(chunks, starts, cuts, cuts[1:]) if high > low]
+        if not parts:
+            dtype, dim = self.vector_fields[field]
+            return np.zeros((0, dim), dtype=dtype)
+        return np.concatenate(parts)
+
+    def _row_fields(self, position, output_fields):
+        values = {}
+        for name in output_fields or []:
+            if name in self.vector_fields:
+                chunks, starts = self._chunks(name)
+                index = int(np.searchsorted(starts, position, side="right")) - 1
+                values[name] = chunks[index][position - starts[index]]
+            else:
+                values[name] = self.columns[name][position]
+        return values
+
+    def _mask(self, expr=None):
+        """Live rows matching a filter expression."""
+        mask = self.alive.copy()
+        if expr:
+            field, operator, value = _parse_expr(expr)
+            column = self.columns[field]
+            if operator == "in":
+                values = set(value)
+                mask &= np.fromiter((item in values for item in column), dtype=bool, count=len(column))
+            elif operator == "==":
+                mask &= np.fromiter((item == value for item in column), dtype=bool, count=len(column))
+            else:
+                mask &= np.fromiter((item >= value for item in column), dtype=bool, count=len(column))
+        return mask
+
+    # Writes
+
+    def _write(self, data, replace):
+        columns = dict(zip(self.field_order, data))
+        ids = list(columns[self.primary_field])
+        with self._lock:
+            self._refresh()
+            if replace:
+                self._delete_ids(ids)
+
+            start = len(self.alive)
+            for name in self.scalar_fields:
+                self.columns[name].extend(columns[name])
+            for name, (dtype, dim) in self.vector_fields.items():
+                self.vector_chunks[name].append(np.asarray(columns[name], dtype=dtype).reshape(len(ids), dim))
+            self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+            for offset, row_id in enumerate(ids):
+                self.positions[row_id] = start + offset
+            self.dirty = True
+
+    def insert(self, data, **kwargs):
+        self._write(data, replace=False)
+
+    def upsert(self, data, **kwargs):
+        self._write(data, replace=True)
+
+    def _delete_ids(self, ids):
+        for row_id in ids:
+            position = self.positions.pop(row_id, None)
+            if position is not None:
+                self.alive[position] = False
+                self.dirty = True
+
+    def delete(self, expr, **kwargs):
+        with self._lock:
+            self._refresh()
+            ids = [self.columns[self.primary_field][position] for position in np.flatnonzero(self._mask(expr))]
+            self._delete_ids(ids)
+
+    def _write_segment(self, rows):
+        """Write the rows at the given positions as a new segment's data files and return its name."""
+        name = self.next_segment
+        self.next_segment += 1
+        for field in self.vector_fields:
+            np.save(self._data_path(name, field, "npy"), self._gather(field, rows))
+        with open(self._data_path(name, "scalars", "json"), "w", encoding="utf-8") as file:
+            json.dump({field: [self.columns[field][position] for position in rows] for field in self.scalar_fields},
+                      file)
+        return name
+
+    def _remove_segments(self, names):
+        for name in names:
+            for field in list(self.vector_fields) + ["scalars"]:
+                extension = "json" if field == "scalars" else "npy"
+                try:
+                    os.remove(self._data_path(name, field, extension))
+                except OSError:
+                    # Windows refuses to delete a file that is still memory-mapped
+                    pass
+
+    def flush(self, **kwargs):
+        """
+        Persist the rows added since the last flush as a new segment and record deleted rows.
+        The newest segments are merged while the last is at least as large as the one before it, like
+        carries in a binary counter, so every row is rewritten O(log n) times over the collection's life.
+        Once deleted rows make up half of the collection, it is compacted into one segment of live rows.
+        """
+        with self._lock:
+            if not self.dirty:
+                return
+            total = len(self.alive)
+
+            if total and self.alive.sum() * 2 <= total:
+                old_segments = [segment["name"] for segment in self.segments]
+                self.segments = [{"name": self._write_segment(np.flatnonzero(self.alive)),
+                                  "rows": int(self.alive.sum()), "deleted": []}]
+                self._write_meta(self.path, self._meta())
+                self._remove_segments(old_segments)
+                # Row positions changed, so read the compacted segment back
+                self._read()
+                return
+
+            if total > self.persisted_rows:
+                # Deleted rows are written too, so positions stay stable and nothing needs to be read back
+                self.segments.append({"name": self._write_segment(np.arange(self.persisted_rows, total)),
+                                      "rows": total - self.persisted_rows, "deleted": []})
+                self._map_last_segment()
+                self.persisted_rows = total
+
+            merged = []
+            while len(self.segments) > 1 and self.segments[-1]["rows"] >= self.segments[-2]["rows"]:
+                previous, last = self.segments[-2:]
+                merged.extend([previous["name"], last["name"]])
+                start = total - previous["rows"] - last["rows"]
+                self.segments[-2:] = [{"name": self._write_segment(np.arange(start, total)),
+                                       "rows": previous["rows"] + last["rows"], "deleted": []}]
+                self._map_last_segment()
+
+            start = 0
+            for segment in self.segments:
+                segment["deleted"] = np.flatnonzero(~self.alive[start:start + segment["rows"]]).tolist()
+                start += segment["rows"]
+
+            self._write_meta(self.path, self._meta())
+            self._meta_mtime = os.path.getmtime(os.path.join(self.path, self.META_FILE))
+            self._remove_segments(merged)
+            self.dirty = False
+
+    # Reads
+
+    @property
+    def num_entities(self):
+        with self._lock:
+            self._refresh()
+            return int(self.alive.sum())
+
+    def load(self, **kwargs):
+        self.loaded = True
+
+    def release(self, **kwargs):
+        self.loaded = False
+
+    def memory_bytes(self):
+        with self._lock:
+            return sum(chunk.nbytes for chunks in self.vector_chunks.values() for chunk in chunks)
+
+    def _scores(self, field, candidates, queries):
+        """
+        Inner products of every query with the candidate rows, shape (len(queries), len(candidates)).
+        Candidates are sorted positions, so each chunk scores a consecutive run of them; a chunk whose rows
+        are all candidates is read in slices rather than copied by fancy indexing.
+        """
+        chunks, starts = self._chunks(field)
+        cuts = np.searchsorted(candidates, starts)
+        scores = np.empty((len(queries), len(candidates)), dtype=np.float32)
+        for chunk, start, low, high in zip(chunks, starts, cuts, cuts[1:]):
+            whole = high - low == len(chunk)
+            for begin in range(low, high, SEARCH_CHUNK_ROWS):
+                end = min(begin + SEARCH_CHUNK_ROWS, high)
+                rows = chunk[begin - low:end - low] if whole else chunk[candidates[begin:end] - start]
+                scores[:, begin:end] = queries @ np.asarray(rows, dtype=np.float32).T
+        return scores
+
+    @staticmethod
+    def _select(order, groups, limit, group_size):
+        """Positions into order to keep: the first limit, or up to group_size per group for limit groups."""
+        if groups is None:
+            return order[:limit]
+        kept, counts = [], {}
+        for index in order:
+            group = groups[index]
+            if group not in counts:
+                if len(counts) >= limit:
+                    continue
+                counts[group] = 0
+            if counts[group] < group_size:
+                counts[group] += 1
+                kept.append(index)
+        return kept
+
+    def _search_positions(self, data, anns_field, param, limit, expr=None, group_by_field=None, group_size=1):
+        """Per query row, a list of (row position, score) in descending score order."""
+        with self._lock:
+            self._refresh()
+            candidates = np.flatnonzero(self._mask(expr))
+            queries = np.asarray([np.asarray(vector, dtype=np.float32) for vector in data], dtype=np.float32)
+            scores = self._scores(anns_field, candidates, queries)
+            groups = None
+            if group_by_field:
+                column = self.columns[group_by_field]
+                groups = [column[position] for position in candidates]
+
+        radius = param.get("params", {}).get("radius")
+        results = []
+        for row_scores in scores:
+            selected = np.flatnonzero(row_scores > radius) if radius is not None else np.arange(len(row_scores))
+            if groups is None and limit < len(selected):
+                selected = selected[np.argpartition(-row_scores[selected], limit - 1)[:limit]]
+            order = selected[np.argsort(-row_scores[selected], kind="stable")]
+            kept = self._select(order, groups, limit, group_size)
+            results.append([(int(candidates[index]), float(row_scores[index])) for index in kept])
+        return results
+
+    def _hits(self, positions, output_fields):
+        return [LocalHit(self.columns[self.primary_field][position], score,
+                         self._row_fields(position, output_fields), position)
+                for position, score in positions]
+
+    def search(self, data, anns_field, param, limit, expr=None, output_fields=None, timeout=None,
+               group_by_field=None, group_size=1, **kwargs):
+        results = self._search_positions(data, anns_field, param, limit, expr, group_by_field, group_size)
+        return [self._hits(positions, output_fields) for positions in results]
+
+    def hybrid_search(self, reqs, rerank, limit, output_fields=None, timeout=None, group_by_field=None,
+                      group_size=1, **kwargs):
+        per_request = [
+            self.search(req.data, req.anns_field, req.param, req.limit, expr=req.expr,
+                        group_by_field=group_by_field, group_size=group_size)
+            for req in reqs
+        ]
+
+        results = []
+        for row in range(len(per_request[0])):
+            scores = _fuse_scores(rerank, [hits[row] for hits in per_request])
+            order = sorted(scores, key=scores.get, reverse=True)
+            groups = None
+            if group_by_field:
+                groups = {position: self.columns[group_by_field][position] for position in order}
+            kept = self._select(order, groups, limit, group_size)
+            results.append(self._hits([(position, scores[position]) for position in kept], output_fields))
+        return results
+
+    def query_iterator(self, batch_size=1000, expr=None, output_fields=None, **kwargs):
+        output_fields = [self.primary_field] + list(output_fields or [])
+        with self._lock:
+            self._refresh()
+            rows = [self._row_fields(position, output_fields) for position in np.flatnonzero(self._mask(expr))]
+        return LocalQueryIterator(rows, batch_size)
+
+    # Indexes
+
+    @property
+    def indexes(self):
+        return [LocalIndex(field, params) for field, params in self.indexes_params.items()]
+
+    def create_index(self, field_name, index_params, **kwargs):
+        """Record the index; the local backend always searches exactly, so there is nothing to build."""
+        with self._lock:
+            self._refresh()
+            self.indexes_params[field_name] = dict(index_params)
+            self._save_indexes()
+
+    def drop_index(self, index_name=None, **kwargs):
+        with self._lock:
+            self._refresh()
+            self.indexes_params.pop(index_name, None)
+            self._save_indexes()
+
+    def _save_indexes(self):
+        # Segments only change on flush, so the in-memory list matches what is on disk
+        self._write_meta(self.path, self._meta())
+        self._meta_mtime = os.path.getmtime(os.path.join(self.path, self.META_FILE))
+
+
+class LocalBackend:
+    """
+    In-process vector store persisted to a local directory, one sub-directory per collection, so search
+    and ingest run without a Milvus server. Each collection allows one writing process at a time;
+    other processes see its rows after the writer flushes.
+    """
+
+    name = "local"
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._collections = {}
+        self._lock = threading.Lock()
+        # Unflushed rows would otherwise be lost when the process ends
+        atexit.register(self.flush_all)
+        print(f"Using the local vector store in {root}.")
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def collection(self, name, schema=None):
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is not None:
+                return collection
+            path = self._path(name)
+            if os.path.exists(os.path.join(path, LocalCollection.META_FILE)):
+                collection = LocalCollection(name, path)
+            elif schema is not None:
+                collection = LocalCollection.create(name, path, schema)
+            else:
+                raise ValueError(f"Collection '{name}' does not exist.")
+            self._collections[name] = collection
+            return collection
+
+    def list_collections(self):
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, LocalCollection.META_FILE))
+        )
+
+    def drop_collection(self, name):
+        with self._lock:
+            self._collections.pop(name, None)
+            shutil.rmtree(self._path(name), ignore_errors=True)
+
+    def index_building_progress(self, collection_name, index_name):
+        rows = self.collection(collection_name).num_entities
+        return {"total_rows": rows, "indexed_rows": rows, "pending_index_rows": 0, "state": "Finished"}
+
+    def is_loaded(self, collection_name):
+        return self.collection(collection_name).loaded
+
+    def loaded_memory(self, collection_name):
+        """Bytes of vectors held in memory or mapped from disk."""
+        return self.collection(collection_name).memory_bytes()
+
+    def flush_all(self):
+        with self._lock:
+            collections = list(self._collections.values())
+        for collection in collections:
+            try:
+                collection.flush()
+            except Exception as e:
+                print(f"Could not flush collection '{collection.name}': {e}")
+
+
+def get_local_backend(root=None):
+    """
+    Returns the process-wide local backend for a directory, LOCAL_VECTOR_DIR by default, so every
+    manager in a process shares one view of the data.
+    """
+    root = os.path.abspath(root or os.getenv(
+        "LOCAL_VECTOR_DIR",
+        os.path.join(os.path.expanduser("~"), ".local", "share", "docfusion", "vectors")
+    ))
+    with _local_backends_lock:
+        backend = _local_backends.get(root)
+        if backend is None:
+            backend = LocalBackend(root)
+            _local_backends[root] = backend
+        return backend